@@ -0,0 +1,334 @@
+# Ri Language v2.13.1 - Замеры скорости исполнителей Ri
+# Создано программистом KITTEN в 2025 году
+
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import statistics
+
+from ri_compiler import RiCompiler
+from ri_vm import RiVirtualMachine
+from ri_transpiler import RiPythonRunner
+from ri_examples import sample_code, DRAW_EXAMPLE, TARGET_EXAMPLE, KEYBOARD_EXAMPLE, CAR_EXAMPLE
+
+ENGINES = {
+    'tree': RiCompiler,
+    'vm': RiVirtualMachine,
+    'python': RiPythonRunner,
+}
+
+# Программы для замеров оптимизатора: выражения, не меняющиеся в цикле,
+# вызовы небольших функций и целочисленные циклы
+OPTIMIZER_PROGRAMS = {
+    'разметка': '''перем ширина = 800
+перем высота = 600
+перем кадр = 0
+цикл кадр < 300
+    перем полоса = 0
+    цикл полоса < 12
+        прямоугольник ширина/2-10 полоса*высота/12 20 высота/20 желтый
+        перем полоса = полоса + 1
+    конец
+    прямоугольник ширина/4 0 ширина/2 высота серый
+    перем кадр = кадр + 1
+конец
+''',
+    'формулы': '''перем а = 3
+перем б = 4
+перем сумма = 0
+перем н = 0
+цикл н < 9000
+    перем сумма = сумма + н * корень(а * а + б * б) / (а + б) - синус(а) * косинус(б)
+    перем н = н + 1
+конец
+вывести сумма
+''',
+    'функции': '''функция квадрат(х)
+    возврат х * х
+конец
+функция гипотенуза(а, б)
+    возврат корень(квадрат(а) + квадрат(б))
+конец
+перем сумма = 0
+перем н = 0
+цикл н < 3000
+    перем сумма = сумма + гипотенуза(н, н + 1)
+    перем н = н + 1
+конец
+вывести сумма
+''',
+    'счетчики': '''перем х = 0
+перем у = 0
+перем шаг = 3
+перем н = 0
+цикл н < 20000
+    перем х = х + шаг
+    если х > 800 то
+        перем х = х - 800
+        перем у = у + 1
+    конец
+    перем н = н + 1
+конец
+вывести х + у * 1000
+''',
+}
+
+# Синтетические нагрузки набора замеров
+STRESS_PROGRAMS = {
+'рекурсия': '''функция сумма(н)
+    если н == 0 то
+        возврат 0
+    конец
+    возврат н + сумма(н - 1)
+конец
+функция фиб(н)
+    если н < 2 то
+        возврат н
+    конец
+    возврат фиб(н - 1) + фиб(н - 2)
+конец
+перем итог = 0
+перем раз = 0
+цикл раз < 20
+    перем итог = итог + сумма(400)
+    перем раз = раз + 1
+конец
+вывести итог
+вывести фиб(16)
+''',
+'списки': '''список числа = []
+перем н = 0
+цикл н < 3000
+    добавить числа, н * 2
+    перем н = н + 1
+конец
+перем сумма = 0
+перем н = 0
+цикл н < длина(числа)
+    перем сумма = сумма + числа[н] + элемент(числа, н)
+    перем н = н + 1
+конец
+цикл длина(числа) > 1500
+    удалить числа, 0
+конец
+список квадраты = [1, 4, 9]
+перем н = 0
+цикл н < 2000
+    добавить квадраты, квадраты[н] + 1
+    перем н = н + 1
+конец
+вывести сумма
+вывести длина(числа) + длина(квадраты)
+''',
+'строки': '''перем строка = ""
+перем н = 0
+цикл н < 4000
+    перем строка = строка + "ри" + н
+    если длина(строка) > 2000 то
+        перем строка = ""
+    конец
+    перем н = н + 1
+конец
+перем текст = "а"
+перем н = 0
+цикл н < 2000
+    перем текст = "[" + текст + "]"
+    если длина(текст) > 500 то
+        перем текст = "а"
+    конец
+    перем н = н + 1
+конец
+вывести длина(строка) + длина(текст)
+''',
+}
+
+# Примеры IDE выполняются без окна: бесконечный игровой цикл ограничен
+# числом кадров, задержка не ждет, мышь и клавиши задает ScriptedEvents
+EXAMPLE_FRAMES = 500
+
+# Набор замеров: имя -> (программа, предел итераций цикла или None)
+WORKLOADS = {
+    'пример': (sample_code('bench'), EXAMPLE_FRAMES),
+    'рисовалка': (DRAW_EXAMPLE, EXAMPLE_FRAMES),
+    'мишени': (TARGET_EXAMPLE, EXAMPLE_FRAMES),
+    'клавиатура': (KEYBOARD_EXAMPLE, EXAMPLE_FRAMES),
+    'машинка': (CAR_EXAMPLE, EXAMPLE_FRAMES),
+    'рекурсия': (STRESS_PROGRAMS['рекурсия'], None),
+    'арифметика': (OPTIMIZER_PROGRAMS['счетчики'], None),
+    'формулы': (OPTIMIZER_PROGRAMS['формулы'], None),
+    'списки': (STRESS_PROGRAMS['списки'], None),
+    'строки': (STRESS_PROGRAMS['строки'], None),
+}
+
+# Замедление относительно базового замера, после которого нагрузка отмечается
+REGRESSION_THRESHOLD = 0.15
+
+class ScriptedEvents:
+    # Детерминированные мышь и клавиши вместо окна IDE
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, type, data=""):
+        self.calls += 1
+        n = self.calls
+        if type == "get_mouse_x":
+            return n * 13 % 800
+        if type == "get_mouse_y":
+            return n * 7 % 600
+        if type == "get_mouse_pressed":
+            return n % 10 < 3
+        if type == "get_key_pressed":
+            # Эскейп не нажимается: пример работает все отведенные кадры
+            return data != "эскейп" and (n + len(data)) % 4 == 0
+        return ""
+
+def _no_sleep(seconds):
+    pass
+
+def time_workload(engine_class, code, max_loop_iterations=None, repeat=5, warmup=1):
+    # Время запусков от разбора до конца выполнения и этапы лучшего запуска
+    timings = []
+    best_phases = None
+    for run in range(warmup + repeat):
+        runner = engine_class()
+        runner.sleep = _no_sleep
+        if max_loop_iterations is not None:
+            runner.max_loop_iterations = max_loop_iterations
+        random.seed(run)
+        start = time.perf_counter()
+        runner.execute(code, graphics_callback=lambda commands: None,
+                       input_callback=lambda type, prompt: "5", event_callback=ScriptedEvents())
+        elapsed = time.perf_counter() - start
+        if run < warmup:
+            continue
+        if not timings or elapsed < min(timings):
+            best_phases = dict(runner.phase_times)
+        timings.append(elapsed)
+    return {'best': min(timings), 'median': statistics.median(timings), 'phases': best_phases}
+
+def run_suite(engines=None, workloads=None, repeat=5, warmup=1, out=None):
+    engines = engines or list(ENGINES)
+    workloads = workloads or list(WORKLOADS)
+    results = {}
+    for name in workloads:
+        code, max_loop_iterations = WORKLOADS[name]
+        results[name] = {}
+        for engine in engines:
+            result = time_workload(ENGINES[engine], code, max_loop_iterations, repeat, warmup)
+            results[name][engine] = result
+            if out is not None:
+                out.write(f"{name:<12} {engine:<8} {result['best'] * 1000:>10.1f} мс "
+                          f"(медиана {result['median'] * 1000:.1f} мс)\n")
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'repeat': repeat,
+        'warmup': warmup,
+        'results': results,
+    }
+
+def compare_results(current, baseline, threshold=REGRESSION_THRESHOLD):
+    # Нагрузки, ставшие медленнее базового замера больше чем на threshold:
+    # (нагрузка, движок, было, стало, отношение)
+    regressions = []
+    for name, engines in current['results'].items():
+        for engine, result in engines.items():
+            base = baseline['results'].get(name, {}).get(engine)
+            if base is None:
+                continue
+            ratio = result['best'] / base['best']
+            if ratio > 1 + threshold:
+                regressions.append((name, engine, base['best'], result['best'], ratio))
+    return regressions
+
+def write_results(results, path):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(results, file, ensure_ascii=False, indent=2)
+
+def load_results(path):
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+def time_program(engine_class, code, optimize=True, repeat=5):
+    # Лучшее время из нескольких запусков, в секундах
+    best = None
+    for _ in range(repeat):
+        runner = engine_class()
+        runner.optimize = optimize
+        start = time.perf_counter()
+        runner.execute(code, graphics_callback=lambda commands: None)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def time_tree_path(code, instrumented, repeat=5):
+    # Интерпретатор по дереву: быстрый путь или путь с отладочными проверками
+    # (режим отладки без точек останова и отладчик, который ничего не делает)
+    best = None
+    for _ in range(repeat):
+        runner = RiCompiler()
+        runner.debug_mode = instrumented
+        start = time.perf_counter()
+        runner.execute(code, graphics_callback=lambda commands: None,
+                       debug_callback=(lambda kind, data='': None) if instrumented else None)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def debug_path_benchmark(repeat=5, out=sys.stdout):
+    out.write(f"{'программа':<12} {'быстрый, мс':>12} {'с отладкой, мс':>15} {'разница':>9}\n")
+    for name, code in OPTIMIZER_PROGRAMS.items():
+        fast = time_tree_path(code, instrumented=False, repeat=repeat)
+        instrumented = time_tree_path(code, instrumented=True, repeat=repeat)
+        out.write(f"{name:<12} {fast * 1000:>12.1f} {instrumented * 1000:>15.1f} "
+                  f"{instrumented / fast:>8.2f}x\n")
+
+def optimizer_benchmark(repeat=5, out=sys.stdout):
+    out.write(f"{'программа':<12} {'движок':<8} {'без опт., мс':>14} {'с опт., мс':>12} {'ускорение':>10}\n")
+    for name, code in OPTIMIZER_PROGRAMS.items():
+        for engine, engine_class in ENGINES.items():
+            plain = time_program(engine_class, code, optimize=False, repeat=repeat)
+            optimized = time_program(engine_class, code, optimize=True, repeat=repeat)
+            out.write(f"{name:<12} {engine:<8} {plain * 1000:>14.1f} {optimized * 1000:>12.1f} "
+                      f"{plain / optimized:>9.2f}x\n")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python ri_benchmark.py',
+        description='Замеры скорости исполнителей Ri. Без --suite - замеры оптимизатора и отладки.')
+    parser.add_argument('--suite', action='store_true', help='набор нагрузок: примеры IDE и синтетика')
+    parser.add_argument('--engine', action='append', choices=sorted(ENGINES), help='только этот движок')
+    parser.add_argument('--workload', action='append', choices=list(WORKLOADS), help='только эта нагрузка')
+    parser.add_argument('--repeat', type=int, default=5, help='число замеряемых запусков')
+    parser.add_argument('--warmup', type=int, default=1, help='число запусков для разогрева')
+    parser.add_argument('--out', metavar='FILE', help='сохранить результаты в JSON')
+    parser.add_argument('--baseline', metavar='FILE', help='сравнить с сохраненными результатами')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help='допустимое замедление (доля, по умолчанию 0.15)')
+    args = parser.parse_args(argv)
+
+    if not args.suite:
+        optimizer_benchmark()
+        print()
+        debug_path_benchmark()
+        return 0
+
+    results = run_suite(args.engine, args.workload, args.repeat, args.warmup, out=sys.stdout)
+    if args.out:
+        write_results(results, args.out)
+    if args.baseline:
+        regressions = compare_results(results, load_results(args.baseline), args.threshold)
+        for name, engine, before, after, ratio in regressions:
+            print(f"ЗАМЕДЛЕНИЕ {name} {engine}: {before * 1000:.1f} мс -> {after * 1000:.1f} мс ({ratio:.2f}x)")
+        if regressions:
+            return 1
+        print("Замедлений относительно базового замера нет")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
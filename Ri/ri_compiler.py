@@ -3,12 +3,27 @@
 
 import re
 import sys
+import hashlib
 import math
 import time
 import random
+import operator
+import threading
 import traceback
+from contextlib import contextmanager
 from typing import List, Dict, Any, Optional, Union
 
+from ri_parser import (parse_program, classify_statement, strip_comment, ParseCache, Expression,
+                       Const, Name, LocalName, GlobalName, ListLiteral, Index, Call, UnaryOp, BinOp, BoolOp,
+                       Hoisted, InlineCall, NumericOp, IfStatement, WhileStatement, FunctionDeclaration, PassStatement,
+                       VarDeclaration, Assignment, PrintStatement, InputStatement,
+                       ListDeclaration, ListAppend, ListRemove, WindowCommand, DrawCommand,
+                       TextCommand, ClearCommand, UpdateCommand, DelayCommand,
+                       SetHandlerCommand, EventQuery, StopStatement, ReturnStatement,
+                       ExpressionStatement, Statement)
+from ri_resolver import (resolve_program, bind_program, Resolution, Scope, SlotVariablesMixin,
+                         UNSET, STORE_TARGETS)
+
 RI_LANGUAGE_VERSION = "2.13.1"
 RI_LANGUAGE_CREATOR = "KITTEN"
 RI_LANGUAGE_YEAR = "2025"
@@ -24,9 +39,217 @@ RI_LANGUAGE_FEATURES = [
     "Списки и массивы"
 ]
 
-class RiCompiler:
+def to_bool(value):
+    if isinstance(value, bool):
+        return value
+    elif isinstance(value, (int, float)):
+        return value != 0
+    elif isinstance(value, str):
+        return value.lower() not in ['', '0', 'ложь', 'false']
+    else:
+        return bool(value)
+
+# Семантика операторов Ri, общая для всех способов выполнения
+
+def _ri_add(left, right):
+    # Сложение со строкой превращается в склейку строк
+    if isinstance(left, str) or isinstance(right, str):
+        return str(left) + str(right)
+    return left + right
+
+def _ri_divide(left, right):
+    if right == 0:
+        return 0
+    return left / right
+
+def _ri_floor_divide(left, right):
+    if right == 0:
+        return 0
+    return left // right
+
+def _ri_modulo(left, right):
+    if right == 0:
+        return 0
+    return left % right
+
+def _ri_comparison(compare):
+    def comparison(left, right):
+        # Если хотя бы один операнд - строка, сравниваем как строки
+        if isinstance(left, str) or isinstance(right, str):
+            return compare(str(left), str(right))
+        return compare(left, right)
+    return comparison
+
+class StopProgram(Exception):
+    # Сигнал остановить() - завершает выполнение программы
+    pass
+
+class CallDepthExceeded(StopProgram):
+    # Исчерпан бюджет кадров вызова - программа завершается с ошибкой
+    pass
+
+class ReturnValue(Exception):
+    # Сигнал возврат - передает значение из тела функции
+    def __init__(self, value):
+        super().__init__(value)
+        self.value = value
+
+BINARY_OPERATIONS = {
+    '+': _ri_add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': _ri_divide,
+    '//': _ri_floor_divide,
+    '%': _ri_modulo,
+    '^': operator.pow,
+    '>': _ri_comparison(operator.gt),
+    '<': _ri_comparison(operator.lt),
+    '>=': _ri_comparison(operator.ge),
+    '<=': _ri_comparison(operator.le),
+    '==': _ri_comparison(operator.eq),
+    '!=': _ri_comparison(operator.ne),
+}
+
+# Быстрый путь для операндов-чисел: без проверок на строки
+NUMERIC_TYPES = (int, float)
+NUMERIC_OPERATIONS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': _ri_divide,
+    '//': _ri_floor_divide,
+    '%': _ri_modulo,
+    '>': operator.gt,
+    '<': operator.lt,
+    '>=': operator.ge,
+    '<=': operator.le,
+    '==': operator.eq,
+    '!=': operator.ne,
+}
+
+# Разобранные выражения и строки, вычисляемые по тексту (evaluate_expression,
+# execute_single_line). Деревья не меняются при вычислении, поэтому кэши общие
+# для всех исполнителей
+EXPRESSION_CACHE_SIZE = 1024
+LINE_CACHE_SIZE = 256
+_expression_cache = ParseCache(Expression, EXPRESSION_CACHE_SIZE)
+_line_cache = ParseCache(lambda key: classify_statement(key[0], strip_comment(key[1]).strip()),
+                         LINE_CACHE_SIZE)
+# Разобранные и оптимизированные программы по хэшу текста и настроек оптимизатора:
+# повторный запуск того же текста не разбирает и не оптимизирует его заново
+PROGRAM_CACHE_SIZE = 32
+_program_cache = ParseCache(None, PROGRAM_CACHE_SIZE)
+
+class Frame:
+    # Кадр вызова функции: локальные переменные и состояние вызывающего кода.
+    # Глобальные переменные доступны через global_slots исполнителя
+    __slots__ = ('function', 'variables', 'caller_variables', 'caller_function', 'return_line',
+                 'scope')
+    
+    def __init__(self, function, variables, caller_variables, caller_function, return_line,
+                 scope=None):
+        self.function = function
+        # Массив ячеек области scope; None, если кадр хранит переменные сам
+        self.variables = variables
+        self.caller_variables = caller_variables
+        self.caller_function = caller_function
+        self.return_line = return_line
+        self.scope = scope
+
+class Breakpoint:
+    # Точка останова: условие и сообщение разбираются один раз при установке.
+    # hit_count - остановка начиная с этого по счету прохода (с истинным условием),
+    # log_message - вместо остановки выводится сообщение, {выражение} подставляется
+    __slots__ = ('line', 'condition', 'hit_count', 'log_message', 'log_parts', 'hits')
+    
+    def __init__(self, line, condition=None, hit_count=None, log_message=None):
+        self.line = line
+        self.condition = None
+        if condition and condition.strip():
+            self.condition = Expression(condition)
+            if self.condition.error is not None:
+                raise self.condition.error
+        self.hit_count = hit_count
+        self.log_message = log_message
+        self.log_parts = None
+        if log_message:
+            self.log_parts = []
+            for i, part in enumerate(re.split(r'\{([^{}]*)\}', log_message)):
+                if i % 2 == 0:
+                    self.log_parts.append(part)
+                else:
+                    expression = Expression(part)
+                    if expression.error is not None:
+                        raise expression.error
+                    self.log_parts.append(expression)
+        self.hits = 0
+    
+    def should_stop(self, runner):
+        if self.condition is not None and not to_bool(runner.evaluate(self.condition)):
+            return False
+        self.hits += 1
+        if self.hit_count and self.hits < self.hit_count:
+            return False
+        if self.log_parts is not None:
+            runner.log_point(self.line, ''.join(
+                part if isinstance(part, str) else str(runner.evaluate(part))
+                for part in self.log_parts))
+            return False
+        return True
+
+class Watchpoint:
+    # Наблюдение за переменной или списком: остановка при изменении значения
+    # или, если задано условие, при записи, после которой условие истинно
+    __slots__ = ('name', 'condition', 'last')
+    
+    def __init__(self, name, condition=None):
+        self.name = name
+        self.condition = None
+        if condition and condition.strip():
+            self.condition = Expression(condition)
+            if self.condition.error is not None:
+                raise self.condition.error
+        self.last = UNSET
+
+class WatchedStore(Statement):
+    # Оператор, записывающий наблюдаемое имя; подставляется только при отладке
+    # с наблюдениями, остальные операторы выполняются как обычно
+    __slots__ = ('statement', 'name')
+    
+    def __init__(self, statement, name):
+        self.line = statement.line
+        self.statement = statement
+        self.name = name
+
+# Операторы списков и поле с именем списка
+LIST_STORE_TARGETS = {
+    ListDeclaration: 'name',
+    ListAppend: 'name',
+    ListRemove: 'name',
+}
+
+class RiCompiler(SlotVariablesMixin):
+    # Защита от бесконечных циклов
+    max_loop_iterations = 10000
+    # Бюджет кадров вызова (глубина рекурсии)
+    max_call_depth = 1000
+    # Ожидание оператора "задержка"; замеры подменяют его на экземпляре, чтобы не ждать
+    sleep = staticmethod(time.sleep)
+    # Запас стека Python на один кадр Ri
+    python_frames_per_call = 40
+    # Свертка констант и удаление недостижимого кода перед выполнением
+    optimize = True
+    # Имена переменных в дереве заменяются номерами ячеек (bind_program);
+    # vm и python разрешают имена сами при компиляции
+    bind_names = True
+    
     def __init__(self):
-        self.variables = {}
+        # Переменные - массивы ячеек: глобальные и текущего кадра
+        self.resolution = Resolution()
+        self.global_scope = self.resolution.globals
+        self.global_slots = []
+        self.variables = self.global_slots
+        self.frames = []
         self.output_lines = []
         self.graphics_commands = []
         self.has_graphics = False
@@ -37,204 +260,461 @@ class RiCompiler:
         self.last_key = ""
         
         self.debug_mode = False
-        self.is_paused = False
+        # Выполнение идет, пока событие установлено; пауза - сброс события
+        self._resume = threading.Event()
+        self._resume.set()
         self.current_line_num = 0
         self.call_stack = []
-        self.breakpoints = set()
+        # Номер строки -> Breakpoint
+        self.breakpoints = {}
+        # Имя переменной или списка -> Watchpoint
+        self.watchpoints = {}
+        # История выполнения при отладке: настройки и запись текущего запуска
+        self.time_travel_settings = None
+        self.time_travel = None
+        # Построчный профиль последнего запуска (без отладки)
+        self.profiling = False
+        self.profiler = None
+        # Покрытие строк и ветвей последнего запуска (без отладки и профилирования)
+        self.coverage_enabled = False
+        self.coverage = None
+        # Счетчики выполнения текущего запуска (только без отладки и профилирования)
+        self.metrics_enabled = False
+        self.metrics = None
+        # Выборочный профиль: интервал опроса в секундах и профиль последнего запуска
+        self.sampling_interval = None
+        self.sampler = None
+        # Время этапов последнего запуска (prepare_program и execute)
+        self.phase_times = {}
         self.debug_callback = None
         self.step_mode = "run"
         self.step_depth = 0
+        # Без отладки блоки выполняются без проверок на каждой строке
+        self.instrumented = False
+        self.execute_block = self.execute_block_fast
+        # Значения переменных, уже отправленные отладчику
+        self._reported_variables = {}
         
         self.lists = {}
         self.graphics_callback = None
+        self.input_callback = None
+        self.event_callback = None
         self.user_functions = {}
+        self.current_function = None
+        self.optimization_report = []
+        self.hoisted_values = []
+        
+        self._node_evaluators = {
+            Const: self._eval_const,
+            Name: self._eval_name,
+            LocalName: self._eval_local_name,
+            GlobalName: self._eval_global_name,
+            ListLiteral: self._eval_list_literal,
+            Index: self._eval_index,
+            Call: self._eval_call,
+            UnaryOp: self._eval_unary,
+            BinOp: self._eval_binary,
+            BoolOp: self._eval_bool,
+            Hoisted: self._eval_hoisted,
+            InlineCall: self._eval_inline_call,
+            NumericOp: self._eval_numeric,
+        }
+        # Обработчики операторов: вид оператора определяется один раз при разборе
+        self._statement_handlers = {
+            Assignment: self.handle_assignment,
+            VarDeclaration: self.handle_var_declaration,
+            IfStatement: self.handle_if,
+            WhileStatement: self.handle_while,
+            PrintStatement: self.handle_print,
+            DrawCommand: self.handle_draw_command,
+            TextCommand: self.handle_text_command,
+            ClearCommand: self.handle_clear_command,
+            UpdateCommand: self.handle_update_command,
+            DelayCommand: self.handle_delay_command,
+            ExpressionStatement: self.handle_expression_statement,
+            ReturnStatement: self.handle_return,
+            FunctionDeclaration: self.handle_function_declaration,
+            InputStatement: self.handle_input_statement,
+            ListDeclaration: self.handle_list_declaration,
+            ListAppend: self.handle_list_append,
+            ListRemove: self.handle_list_remove,
+            WindowCommand: self.handle_window_command,
+            SetHandlerCommand: self.handle_set_handler,
+            EventQuery: self.handle_event_statement,
+            StopStatement: self.handle_stop,
+            PassStatement: self.handle_pass,
+            WatchedStore: self.handle_watched_store,
+        }
+        self._builtins = {
+            'случайно': self.builtin_random,
+            'длина': self.builtin_length,
+            'корень': self.builtin_sqrt,
+            'синус': self.builtin_sin,
+            'косинус': self.builtin_cos,
+            'округлить': self.builtin_round,
+            'строка': self.builtin_str,
+            'число': self.builtin_num,
+            'тип': self.builtin_type,
+            'время': self.builtin_time,
+            'список_длина': self.builtin_list_length,
+            'элемент': self.builtin_list_element,
+            'мышь_х': self.builtin_mouse_x,
+            'мышь_у': self.builtin_mouse_y,
+            'мышь_нажата': self.builtin_mouse_pressed,
+            'клавиша_нажата': self.builtin_key_pressed,
+        }
         
     def execute(self, code: str, graphics_callback=None, input_callback=None, 
                 event_callback=None, debug_callback=None):
         self.debug_callback = debug_callback
         self.graphics_callback = graphics_callback
-        self.variables = {}
+        self.input_callback = input_callback
+        self.event_callback = event_callback
+        self.frames = []
         self.output_lines = []
         self.graphics_commands = []
         self.has_graphics = False
         self.event_handlers = {}
         self.lists = {}
         self.user_functions = {}
+        self.current_function = None
+        self._reported_variables = {}
+        for point in self.breakpoints.values():
+            point.hits = 0
+        for watch in self.watchpoints.values():
+            watch.last = UNSET
+        
+        # Путь выполнения выбирается один раз при запуске
+        self.instrumented = self.debug_mode or self.debug_callback is not None
+        
+        # Структура блоков разбирается один раз до начала выполнения
+        program = self.prepare_program(code)
+        # Области видимости - свои у каждого запуска: запись нового имени
+        # по имени (из консоли отладчика) добавляет в область ячейку
+        self.resolution = resolve_program(program)
+        self.global_scope = self.resolution.globals
+        self.global_slots = self.variables = self.global_scope.new_frame()
+        if self.instrumented and self.watchpoints:
+            self.instrument_watches(program.body)
+        self.time_travel = None
+        if self.instrumented and self.time_travel_settings is not None:
+            from ri_timetravel import TimeTravelRecorder
+            self.time_travel = TimeTravelRecorder(**self.time_travel_settings)
         
-        lines = [line.rstrip('\n\r') for line in code.split('\n')]
-        i = 0
+        self.execute_block = self.execute_block_debug if self.instrumented else self.execute_block_fast
+        # Профилирование - отдельный путь; при отладке время строк не измеряется
+        self.profiler = None
+        for name in ('call_user_function', 'call_builtin_function', 'evaluate'):
+            self.__dict__.pop(name, None)
+        if self.profiling and not self.instrumented:
+            from ri_profiler import LineProfiler
+            self.profiler = LineProfiler()
+            self.execute_block = self.execute_block_profile
+            self.call_user_function = self.call_user_function_profile
+        if self.coverage is not None:
+            self.execute_block = self.execute_block_coverage
+        self._statement_handlers[IfStatement] = self.handle_if_coverage if self.coverage is not None else self.handle_if
+        self.metrics = None
+        if self.metrics_enabled and not self.instrumented and self.profiler is None and self.coverage is None:
+            from ri_metrics import Metrics
+            self.metrics = Metrics(self, program)
+            self.execute_block = self.execute_block_metrics
+            self.evaluate = self.evaluate_metrics
+            self.call_user_function = self.call_user_function_metrics
+            self.call_builtin_function = self.call_builtin_function_metrics
+        self._statement_handlers[DelayCommand] = (self.handle_delay_command_metrics if self.metrics is not None
+                                                  else self.handle_delay_command)
+        self._node_evaluators[InlineCall] = (self._eval_inline_call_metrics if self.metrics is not None
+                                             else self._eval_inline_call)
         
-        while i < len(lines):
-            line = lines[i].strip()
-            self.current_line_num = i + 1
+        # Выборка не меняет путь выполнения: поток только читает строку и кадры
+        self.sampler = None
+        if self.sampling_interval is not None:
+            from ri_profiler import SamplingProfiler
+            self.sampler = SamplingProfiler(self, self.sampling_interval)
+            self.sampler.start()
+        
+        started = time.perf_counter()
+        with self.call_depth_budget():
+            try:
+                self.execute_block(program.body)
+            except StopProgram:
+                pass
+            except ReturnValue:
+                # возврат на верхнем уровне завершает программу
+                pass
+            finally:
+                if self.sampler is not None:
+                    self.sampler.stop()
+                if self.metrics is not None:
+                    self.metrics.finish()
+        self.phase_times['execute'] = time.perf_counter() - started
+        if self.profiler is not None:
+            self.profiler.finish(self.phase_times['execute'])
+        
+        if self.has_graphics and self.graphics_callback and self.graphics_commands:
+            self.graphics_callback(self.graphics_commands)
+        
+        return '\n'.join(self.output_lines)
+    
+    def prepare_program(self, code):
+        # Время этапов запуска в секундах: разбор, оптимизация, выполнение
+        self.phase_times = {}
+        coverage = self.coverage_enabled and not self.instrumented and not self.profiling
+        # Встроенная функция не остановится на точке останова и не попадет
+        # в профиль и покрытие, поэтому в этих режимах вызовы не встраиваются;
+        # счетчики считают встроенные вызовы сами
+        inline = (self.debug_callback is None and not self.profiling
+                  and self.sampling_interval is None and not coverage)
+        if self.instrumented or coverage:
+            # Отладчик встраивает в дерево проверки наблюдений, покрытию нужна
+            # программа до оптимизации - такие запуски не кэшируются
+            program, self.optimization_report = self.build_program(code, inline, coverage)
+        else:
+            self.coverage = None
+            started = time.perf_counter()
+            key = hashlib.sha256(f"{int(self.optimize)}{int(inline)}{int(self.bind_names)}\0{code}"
+                                 .encode('utf-8')).hexdigest()
+            hits = _program_cache.hits
+            program, report = _program_cache.get(key, lambda: self.build_program(code, inline, False))
+            self.optimization_report = list(report)
+            if _program_cache.hits != hits:
+                self.phase_times['cache'] = time.perf_counter() - started
+        self.hoisted_values = [UNSET] * program.hoisted_count
+        return program
+    
+    def build_program(self, code, inline, coverage):
+        from ri_optimizer import optimize_program
+        
+        started = time.perf_counter()
+        program = parse_program(code)
+        self.phase_times['parse'] = time.perf_counter() - started
+        # Выполняемые строки покрытия - по исходной программе, до оптимизации
+        self.coverage = None
+        if coverage:
+            from ri_coverage import Coverage
+            self.coverage = Coverage(program)
+        report = []
+        if self.optimize:
+            started = time.perf_counter()
+            # Покрытие считает строки исходной программы, поэтому ветки с постоянным
+            # условием и недостижимый код при нем не удаляются
+            optimize_program(program, self._builtins, report, inline=inline, prune=not coverage)
+            self.phase_times['optimize'] = time.perf_counter() - started
+        if self.bind_names:
+            bind_program(program, resolve_program(program))
+        return program, report
+    
+    def get_parse_cache_stats(self):
+        # Попадания и промахи кэшей разбора программ, выражений и строк
+        return {'programs': _program_cache.stats(), 'expressions': _expression_cache.stats(),
+                'lines': _line_cache.stats()}
+    
+    def get_optimization_report(self):
+        # Что было вычислено заранее и удалено перед выполнением
+        return list(self.optimization_report)
+    
+    def execute_block_fast(self, statements):
+        # Выполнение без отладки: ни точек останова, ни сообщений отладчику
+        handlers = self._statement_handlers
+        for statement in statements:
+            self.current_line_num = statement.line
+            try:
+                handlers[statement.__class__](statement)
+            except (StopProgram, ReturnValue):
+                raise
+            except Exception as e:
+                self.report_statement_error(statement, e)
+    
+    def execute_block_coverage(self, statements):
+        # Как execute_block_fast, но отмечает строки в битовом множестве покрытия.
+        # Блок, пройденный до конца, уже отмечен целиком и дальше выполняется
+        # без отметок: в долгом цикле покрытие почти ничего не стоит
+        handlers = self._statement_handlers
+        finished_blocks = self.coverage.finished_blocks
+        if id(statements) in finished_blocks:
+            for statement in statements:
+                self.current_line_num = statement.line
+                try:
+                    handlers[statement.__class__](statement)
+                except (StopProgram, ReturnValue):
+                    raise
+                except Exception as e:
+                    self.report_statement_error(statement, e)
+            return
+        lines = self.coverage.lines
+        for statement in statements:
+            line = statement.line
+            self.current_line_num = line
+            lines[line >> 3] |= 1 << (line & 7)
+            try:
+                handlers[statement.__class__](statement)
+            except (StopProgram, ReturnValue):
+                raise
+            except Exception as e:
+                self.report_statement_error(statement, e)
+        finished_blocks.add(id(statements))
+    
+    def execute_block_metrics(self, statements):
+        # Как execute_block_fast, но считает операторы по видам и итерации циклов
+        handlers = self._statement_handlers
+        metrics = self.metrics
+        counts = metrics.statements
+        if id(statements) in metrics.loop_bodies:
+            metrics.loop_iterations += 1
+        for statement in statements:
+            self.current_line_num = statement.line
+            statement_type = statement.__class__
+            counts[statement_type] = counts.get(statement_type, 0) + 1
+            try:
+                handlers[statement_type](statement)
+            except (StopProgram, ReturnValue):
+                raise
+            except Exception as e:
+                self.report_statement_error(statement, e)
+    
+    def execute_block_profile(self, statements):
+        # Как execute_block_fast, но с замером времени каждой строки
+        handlers = self._statement_handlers
+        profiler = self.profiler
+        clock = time.perf_counter
+        for statement in statements:
+            self.current_line_num = statement.line
+            profiler.start_line(statement.line)
+            start = clock()
+            try:
+                handlers[statement.__class__](statement)
+            except (StopProgram, ReturnValue):
+                raise
+            except Exception as e:
+                self.report_statement_error(statement, e)
+            finally:
+                profiler.end_line(statement.line, self.current_function, clock() - start)
+    
+    def execute_block_debug(self, statements):
+        for statement in statements:
+            self.current_line_num = statement.line
+            
+            if self.time_travel is not None:
+                self.time_travel.record(statement.line, self)
             
             if self._check_breakpoint(self.current_line_num):
+                self.is_paused = True
                 if self.debug_callback:
                     self.debug_callback("breakpoint_hit", self.current_line_num)
-                while self.is_paused:
-                    time.sleep(0.01)
-                    if not self.debug_mode:
-                        break
-            
-            if self.debug_mode and self.step_mode != "run":
-                if self._should_step():
-                    self.is_paused = True
-                    if self.debug_callback:
-                        self.debug_callback("step_hit", self.current_line_num)
-                    while self.is_paused:
-                        time.sleep(0.01)
-            
-            if not line or line.startswith('//'):
-                i += 1
-                continue
+            elif self.debug_mode and self.step_mode != "run" and self._should_step():
+                self.is_paused = True
+                if self.debug_callback:
+                    self.debug_callback("step_hit", self.current_line_num)
             
-            if '//' in line:
-                line = line.split('//')[0].strip()
+            if not self._resume.is_set():
+                self.wait_while_paused()
             
             try:
                 if self.debug_callback:
                     self.debug_callback("line_executed", self.current_line_num)
-                    self.debug_callback("variables_updated", self.variables)
+                    self.report_variable_changes()
                 
-                if line.startswith('перем '):
-                    self.handle_var_declaration(line[5:].strip())
-                    
-                elif line.startswith('вывести '):
-                    self.handle_print(line[7:].strip())
-                    
-                elif line.startswith('ввести '):
-                    var_name = line[6:].strip()
-                    if input_callback:
-                        user_input = input_callback("input", f"Введите значение для '{var_name}': ")
-                        try:
-                            if '.' in user_input:
-                                self.variables[var_name] = float(user_input)
-                            elif user_input.isdigit() or (user_input.startswith('-') and user_input[1:].isdigit()):
-                                self.variables[var_name] = int(user_input)
-                            else:
-                                self.variables[var_name] = user_input
-                        except:
-                            self.variables[var_name] = user_input
-                    else:
-                        self.variables[var_name] = ""
-                        
-                elif line.startswith('если '):
-                    i = self.handle_if(lines, i, input_callback, event_callback)
-                    continue
-                    
-                elif line.startswith('цикл '):
-                    i = self.handle_while(lines, i, input_callback, event_callback)
-                    continue
-                    
-                elif line.startswith('функция '):
-                    i = self.handle_function_declaration(lines, i)
-                    continue
-                    
-                elif line.startswith('список '):
-                    self.handle_list_declaration(line[6:].strip())
-                    
-                elif line.startswith('добавить '):
-                    self.handle_list_append(line[8:].strip())
-                    
-                elif line.startswith('удалить '):
-                    self.handle_list_remove(line[7:].strip())
-                    
-                elif line.startswith('окно '):
-                    self.handle_window_command(line[4:].strip())
-                    
-                elif line.startswith('прямоугольник '):
-                    self.handle_rectangle_command(line[13:].strip())
-                    
-                elif line.startswith('круг '):
-                    self.handle_circle_command(line[4:].strip())
-                    
-                elif line.startswith('линия '):
-                    self.handle_line_command(line[5:].strip())
-                    
-                elif line.startswith('текст '):
-                    self.handle_text_command(line[5:].strip())
-                    
-                elif line.startswith('задержка '):
-                    self.handle_delay_command(line[8:].strip())
-                    
-                elif line.startswith('очистить '):
-                    self.handle_clear_command(line[8:].strip())
-                    
-                elif line.startswith('установить_обработчик '):
-                    self.handle_set_handler(line[20:].strip(), event_callback)
-                    
-                elif line.startswith('мышь_х()'):
-                    if event_callback:
-                        self.last_mouse_x = event_callback("get_mouse_x", "")
-                        self.variables['мышь_х'] = self.last_mouse_x
-                    
-                elif line.startswith('мышь_у()'):
-                    if event_callback:
-                        self.last_mouse_y = event_callback("get_mouse_y", "")
-                        self.variables['мышь_у'] = self.last_mouse_y
-                    
-                elif line.startswith('мышь_нажата()'):
-                    if event_callback:
-                        self.last_mouse_pressed = event_callback("get_mouse_pressed", "")
-                        self.variables['мышь_нажата'] = self.last_mouse_pressed
-                    
-                elif line.startswith('клавиша_нажата('):
-                    if ')' in line:
-                        key_code = line[14:].split(')')[0].strip().strip('"\'')
-                        if event_callback:
-                            key_pressed = event_callback("get_key_pressed", key_code)
-                            self.variables[f'клавиша_{key_code}'] = key_pressed
-                    
-                elif line.startswith('обновить_экран()'):
-                    command = ('update',)
-                    self.graphics_commands.append(command)
-                    if self.graphics_callback:
-                        self.graphics_callback([command])
-                    
-                elif line.startswith('остановить()'):
-                    if self.debug_callback:
-                        self.debug_callback("program_stopped", "")
-                    break
-                    
-                elif line == 'конец':
-                    pass
-                    
-                elif line == 'иначе':
-                    pass
-                    
-                elif line.startswith('возврат '):
-                    expr = line[7:].strip()
-                    return self.evaluate_expression(expr)
-                    
-                else:
-                    # Обработка присваиваний и вызовов функций
-                    if '=' in line:
-                        parts = line.split('=', 1)
-                        if len(parts) == 2:
-                            var_name = parts[0].strip()
-                            expr = parts[1].strip()
-                            value = self.evaluate_expression(expr)
-                            self.variables[var_name] = value
-                    else:
-                        # Просто выражение (может быть вызов функции)
-                        self.evaluate_expression(line)
+                self._statement_handlers[statement.__class__](statement)
                     
+            except (StopProgram, ReturnValue):
+                raise
             except Exception as e:
-                error_msg = f"Ошибка в строке {i+1}: {str(e)}"
-                self.output_lines.append(error_msg)
-                if self.debug_callback:
-                    self.debug_callback("error", error_msg)
-                # Не прерываем выполнение, продолжаем со следующей строки
-                
-            i += 1
-        
-        if self.has_graphics and self.graphics_callback and self.graphics_commands:
-            self.graphics_callback(self.graphics_commands)
-        
-        return '\n'.join(self.output_lines)
+                self.report_statement_error(statement, e)
+            finally:
+                if self.time_travel is not None:
+                    self.record_list_change(statement)
+    
+    def report_variable_changes(self):
+        # Отладчику отправляются только переменные, изменившиеся с прошлого
+        # сообщения, и имена, которые перестали быть видны
+        variables = self.visible_variables()
+        reported = self._reported_variables
+        changed = {}
+        for name, value in variables.items():
+            old = reported.get(name, UNSET)
+            if old is UNSET or type(old) is not type(value) or old != value:
+                # Список копируется: его изменения должны быть видны как новые
+                changed[name] = value.copy() if isinstance(value, list) else value
+        removed = [name for name in reported if name not in variables]
+        if not changed and not removed:
+            return
+        for name in removed:
+            del reported[name]
+        reported.update(changed)
+        self.debug_callback("variables_changed", (changed, removed))
+    
+    def report_statement_error(self, statement, e):
+        if self.current_function:
+            error_msg = f"Ошибка в функции {self.current_function}: {str(e)}"
+        else:
+            error_msg = f"Ошибка в строке {statement.line}: {str(e)}"
+        self.output_lines.append(error_msg)
+        if self.debug_callback:
+            self.debug_callback("error", error_msg)
+        # Не прерываем выполнение, продолжаем со следующей строки
     
     def _check_breakpoint(self, line_num):
-        return line_num in self.breakpoints and self.debug_mode and not self.is_paused
+        point = self.breakpoints.get(line_num)
+        if point is None or not self.debug_mode or self.is_paused:
+            return False
+        return point.should_stop(self)
+    
+    def instrument_watches(self, statements):
+        # Проверка после записи добавляется только к операторам с наблюдаемыми именами
+        for i, statement in enumerate(statements):
+            statement_type = type(statement)
+            target = STORE_TARGETS.get(statement_type) or LIST_STORE_TARGETS.get(statement_type)
+            if target is not None:
+                name = getattr(statement, target)
+                if name in self.watchpoints:
+                    statements[i] = WatchedStore(statement, name)
+            elif statement_type is IfStatement:
+                self.instrument_watches(statement.body)
+                self.instrument_watches(statement.else_body)
+            elif statement_type is WhileStatement or statement_type is FunctionDeclaration:
+                self.instrument_watches(statement.body)
+    
+    def handle_watched_store(self, statement):
+        self._statement_handlers[statement.statement.__class__](statement.statement)
+        self.check_watch(statement.name, statement.line)
+    
+    def check_watch(self, name, line_num):
+        watch = self.watchpoints.get(name)
+        if watch is None:
+            return
+        value = self.current_variable(name)
+        if value is UNSET:
+            value = self.lists.get(name, UNSET)
+        old = watch.last
+        if watch.condition is not None:
+            hit = to_bool(self.evaluate(watch.condition))
+        else:
+            hit = type(old) is not type(value) or old != value
+        # Список копируется, иначе его изменения не будут видны при сравнении
+        if isinstance(value, list):
+            value = value.copy()
+        watch.last = value
+        if hit and self.debug_mode:
+            self.is_paused = True
+            if self.debug_callback:
+                self.debug_callback("watch_hit", (line_num, name,
+                                                  None if old is UNSET else old, value))
+            self.wait_while_paused()
+    
+    def record_list_change(self, statement):
+        # Измененный список копируется при записи следующего шага
+        if type(statement) is WatchedStore:
+            statement = statement.statement
+        if type(statement) in LIST_STORE_TARGETS:
+            self.time_travel.list_changed(statement.name)
+    
+    def log_point(self, line_num, message):
+        # Точка журнала: сообщение без остановки программы
+        if self.debug_callback:
+            self.debug_callback("logpoint", (line_num, message))
+        else:
+            self.output_lines.append(message)
     
     def _should_step(self):
         if self.step_mode == "step_over":
@@ -245,43 +725,50 @@ class RiCompiler:
             return len(self.call_stack) < self.step_depth
         return False
     
-    def find_block_end(self, lines, start_idx, block_type):
-        depth = 1
-        for j in range(start_idx + 1, len(lines)):
-            line = lines[j].strip()
-            if not line or line.startswith('//'):
-                continue
-                
-            if line.startswith(block_type) or line.startswith('если ') or line.startswith('цикл ') or line.startswith('функция '):
-                depth += 1
-            elif line == 'конец':
-                depth -= 1
-                if depth == 0:
-                    return j
-        return len(lines) - 1
-    
-    def handle_function_declaration(self, lines, start_idx):
-        line = lines[start_idx].strip()
-        func_match = re.match(r'функция\s+(\w+)\s*\((.*?)\)', line)
-        if not func_match:
-            return start_idx + 1
-            
-        func_name = func_match.group(1)
-        params_str = func_match.group(2).strip()
-        params = [p.strip() for p in params_str.split(',')] if params_str else []
-        
-        # Находим конец функции
-        end_idx = self.find_block_end(lines, start_idx, 'функция')
+    def handle_function_declaration(self, statement):
+        if statement.name is None:
+            raise SyntaxError("неверное объявление функции")
         
-        # Сохраняем тело функции
-        body_lines = lines[start_idx + 1:end_idx]
-        self.user_functions[func_name] = {
-            'params': params,
-            'body': body_lines,
-            'start_line': start_idx + 2  # +2 потому что +1 для индексации и +1 для пропуска строки объявления
+        # Сохраняем тело функции; объявление не из программы (из консоли)
+        # получает свою область, его имена ищутся по имени
+        scope = self.resolution.functions.get(statement)
+        self.user_functions[statement.name] = {
+            'params': statement.params,
+            'body': statement.body,
+            'start_line': statement.line + 1,
+            'scope': scope if scope is not None else Scope(statement.name, statement.params),
         }
+    
+    @contextmanager
+    def call_depth_budget(self):
+        # Глубину рекурсии ограничивает бюджет кадров, а не предел стека Python
+        saved_limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(max(saved_limit, self.max_call_depth * self.python_frames_per_call))
+        try:
+            yield
+        finally:
+            sys.setrecursionlimit(saved_limit)
+    
+    def push_frame(self, func_name, local_vars, scope=None):
+        if len(self.frames) >= self.max_call_depth:
+            error_msg = f"Ошибка в функции {self.current_function}: Превышена глубина рекурсии ({self.max_call_depth} кадров)"
+            self.output_lines.append(error_msg)
+            if self.debug_callback:
+                self.debug_callback("error", error_msg)
+            raise CallDepthExceeded()
         
-        return end_idx
+        self.frames.append(Frame(func_name, local_vars, self.variables,
+                                 self.current_function, self.current_line_num, scope))
+        self.call_stack.append(f"функция {func_name}")
+        self.variables = local_vars
+        self.current_function = func_name
+    
+    def pop_frame(self):
+        frame = self.frames.pop()
+        self.call_stack.pop()
+        self.variables = frame.caller_variables
+        self.current_function = frame.caller_function
+        self.current_line_num = frame.return_line
     
     def call_user_function(self, func_name, args):
         if func_name not in self.user_functions:
@@ -289,447 +776,299 @@ class RiCompiler:
             
         func = self.user_functions[func_name]
         
-        # Сохраняем текущие переменные
-        saved_vars = self.variables.copy()
-        saved_call_stack = self.call_stack.copy()
-        
-        # Добавляем параметры в переменные
-        for i, param in enumerate(func['params']):
-            if i < len(args):
-                self.variables[param] = args[i]
-            else:
-                self.variables[param] = 0
-        
-        # Добавляем в стек вызовов
-        self.call_stack.append(f"функция {func_name}")
+        # Локальные переменные: ячейки области функции, заполнены только параметры
+        scope = func['scope']
+        self.push_frame(func_name, scope.new_frame(args), scope)
         
         # Выполняем тело функции
         result = None
-        lines = func['body']
-        i = 0
-        
-        while i < len(lines):
-            line = lines[i].strip()
-            
-            if not line or line.startswith('//'):
-                i += 1
-                continue
-                
-            if '//' in line:
-                line = line.split('//')[0].strip()
-            
-            try:
-                if line.startswith('перем '):
-                    self.handle_var_declaration(line[5:].strip())
-                elif line.startswith('вывести '):
-                    self.handle_print(line[7:].strip())
-                elif line.startswith('если '):
-                    i = self.handle_if(lines, i, None, None)
-                    continue
-                elif line.startswith('цикл '):
-                    i = self.handle_while(lines, i, None, None)
-                    continue
-                elif line.startswith('возврат '):
-                    expr = line[7:].strip()
-                    result = self.evaluate_expression(expr)
-                    break
-                elif '=' in line:
-                    parts = line.split('=', 1)
-                    if len(parts) == 2:
-                        var_name = parts[0].strip()
-                        expr = parts[1].strip()
-                        value = self.evaluate_expression(expr)
-                        self.variables[var_name] = value
-                else:
-                    self.evaluate_expression(line)
-            except Exception as e:
-                self.output_lines.append(f"Ошибка в функции {func_name}: {str(e)}")
-            
-            i += 1
-        
-        # Восстанавливаем переменные и стек
-        self.variables = saved_vars
-        self.call_stack = saved_call_stack
+        try:
+            self.execute_block(func['body'])
+        except ReturnValue as returned:
+            result = returned.value
+        finally:
+            self.pop_frame()
         
         return result
     
-    def handle_var_declaration(self, line):
-        if '=' in line:
-            parts = line.split('=', 1)
-            var_name = parts[0].strip()
-            expr = parts[1].strip()
-            value = self.evaluate_expression(expr)
-            self.variables[var_name] = value
-        else:
-            # Объявление без присваивания
-            self.variables[line] = 0
-    
-    def handle_list_declaration(self, line):
-        if '=' in line:
-            parts = line.split('=', 1)
-            list_name = parts[0].strip()
-            expr = parts[1].strip()
-            
-            if expr.startswith('[') and expr.endswith(']'):
-                items_str = expr[1:-1].strip()
-                if items_str:
-                    items = []
-                    for item in items_str.split(','):
-                        item = item.strip()
-                        items.append(self.evaluate_expression(item))
-                    self.lists[list_name] = items
-                else:
-                    self.lists[list_name] = []
-            else:
-                self.lists[list_name] = []
-        else:
-            # Объявление списка без присваивания
-            self.lists[line] = []
-    
-    def handle_list_append(self, line):
-        parts = line.split(',')
-        if len(parts) >= 2:
-            list_name = parts[0].strip()
-            value_expr = parts[1].strip()
-            value = self.evaluate_expression(value_expr)
-            
-            if list_name in self.lists:
-                self.lists[list_name].append(value)
-            else:
-                # Если список не существует, создаем его
-                self.lists[list_name] = [value]
-    
-    def handle_list_remove(self, line):
-        parts = line.split(',')
-        if len(parts) >= 2:
-            list_name = parts[0].strip()
-            index_expr = parts[1].strip()
-            
-            try:
-                index = self.evaluate_expression(index_expr)
-                if list_name in self.lists and 0 <= index < len(self.lists[list_name]):
-                    del self.lists[list_name][index]
-            except:
-                pass
+    def call_user_function_profile(self, func_name, args):
+        if func_name not in self.user_functions:
+            return RiCompiler.call_user_function(self, func_name, args)
+        caller = self.current_function
+        call_line = self.current_line_num
+        self.profiler.start_function(func_name, self.user_functions[func_name]['start_line'] - 1)
+        start = time.perf_counter()
+        try:
+            return RiCompiler.call_user_function(self, func_name, args)
+        finally:
+            self.profiler.end_function(caller, call_line, func_name, time.perf_counter() - start)
     
-    def handle_print(self, expr):
-        value = self.evaluate_expression(expr)
-        self.output_lines.append(str(value))
+    def call_user_function_metrics(self, func_name, args):
+        self.metrics.user_calls += 1
+        return RiCompiler.call_user_function(self, func_name, args)
     
-    def handle_if(self, lines, start_idx, input_callback, event_callback):
-        line = lines[start_idx].strip()
-        
-        # Извлекаем условие
-        if ' то' in line:
-            condition_part = line.split(' то')[0][3:].strip()  # Убираем "если "
-            condition_expr = condition_part
-        else:
-            condition_part = line[3:].strip()
-            condition_expr = condition_part
-            
-        condition = self.evaluate_expression(condition_expr)
-        
-        # Находим блок else и конец
-        else_pos = -1
-        end_pos = -1
-        depth = 1
-        
-        for j in range(start_idx + 1, len(lines)):
-            check_line = lines[j].strip()
-            if not check_line or check_line.startswith('//'):
-                continue
-                
-            if check_line.startswith('если ') or check_line.startswith('цикл ') or check_line.startswith('функция '):
-                depth += 1
-            elif check_line == 'иначе' and depth == 1:
-                else_pos = j
-            elif check_line == 'конец':
-                depth -= 1
-                if depth == 0:
-                    end_pos = j
-                    break
-        
-        if end_pos == -1:
-            return start_idx + 1
+    def handle_if(self, statement):
+        condition = self.evaluate(statement.condition)
         
         if condition:
-            # Выполняем блок от if до else или до конца
-            block_end = else_pos if else_pos != -1 else end_pos
-            k = start_idx + 1
-            while k < block_end:
-                self.execute_single_line(lines[k].strip(), input_callback, event_callback)
-                k += 1
-        else:
-            # Выполняем блок else если есть
-            if else_pos != -1:
-                k = else_pos + 1
-                while k < end_pos:
-                    self.execute_single_line(lines[k].strip(), input_callback, event_callback)
-                    k += 1
-        
-        return end_pos
+            self.execute_block(statement.body)
+        elif statement.else_body:
+            self.execute_block(statement.else_body)
     
-    def handle_while(self, lines, start_idx, input_callback, event_callback):
-        line = lines[start_idx].strip()
-        condition_expr = line[4:].strip()
-        
-        end_pos = -1
-        depth = 1
+    def handle_if_coverage(self, statement):
+        # Как handle_if, но отмечает выполненную ветку
+        condition = self.evaluate(statement.condition)
+        coverage = self.coverage
+        bit = coverage.branch_bits[statement] if condition else coverage.branch_bits[statement] + 1
+        coverage.branches[bit >> 3] |= 1 << (bit & 7)
         
-        # Находим конец цикла
-        for j in range(start_idx + 1, len(lines)):
-            check_line = lines[j].strip()
-            if not check_line or check_line.startswith('//'):
-                continue
-                
-            if check_line.startswith('цикл ') or check_line.startswith('если ') or check_line.startswith('функция '):
-                depth += 1
-            elif check_line == 'конец':
-                depth -= 1
-                if depth == 0:
-                    end_pos = j
-                    break
-        
-        if end_pos == -1:
-            return start_idx + 1
+        if condition:
+            self.execute_block(statement.body)
+        elif statement.else_body:
+            self.execute_block(statement.else_body)
+    
+    def handle_while(self, statement):
+        condition_expr = statement.condition
+        body = statement.body
         
         iteration_count = 0
-        max_iterations = 10000
+        max_iterations = self.max_loop_iterations
         
-        while self.evaluate_expression(condition_expr) and iteration_count < max_iterations:
-            self.call_stack.append(f"цикл (строка {start_idx+1}, итерация {iteration_count+1})")
-            if self.debug_callback:
-                self.debug_callback("call_stack_updated", self.call_stack)
-            
-            # Выполняем тело цикла
-            k = start_idx + 1
-            while k < end_pos:
-                self.execute_single_line(lines[k].strip(), input_callback, event_callback)
-                k += 1
-            
-            self.call_stack.pop()
-            iteration_count += 1
-            
-            # Проверяем условие снова
-            if not self.evaluate_expression(condition_expr):
-                break
+        # Вынесенные из цикла выражения вычисляются заново при каждом входе в цикл
+        for slot in statement.hoisted:
+            self.hoisted_values[slot] = UNSET
+        
+        if not self.instrumented:
+            # Итерации видны только отладчику - без отладки стек не ведется
+            evaluate = self.evaluate
+            execute_block = self.execute_block
+            while iteration_count < max_iterations and evaluate(condition_expr):
+                execute_block(body)
+                iteration_count += 1
+        else:
+            while iteration_count < max_iterations and self.evaluate(condition_expr):
+                self.call_stack.append(f"цикл (строка {statement.line}, итерация {iteration_count+1})")
+                if self.debug_callback:
+                    self.debug_callback("call_stack_updated", self.call_stack)
+                
+                # Выполняем тело цикла
+                try:
+                    self.execute_block(body)
+                finally:
+                    self.call_stack.pop()
+                iteration_count += 1
         
         if iteration_count >= max_iterations:
             self.output_lines.append("Предупреждение: Превышено максимальное количество итераций цикла")
-        
-        return end_pos
     
-    def execute_single_line(self, line, input_callback, event_callback):
-        if not line or line.startswith('//'):
-            return
-            
-        if '//' in line:
-            line = line.split('//')[0].strip()
-        
-        if line.startswith('перем '):
-            self.handle_var_declaration(line[5:].strip())
-        elif line.startswith('вывести '):
-            self.handle_print(line[7:].strip())
-        elif line.startswith('ввести '):
-            var_name = line[6:].strip()
-            if input_callback:
-                user_input = input_callback("input", f"Введите значение для '{var_name}': ")
-                try:
-                    if '.' in user_input:
-                        self.variables[var_name] = float(user_input)
-                    elif user_input.isdigit() or (user_input.startswith('-') and user_input[1:].isdigit()):
-                        self.variables[var_name] = int(user_input)
-                    else:
-                        self.variables[var_name] = user_input
-                except:
-                    self.variables[var_name] = user_input
-        elif line.startswith('список '):
-            self.handle_list_declaration(line[6:].strip())
-        elif line.startswith('добавить '):
-            self.handle_list_append(line[8:].strip())
-        elif line.startswith('удалить '):
-            self.handle_list_remove(line[7:].strip())
-        elif line.startswith('окно '):
-            self.handle_window_command(line[4:].strip())
-        elif line.startswith('прямоугольник '):
-            self.handle_rectangle_command(line[13:].strip())
-        elif line.startswith('круг '):
-            self.handle_circle_command(line[4:].strip())
-        elif line.startswith('линия '):
-            self.handle_line_command(line[5:].strip())
-        elif line.startswith('текст '):
-            self.handle_text_command(line[5:].strip())
-        elif line.startswith('задержка '):
-            self.handle_delay_command(line[8:].strip())
-        elif line.startswith('очистить '):
-            self.handle_clear_command(line[8:].strip())
-        elif line.startswith('установить_обработчик '):
-            self.handle_set_handler(line[20:].strip(), event_callback)
-        elif line.startswith('мышь_х()'):
-            if event_callback:
-                self.last_mouse_x = event_callback("get_mouse_x", "")
-                self.variables['мышь_х'] = self.last_mouse_x
-        elif line.startswith('мышь_у()'):
-            if event_callback:
-                self.last_mouse_y = event_callback("get_mouse_y", "")
-                self.variables['мышь_у'] = self.last_mouse_y
-        elif line.startswith('мышь_нажата()'):
-            if event_callback:
-                self.last_mouse_pressed = event_callback("get_mouse_pressed", "")
-                self.variables['мышь_нажата'] = self.last_mouse_pressed
-        elif line.startswith('обновить_экран()'):
-            command = ('update',)
-            self.graphics_commands.append(command)
-            if self.graphics_callback:
-                self.graphics_callback([command])
-        elif line.startswith('возврат '):
-            expr = line[7:].strip()
-            return self.evaluate_expression(expr)
-        elif '=' in line:
-            # Обработка присваиваний внутри блоков
-            parts = line.split('=', 1)
-            if len(parts) == 2:
-                var_name = parts[0].strip()
-                expr = parts[1].strip()
-                value = self.evaluate_expression(expr)
-                self.variables[var_name] = value
+    def execute_single_line(self, line, input_callback=None, event_callback=None):
+        statement = _line_cache.get((self.current_line_num, line))
+        self._statement_handlers[statement.__class__](statement)
+    
+    def evaluate(self, expression):
+        # Вычисление заранее разобранного выражения оператора
+        try:
+            if expression.error is not None:
+                raise expression.error
+            return self._evaluate(expression.node)
+        except StopProgram:
+            raise
+        except Exception as e:
+            if self.debug_callback:
+                self.debug_callback("error", f"Ошибка вычисления '{expression.source}': {str(e)}")
+            return 0
+    
+    def evaluate_metrics(self, expression):
+        self.metrics.evaluations += 1
+        return RiCompiler.evaluate(self, expression)
+    
+    def handle_pass(self, statement):
+        pass
+    
+    def handle_var_declaration(self, statement):
+        # Объявление без присваивания дает 0
+        value = self.evaluate(statement.value) if statement.value is not None else 0
+        if statement.slot is not None:
+            self.variables[statement.slot] = value
         else:
-            # Просто выражение
-            self.evaluate_expression(line)
-    
-    def handle_window_command(self, params):
-        parts = params.split()
-        if len(parts) >= 2:
-            width = self.evaluate_expression(parts[0])
-            height = self.evaluate_expression(parts[1])
-            title = f"Графика Ri от {RI_LANGUAGE_CREATOR}" if len(parts) < 3 else " ".join(parts[2:])
-            command = ('window', width, height, title)
-            self.graphics_commands.append(command)
-            self.has_graphics = True
-            if self.graphics_callback:
-                self.graphics_callback([command])
-    
-    def handle_rectangle_command(self, params):
-        parts = params.split()
-        if len(parts) >= 4:
-            x = self.evaluate_expression(parts[0])
-            y = self.evaluate_expression(parts[1])
-            width = self.evaluate_expression(parts[2])
-            height = self.evaluate_expression(parts[3])
-            color = "черный" if len(parts) < 5 else parts[4]
-            command = ('rectangle', x, y, width, height, color)
-            self.graphics_commands.append(command)
-            self.has_graphics = True
-            if self.graphics_callback:
-                self.graphics_callback([command])
-    
-    def handle_circle_command(self, params):
-        parts = params.split()
-        if len(parts) >= 3:
-            x = self.evaluate_expression(parts[0])
-            y = self.evaluate_expression(parts[1])
-            radius = self.evaluate_expression(parts[2])
-            color = "черный" if len(parts) < 4 else parts[3]
-            command = ('circle', x, y, radius, color)
-            self.graphics_commands.append(command)
-            self.has_graphics = True
-            if self.graphics_callback:
-                self.graphics_callback([command])
-    
-    def handle_line_command(self, params):
-        parts = params.split()
-        if len(parts) >= 4:
-            x1 = self.evaluate_expression(parts[0])
-            y1 = self.evaluate_expression(parts[1])
-            x2 = self.evaluate_expression(parts[2])
-            y2 = self.evaluate_expression(parts[3])
-            color = "черный" if len(parts) < 5 else parts[4]
-            command = ('line', x1, y1, x2, y2, color)
-            self.graphics_commands.append(command)
-            self.has_graphics = True
-            if self.graphics_callback:
-                self.graphics_callback([command])
-    
-    def handle_text_command(self, params):
-        text_match = re.search(r'"([^"]*)"', params)
-        if text_match:
-            text = text_match.group(1)
-            params_without_text = params.replace(f'"{text}"', '').strip()
-            parts = params_without_text.split()
-            if len(parts) >= 2:
-                x = self.evaluate_expression(parts[0])
-                y = self.evaluate_expression(parts[1])
-                color = "черный" if len(parts) < 3 else parts[2]
-                command = ('text', x, y, text, color)
-                self.graphics_commands.append(command)
-                self.has_graphics = True
-                if self.graphics_callback:
-                    self.graphics_callback([command])
-    
-    def handle_delay_command(self, params):
+            self.store_variable(statement.name, value)
+    
+    def handle_assignment(self, statement):
+        value = self.evaluate(statement.value)
+        if statement.slot is not None:
+            self.variables[statement.slot] = value
+        else:
+            self.store_variable(statement.name, value)
+    
+    def current_variable(self, name):
+        # Переменная текущего кадра по имени или UNSET
+        scope = self.frames[-1].scope if self.frames else self.global_scope
+        slot = scope.slots.get(name)
+        if slot is not None and slot < len(self.variables):
+            return self.variables[slot]
+        return UNSET
+    
+    def store_variable(self, name, value):
+        # Запись по имени для операторов, разобранных вне программы: новое
+        # имя получает ячейку в области текущего кадра
+        scope = self.frames[-1].scope if self.frames else self.global_scope
+        slot = scope.add(name)
+        variables = self.variables
+        if slot >= len(variables):
+            variables.extend([UNSET] * (slot + 1 - len(variables)))
+        variables[slot] = value
+    
+    def handle_print(self, statement):
+        value = self.evaluate(statement.value)
+        self.output_lines.append(str(value))
+    
+    def handle_input_statement(self, statement):
+        if statement.slot is not None:
+            self.variables[statement.slot] = self.read_input(statement.name)
+        else:
+            self.handle_input(statement.name)
+    
+    def handle_list_declaration(self, statement):
+        self.lists[statement.name] = [self.evaluate(item) for item in statement.items]
+    
+    def handle_list_append(self, statement):
+        value = self.evaluate(statement.value)
+        list_name = statement.name
+        if list_name in self.lists:
+            self.lists[list_name].append(value)
+        else:
+            # Если список не существует, создаем его
+            self.lists[list_name] = [value]
+    
+    def handle_list_remove(self, statement):
+        list_name = statement.name
         try:
-            ms = self.evaluate_expression(params)
-            time.sleep(ms / 1000.0)
+            index = self.evaluate(statement.index)
+            if list_name in self.lists and 0 <= index < len(self.lists[list_name]):
+                del self.lists[list_name][index]
         except:
             pass
     
-    def handle_clear_command(self, params):
-        color = "белый" if not params else params
-        command = ('clear', color)
+    def handle_input(self, var_name):
+        self.store_variable(var_name, self.read_input(var_name))
+    
+    def read_input(self, var_name):
+        if not self.input_callback:
+            return ""
+        user_input = self.input_callback("input", f"Введите значение для '{var_name}': ")
+        try:
+            if '.' in user_input:
+                return float(user_input)
+            elif user_input.isdigit() or (user_input.startswith('-') and user_input[1:].isdigit()):
+                return int(user_input)
+        except:
+            pass
+        return user_input
+    
+    def handle_event_statement(self, statement):
+        if statement.slot is None:
+            self.handle_event_query(statement.event, statement.key, statement.variable)
+        elif self.event_callback:
+            self.variables[statement.slot] = self.query_event(statement.event, statement.key)
+    
+    def handle_event_query(self, event, key, variable):
+        if self.event_callback:
+            self.store_variable(variable, self.query_event(event, key))
+    
+    def query_event(self, event, key):
+        value = self.event_callback(event, key if key is not None else "")
+        if event == "get_mouse_x":
+            self.last_mouse_x = value
+        elif event == "get_mouse_y":
+            self.last_mouse_y = value
+        elif event == "get_mouse_pressed":
+            self.last_mouse_pressed = value
+        return value
+    
+    def handle_stop(self, statement):
+        if self.debug_callback:
+            self.debug_callback("program_stopped", "")
+        raise StopProgram()
+    
+    def handle_return(self, statement):
+        raise ReturnValue(self.evaluate(statement.value))
+    
+    def handle_expression_statement(self, statement):
+        # Просто выражение (может быть вызов функции)
+        self.evaluate(statement.value)
+    
+    def emit_graphics(self, command, marks_graphics=True):
         self.graphics_commands.append(command)
-        self.has_graphics = True
+        if marks_graphics:
+            self.has_graphics = True
         if self.graphics_callback:
             self.graphics_callback([command])
     
-    def handle_set_handler(self, params, event_callback):
-        parts = params.split()
-        if len(parts) >= 2:
-            event_type = parts[0]
-            handler_name = parts[1]
-            if event_callback:
-                event_callback("set_handler", f"{event_type}:{handler_name}")
+    def handle_window_command(self, statement):
+        width = self.evaluate(statement.width)
+        height = self.evaluate(statement.height)
+        title = f"Графика Ri от {RI_LANGUAGE_CREATOR}" if statement.title is None else statement.title
+        self.emit_graphics(('window', width, height, title))
+    
+    def handle_draw_command(self, statement):
+        # Прямоугольник, круг и линия
+        values = tuple(self.evaluate(arg) for arg in statement.args)
+        self.emit_graphics((statement.kind,) + values + (statement.color,))
+    
+    def handle_text_command(self, statement):
+        x = self.evaluate(statement.x)
+        y = self.evaluate(statement.y)
+        self.emit_graphics(('text', x, y, statement.text, statement.color))
+    
+    def handle_update_command(self, statement):
+        self.emit_graphics(('update',), False)
+    
+    def handle_delay_command(self, statement):
+        try:
+            ms = self.evaluate(statement.value)
+            self.sleep(ms / 1000.0)
+        except:
+            pass
+    
+    def handle_delay_command_metrics(self, statement):
+        start = time.perf_counter()
+        try:
+            self.handle_delay_command(statement)
+        finally:
+            self.metrics.delay_time += time.perf_counter() - start
+    
+    def handle_clear_command(self, statement):
+        self.emit_graphics(('clear', statement.color))
+    
+    def handle_set_handler(self, statement):
+        if self.event_callback:
+            self.event_callback("set_handler", f"{statement.event_type}:{statement.handler}")
     
     @property
     def builtin_functions(self):
-        return {
-            'случайно': self.builtin_random,
-            'длина': self.builtin_length,
-            'корень': self.builtin_sqrt,
-            'синус': self.builtin_sin,
-            'косинус': self.builtin_cos,
-            'округлить': self.builtin_round,
-            'строка': self.builtin_str,
-            'число': self.builtin_num,
-            'тип': self.builtin_type,
-            'время': self.builtin_time,
-            'список_длина': self.builtin_list_length,
-            'элемент': self.builtin_list_element,
-        }
+        return self._builtins
     
-    def call_builtin_function(self, func_name, args_str):
+    def call_builtin_function(self, func_name, args):
         try:
-            if func_name in self.builtin_functions:
-                args = []
-                if args_str:
-                    for arg in args_str.split(','):
-                        args.append(self.evaluate_expression(arg.strip()))
-                
-                return self.builtin_functions[func_name](*args)
+            if func_name in self._builtins:
+                return self._builtins[func_name](*args)
             return None
         except Exception as e:
             if self.debug_callback:
                 self.debug_callback("error", f"Ошибка вызова функции {func_name}: {str(e)}")
             return None
     
+    def call_builtin_function_metrics(self, func_name, args):
+        self.metrics.builtin_calls += 1
+        return RiCompiler.call_builtin_function(self, func_name, args)
+    
     def builtin_random(self, min_val=0, max_val=1):
         return random.randint(int(min_val), int(max_val))
     
     def builtin_length(self, value):
-        if isinstance(value, str):
+        if isinstance(value, list):
             return len(value)
-        elif value in self.lists:
-            return len(self.lists[value])
-        elif isinstance(value, list):
+        elif isinstance(value, str):
             return len(value)
         return 0
     
@@ -776,326 +1115,287 @@ class RiCompiler:
         return int(time.time() * 1000)
     
     def builtin_list_length(self, list_name):
-        if list_name in self.lists:
-            return len(self.lists[list_name])
+        items = self._resolve_list(list_name)
+        if items is not None:
+            return len(items)
         return 0
     
     def builtin_list_element(self, list_name, index):
-        if list_name in self.lists and 0 <= index < len(self.lists[list_name]):
-            return self.lists[list_name][index]
+        items = self._resolve_list(list_name)
+        if items is not None and 0 <= index < len(items):
+            return items[int(index)]
         return 0
     
+    def _resolve_list(self, value):
+        # Список можно передать как значение или по имени
+        if isinstance(value, list):
+            return value
+        if isinstance(value, str) and value in self.lists:
+            return self.lists[value]
+        return None
+    
+    def builtin_mouse_x(self):
+        if self.event_callback:
+            self.last_mouse_x = self.event_callback("get_mouse_x", "")
+        return self.last_mouse_x
+    
+    def builtin_mouse_y(self):
+        if self.event_callback:
+            self.last_mouse_y = self.event_callback("get_mouse_y", "")
+        return self.last_mouse_y
+    
+    def builtin_mouse_pressed(self):
+        if self.event_callback:
+            self.last_mouse_pressed = self.event_callback("get_mouse_pressed", "")
+        return self.last_mouse_pressed
+    
+    def builtin_key_pressed(self, key_code):
+        if self.event_callback:
+            return self.event_callback("get_key_pressed", str(key_code))
+        return False
+    
     def evaluate_expression(self, expr: str):
         try:
-            expr = expr.strip()
-            
-            # Обработка пустых выражений
-            if not expr:
-                return ""
-            
-            # Обработка строк
-            if (expr.startswith('"') and expr.endswith('"')) or (expr.startswith("'") and expr.endswith("'")):
-                return expr[1:-1]
-            
-            # Обработка булевых значений
-            if expr.lower() == 'истина':
-                return True
-            elif expr.lower() == 'ложь':
-                return False
-            
-            # Обработка вызовов функций (включая пользовательские)
-            if '(' in expr and ')' in expr:
-                # Извлекаем имя функции и аргументы
-                match = re.match(r'(\w+)\s*\((.*)\)', expr)
-                if match:
-                    func_name = match.group(1)
-                    args_str = match.group(2)
-                    
-                    # Проверяем встроенные функции
-                    if func_name in self.builtin_functions:
-                        return self.call_builtin_function(func_name, args_str)
-                    
-                    # Проверяем пользовательские функции
-                    if func_name in self.user_functions:
-                        args = []
-                        if args_str:
-                            for arg in args_str.split(','):
-                                args.append(self.evaluate_expression(arg.strip()))
-                        return self.call_user_function(func_name, args)
-            
-            # Обработка доступа к элементам списка
-            if '[' in expr and ']' in expr:
-                parts = expr.split('[')
-                list_name = parts[0].strip()
-                index_expr = parts[1].split(']')[0].strip()
-                
-                if list_name in self.lists:
-                    index = self.evaluate_expression(index_expr)
-                    if isinstance(index, (int, float)):
-                        index = int(index)
-                        if 0 <= index < len(self.lists[list_name]):
-                            return self.lists[list_name][index]
-                    return 0
-            
-            # Обработка унарного минуса
-            if expr.startswith('-'):
-                inner = expr[1:].strip()
-                if inner:
-                    return -self.evaluate_expression(inner)
-            
-            # Обработка вложенных скобок
-            while '(' in expr and ')' in expr:
-                start = expr.rfind('(')
-                end = expr.find(')', start)
-                if start != -1 and end != -1:
-                    inner = expr[start+1:end]
-                    inner_result = self.evaluate_expression(inner)
-                    expr = expr[:start] + str(inner_result) + expr[end+1:]
-                else:
-                    break
-            
-            # Логические операторы
-            if ' не ' in expr:
-                parts = expr.split(' не ')
-                if len(parts) == 2:
-                    value = self.evaluate_expression(parts[1].strip())
-                    return not self._to_bool(value)
-            
-            if expr.startswith('не '):
-                value = self.evaluate_expression(expr[3:].strip())
-                return not self._to_bool(value)
-            
-            if ' и ' in expr:
-                parts = expr.split(' и ')
-                result = True
-                for part in parts:
-                    value = self.evaluate_expression(part.strip())
-                    result = result and self._to_bool(value)
-                    if not result:
-                        break
-                return result
-            
-            if ' или ' in expr:
-                parts = expr.split(' или ')
-                result = False
-                for part in parts:
-                    value = self.evaluate_expression(part.strip())
-                    result = result or self._to_bool(value)
-                    if result:
-                        break
-                return result
-            
-            # Операторы сравнения
-            comparisons = ['>=', '<=', '==', '!=', '>', '<']
-            for op in comparisons:
-                if op in expr:
-                    parts = expr.split(op)
-                    if len(parts) == 2:
-                        left = self._evaluate_simple(parts[0].strip())
-                        right = self._evaluate_simple(parts[1].strip())
-                        
-                        if isinstance(left, str) or isinstance(right, str):
-                            left = str(left)
-                            right = str(right)
-                        
-                        if op == '>':
-                            return left > right
-                        elif op == '<':
-                            return left < right
-                        elif op == '>=':
-                            return left >= right
-                        elif op == '<=':
-                            return left <= right
-                        elif op == '==':
-                            return left == right
-                        elif op == '!=':
-                            return left != right
-            
-            # Арифметические операторы (с учетом приоритета)
-            # Сначала умножение и деление
-            expr_parts = []
-            current = ''
-            i = 0
-            while i < len(expr):
-                if expr[i:i+2] in ('**', '//'):
-                    if current:
-                        expr_parts.append(current.strip())
-                    expr_parts.append(expr[i:i+2])
-                    current = ''
-                    i += 2
-                elif expr[i] in ('*', '/', '%'):
-                    if current:
-                        expr_parts.append(current.strip())
-                    expr_parts.append(expr[i])
-                    current = ''
-                    i += 1
-                else:
-                    current += expr[i]
-                    i += 1
-            if current:
-                expr_parts.append(current.strip())
-            
-            # Если есть умножение/деление, обрабатываем их
-            if len(expr_parts) > 1:
-                # Объединяем последовательные операнды
-                result = None
-                op = None
-                for part in expr_parts:
-                    if part in ('*', '/', '%', '**', '//'):
-                        op = part
-                    else:
-                        value = self._evaluate_simple(part)
-                        if result is None:
-                            result = value
-                        elif op == '*':
-                            result *= value
-                        elif op == '/':
-                            if value != 0:
-                                result /= value
-                            else:
-                                result = 0
-                        elif op == '%':
-                            result %= value
-                        elif op == '**':
-                            result **= value
-                        elif op == '//':
-                            result //= value
-                expr = str(result)
-            
-            # Затем сложение и вычитание
-            if '+' in expr:
-                parts = expr.split('+')
-                result = self._evaluate_simple(parts[0].strip())
-                for part in parts[1:]:
-                    result += self._evaluate_simple(part.strip())
-                return result
-            
-            if '-' in expr and expr.count('-') > (1 if expr.startswith('-') else 0):
-                parts = expr.split('-')
-                if expr.startswith('-'):
-                    result = -self._evaluate_simple(parts[1].strip())
-                    for part in parts[2:]:
-                        result -= self._evaluate_simple(part.strip())
-                    return result
-                else:
-                    result = self._evaluate_simple(parts[0].strip())
-                    for part in parts[1:]:
-                        result -= self._evaluate_simple(part.strip())
-                    return result
-            
-            # Возведение в степень
-            if '^' in expr:
-                parts = expr.split('^')
-                if len(parts) == 2:
-                    base = self._evaluate_simple(parts[0].strip())
-                    exponent = self._evaluate_simple(parts[1].strip())
-                    return base ** exponent
-            
-            return self._evaluate_simple(expr)
+            expression = _expression_cache.get(expr)
+            if expression.error is not None:
+                raise expression.error
+            return self._evaluate(expression.node)
             
+        except StopProgram:
+            raise
         except Exception as e:
             if self.debug_callback:
                 self.debug_callback("error", f"Ошибка вычисления '{expr}': {str(e)}")
             return 0
     
-    def _evaluate_simple(self, expr: str):
-        expr = expr.strip()
-        
-        if not expr:
-            return 0
-        
-        # Строки (если еще не обработаны)
-        if expr.startswith('"') and expr.endswith('"'):
-            return expr[1:-1]
-        
-        if expr.startswith("'") and expr.endswith("'"):
-            return expr[1:-1]
+    def _evaluate(self, node):
+        return self._node_evaluators[node.__class__](node)
+    
+    def _eval_const(self, node):
+        return node.value
+    
+    def _eval_name(self, node):
+        # Имя, не разрешенное заранее (выражения отладчика и консоли,
+        # необъявленные имена): переменная кадра, затем глобальная
+        value = self.current_variable(node.name)
+        if value is UNSET:
+            return self.load_global(node.name)
+        return value
+    
+    def _eval_local_name(self, node):
+        value = self.variables[node.slot]
+        if value is UNSET:
+            # Локальной переменной еще ничего не присвоено - читаем глобальную
+            return self.load_global(node.name)
+        return value
+    
+    def _eval_global_name(self, node):
+        value = self.global_slots[node.slot]
+        if value is UNSET:
+            return self._lookup_unbound(node.name)
+        return value
+    
+    def _lookup_unbound(self, name):
+        # Списки (как объекты)
+        if name in self.lists:
+            return self.lists[name]
         
-        # Булевы значения
-        if expr.lower() == 'истина':
-            return True
-        elif expr.lower() == 'ложь':
-            return False
+        # Специальные переменные
+        if name == 'мышь_х':
+            return self.last_mouse_x
+        if name == 'мышь_у':
+            return self.last_mouse_y
+        if name == 'мышь_нажата':
+            return self.last_mouse_pressed
         
-        # Числа (включая отрицательные)
-        try:
-            if '.' in expr:
-                return float(expr)
-            else:
-                return int(expr)
-        except:
-            pass
+        # Возвращаем как строку (может быть именем необъявленной переменной)
+        return name
+    
+    def _eval_list_literal(self, node):
+        return [self._evaluate(item) for item in node.items]
+    
+    def _eval_index(self, node):
+        container = self._evaluate(node.target)
+        index = self._evaluate(node.index)
+        if isinstance(container, (list, str)) and isinstance(index, (int, float)):
+            index = int(index)
+            if 0 <= index < len(container):
+                return container[index]
+        return 0
+    
+    def _eval_call(self, node):
+        func_name = node.name
         
-        # Переменные
-        if expr in self.variables:
-            return self.variables[expr]
+        # Проверяем встроенные функции
+        if func_name in self._builtins:
+            args = [self._evaluate(arg) for arg in node.args]
+            return self.call_builtin_function(func_name, args)
         
-        # Списки (как объекты)
-        if expr in self.lists:
-            return f"список[{len(self.lists[expr])} элементов]"
+        # Проверяем пользовательские функции
+        if func_name in self.user_functions:
+            args = [self._evaluate(arg) for arg in node.args]
+            return self.call_user_function(func_name, args)
         
-        # Специальные переменные
-        special_vars = {
-            'мышь_х': self.last_mouse_x,
-            'мышь_у': self.last_mouse_y,
-            'мышь_нажата': self.last_mouse_pressed
-        }
-        if expr in special_vars:
-            return special_vars[expr]
+        raise NameError(f"Неизвестная функция '{func_name}'")
+    
+    def _eval_unary(self, node):
+        value = self._evaluate(node.operand)
+        if node.op == 'не':
+            return not to_bool(value)
+        return -value
+    
+    def _eval_binary(self, node):
+        return BINARY_OPERATIONS[node.op](self._evaluate(node.left), self._evaluate(node.right))
+    
+    def _eval_numeric(self, node):
+        # Вывод типов доказал, что операнды - числа: операция без проверок
+        return node.function(self._evaluate(node.left), self._evaluate(node.right))
+    
+    def _eval_bool(self, node):
+        # Логические операторы вычисляются по короткой схеме
+        left = to_bool(self._evaluate(node.left))
+        if node.op == 'и':
+            return left and to_bool(self._evaluate(node.right))
+        return left or to_bool(self._evaluate(node.right))
+    
+    def _eval_hoisted(self, node):
+        value = self.hoisted_values[node.slot]
+        if value is UNSET:
+            value = self.hoisted_values[node.slot] = self._evaluate(node.node)
+        return value
+    
+    def _eval_inline_call(self, node):
+        if node.name not in self.user_functions:
+            raise NameError(f"Неизвестная функция '{node.name}'")
+        args = [self._evaluate(arg) for arg in node.args]
         
-        # Если ничего не подошло, возвращаем как строку или 0
+        declaration = node.declaration
+        saved_vars = self.variables
+        self.variables = self.resolution.functions[declaration].new_frame(args)
         try:
-            # Пробуем как число снова
-            if expr.replace('.', '', 1).replace('-', '', 1).isdigit():
-                if '.' in expr:
-                    return float(expr)
-                return int(expr)
-        except:
-            pass
-        
-        # Возвращаем как строку (может быть именем необъявленной переменной)
-        return expr
+            # Ошибка в выражении возврата дает 0, как и при обычном вызове
+            return self.evaluate(declaration.body[0].value)
+        finally:
+            self.variables = saved_vars
+    
+    def _eval_inline_call_metrics(self, node):
+        self.metrics.user_calls += 1
+        return self._eval_inline_call(node)
     
     def _to_bool(self, value):
-        if isinstance(value, bool):
-            return value
-        elif isinstance(value, (int, float)):
-            return value != 0
-        elif isinstance(value, str):
-            return value.lower() not in ['', '0', 'ложь', 'false']
-        else:
-            return bool(value)
+        return to_bool(value)
     
-    def add_breakpoint(self, line_num):
-        self.breakpoints.add(line_num)
+    def add_breakpoint(self, line_num, condition=None, hit_count=None, log_message=None):
+        # Ошибка в условии или сообщении - RiSyntaxError при установке
+        self.breakpoints[line_num] = Breakpoint(line_num, condition, hit_count, log_message)
     
     def remove_breakpoint(self, line_num):
-        if line_num in self.breakpoints:
-            self.breakpoints.remove(line_num)
+        self.breakpoints.pop(line_num, None)
+    
+    def enable_profiling(self, enabled=True):
+        # Профиль запуска доступен после execute через get_profile()
+        self.profiling = enabled
+    
+    def get_profile(self):
+        return self.profiler
+    
+    def enable_coverage(self, enabled=True):
+        # Покрытие запуска доступно после execute через get_coverage()
+        self.coverage_enabled = enabled
+    
+    def get_coverage(self):
+        return self.coverage
+    
+    def enable_metrics(self, enabled=True):
+        # Счетчики текущего запуска доступны через get_metrics() и во время execute
+        self.metrics_enabled = enabled
+    
+    def get_metrics(self):
+        return self.metrics
+    
+    def enable_sampling(self, interval=0.005):
+        # Выборочный профиль для долгих программ (эталонный интерпретатор); None выключает.
+        # Доступен после execute через get_sampling_profile()
+        self.sampling_interval = interval
+    
+    def get_sampling_profile(self):
+        return self.sampler
+    
+    def enable_time_travel(self, memory_budget=8 * 1024 * 1024, snapshot_interval=256):
+        # Запись истории при отладке: полный снимок состояния каждые snapshot_interval
+        # шагов, между снимками - только изменения; memory_budget - оценка в байтах
+        self.time_travel_settings = {'memory_budget': memory_budget,
+                                     'snapshot_interval': snapshot_interval}
+    
+    def disable_time_travel(self):
+        self.time_travel_settings = None
+    
+    def get_history_range(self):
+        # Первый и последний доступные шаги истории или None
+        if self.time_travel is None or self.time_travel.first_step() is None:
+            return None
+        return self.time_travel.first_step(), self.time_travel.last_step()
+    
+    def get_state_at(self, step):
+        # Состояние перед выполнением шага: строка, переменные, списки, стек,
+        # графические команды и вывод к этому моменту
+        state = self.time_travel.state_at(step) if self.time_travel is not None else None
+        if state is not None:
+            state['graphics'] = self.graphics_commands[:state['graphics_count']]
+            state['output'] = self.output_lines[:state['output_count']]
+        return state
+    
+    def add_watchpoint(self, name, condition=None):
+        # Наблюдения действуют при отладке; ошибка в условии - RiSyntaxError
+        self.watchpoints[name] = Watchpoint(name, condition)
+    
+    def remove_watchpoint(self, name):
+        self.watchpoints.pop(name, None)
+    
+    @property
+    def is_paused(self):
+        return not self._resume.is_set()
+    
+    @is_paused.setter
+    def is_paused(self, paused):
+        if paused:
+            self._resume.clear()
+        else:
+            self._resume.set()
+    
+    def wait_while_paused(self):
+        # Поток программы спит до продолжения, шага или остановки отладки
+        self._resume.wait()
+    
+    def stop_debugging(self):
+        self.debug_mode = False
+        self.is_paused = False
     
     def pause_execution(self):
         self.is_paused = True
     
+    # Режим шага задается до снятия паузы: поток исполнителя просыпается
+    # сразу и не должен увидеть прежние step_mode и step_depth
     def continue_execution(self):
-        self.is_paused = False
         self.step_mode = "run"
+        self.is_paused = False
     
     def step_over(self):
-        self.is_paused = False
         self.step_mode = "step_over"
         self.step_depth = len(self.call_stack)
+        self.is_paused = False
     
     def step_into(self):
-        self.is_paused = False
         self.step_mode = "step_into"
+        self.is_paused = False
     
     def step_out(self):
-        self.is_paused = False
         self.step_mode = "step_out"
         self.step_depth = max(0, len(self.call_stack) - 1)
+        self.is_paused = False
     
     def get_variables(self):
-        return self.variables.copy()
+        return self.visible_variables()
     
     def get_lists(self):
         return self.lists.copy()
@@ -1104,7 +1404,21 @@ class RiCompiler:
         return self.call_stack.copy()
 
 def run_ri_code(code: str, graphics_callback=None, input_callback=None, 
-                event_callback=None, debug_callback=None) -> str:
-    compiler = RiCompiler()
+                event_callback=None, debug_callback=None, engine: str = "tree") -> str:
+    # engine="tree" - эталонный интерпретатор по дереву разбора,
+    # engine="vm" - байт-код и стековая машина,
+    # engine="python" - трансляция в код Python.
+    # Быстрые движки не поддерживают отладку: с debug_callback программа
+    # выполняется эталонным интерпретатором
+    if engine == "vm" and debug_callback is None:
+        from ri_vm import RiVirtualMachine
+        compiler = RiVirtualMachine()
+    elif engine == "python" and debug_callback is None:
+        from ri_transpiler import RiPythonRunner
+        compiler = RiPythonRunner()
+    elif engine in ("tree", "vm", "python"):
+        compiler = RiCompiler()
+    else:
+        raise ValueError(f"Неизвестный движок выполнения: {engine}")
     return compiler.execute(code, graphics_callback, input_callback, 
                           event_callback, debug_callback)
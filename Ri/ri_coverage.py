@@ -0,0 +1,112 @@
+# Ri Language v2.13.1 - Покрытие строк и ветвей программ Ri
+# Создано программистом KITTEN в 2025 году
+
+from ri_parser import walk_statements, IfStatement, FunctionDeclaration
+
+def _bitset(size):
+    return bytearray((size >> 3) + 1)
+
+def _get(bits, index):
+    return bits[index >> 3] >> (index & 7) & 1
+
+def _set(bits, index):
+    bits[index >> 3] |= 1 << (index & 7)
+
+class Coverage:
+    # Покрытие одного файла: бит на строку и по два бита на каждое "если"
+    # (ветка то, ветка иначе). Выполняемые строки и ветви берутся из
+    # разобранной программы до оптимизации; при покрытии оптимизатор не
+    # удаляет операторы, поэтому каждая из этих строк может быть отмечена
+    def __init__(self, program):
+        self.line_count = program.line_count
+        self.lines = _bitset(program.line_count)
+        self.executable = _bitset(program.line_count)
+        # Оператор "если" -> номер бита ветки то (ветка иначе - следующий бит)
+        self.branch_bits = {}
+        self.branch_lines = []
+        # (имя, строка объявления, первая строка тела или None)
+        self.functions = []
+        for statement in walk_statements(program.body):
+            _set(self.executable, statement.line)
+            statement_type = type(statement)
+            if statement_type is IfStatement:
+                self.branch_bits[statement] = 2 * len(self.branch_lines)
+                self.branch_lines.append(statement.line)
+            elif statement_type is FunctionDeclaration and statement.name is not None:
+                first = statement.body[0].line if statement.body else None
+                self.functions.append((statement.name, statement.line, first))
+        self.branches = _bitset(2 * len(self.branch_lines))
+        # id списков операторов, выполненных до конца в этом запуске
+        self.finished_blocks = set()
+
+    def merge(self, other):
+        # Объединение покрытия нескольких запусков одной программы
+        if other.executable != self.executable or other.branch_lines != self.branch_lines:
+            raise ValueError("Покрытие собрано для разных программ")
+        for i, byte in enumerate(other.lines):
+            self.lines[i] |= byte
+        for i, byte in enumerate(other.branches):
+            self.branches[i] |= byte
+        return self
+
+    def executable_lines(self):
+        return [line for line in range(1, self.line_count + 1) if _get(self.executable, line)]
+
+    def covered_lines(self):
+        return [line for line in self.executable_lines() if _get(self.lines, line)]
+
+    def uncovered_lines(self):
+        return [line for line in self.executable_lines() if not _get(self.lines, line)]
+
+    def branch_results(self):
+        # (строка, номер "если", выполнялась ли строка, ветка то, ветка иначе)
+        return [(line, index, bool(_get(self.lines, line)),
+                 bool(_get(self.branches, 2 * index)), bool(_get(self.branches, 2 * index + 1)))
+                for index, line in enumerate(self.branch_lines)]
+
+    def function_results(self):
+        # Функция вызывалась, если выполнялась первая строка ее тела
+        return [(name, line, first is not None and bool(_get(self.lines, first)))
+                for name, line, first in self.functions]
+
+    def summary(self):
+        executable = self.executable_lines()
+        covered = sum(_get(self.lines, line) for line in executable)
+        taken = sum(then_taken + else_taken for _, _, _, then_taken, else_taken in self.branch_results())
+        return {
+            'lines': len(executable),
+            'lines_covered': covered,
+            'branches': 2 * len(self.branch_lines),
+            'branches_covered': taken,
+        }
+
+    # Экспорт
+
+    def to_lcov(self, source_name='program.ri', test_name=''):
+        # Формат LCOV (genhtml, Codecov, плагины редакторов); число выполнений
+        # не хранится, поэтому выполненная строка имеет счетчик 1
+        out = [f"TN:{test_name}", f"SF:{source_name}"]
+        functions = self.function_results()
+        for name, line, _ in functions:
+            out.append(f"FN:{line},{name}")
+        for name, _, called in functions:
+            out.append(f"FNDA:{int(called)},{name}")
+        out.append(f"FNF:{len(functions)}")
+        out.append(f"FNH:{sum(called for _, _, called in functions)}")
+        branches = self.branch_results()
+        for line, index, executed, then_taken, else_taken in branches:
+            for branch, taken in enumerate((then_taken, else_taken)):
+                out.append(f"BRDA:{line},{index},{branch},{int(taken) if executed else '-'}")
+        out.append(f"BRF:{2 * len(branches)}")
+        out.append(f"BRH:{sum(then_taken + else_taken for *_, then_taken, else_taken in branches)}")
+        executable = self.executable_lines()
+        for line in executable:
+            out.append(f"DA:{line},{_get(self.lines, line)}")
+        out.append(f"LF:{len(executable)}")
+        out.append(f"LH:{sum(_get(self.lines, line) for line in executable)}")
+        out.append("end_of_record")
+        return '\n'.join(out) + '\n'
+
+    def write_lcov(self, path, source_name='program.ri', test_name=''):
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(self.to_lcov(source_name, test_name))
@@ -0,0 +1,395 @@
+# Ri Language v2.13.1 - Сравнение исполнителей Ri на одних и тех же программах
+# Создано программистом KITTEN в 2025 году
+#
+#   python -m ri_difftest --count 500 --seed 1
+#   python -m ri_difftest --engine vm --save расхождения программа.ri
+#   python -m ri_difftest --engine tree --count 1000
+
+import os
+import sys
+import random
+import argparse
+
+from ri_benchmark import ENGINES, ScriptedEvents, _no_sleep
+
+# Эталон - интерпретатор дерева RiCompiler.execute без оптимизатора: с ним
+# сравниваются все исполнители с оптимизатором, и дерево тоже, поэтому
+# ошибки оптимизатора видны, даже если они одинаковы во всех исполнителях
+REFERENCE_ENGINE = 'tree'
+# Части результата запуска, которые должны совпадать у всех исполнителей
+FIELDS = ('output', 'graphics', 'variables', 'lists', 'error')
+# Случайные программы короткие, поэтому и лимит итераций меньше обычного
+MAX_LOOP_ITERATIONS = 200
+
+INPUT_VALUES = ("5", "-2", "3.5", "ри", "")
+
+class ScriptedInput:
+    # Ответы на "ввести" по кругу, одинаковые для всех исполнителей
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, type, prompt):
+        value = INPUT_VALUES[self.calls % len(INPUT_VALUES)]
+        self.calls += 1
+        return value
+
+def run_engine(engine_class, code, seed=0, max_loop_iterations=MAX_LOOP_ITERATIONS, optimize=True):
+    # Значения сравниваются через repr: так 1, 1.0 и истина различаются
+    runner = engine_class()
+    runner.sleep = _no_sleep
+    runner.optimize = optimize
+    runner.max_loop_iterations = max_loop_iterations
+    random.seed(seed)
+    result = {'error': None}
+    try:
+        runner.execute(code, graphics_callback=lambda commands: None,
+                       input_callback=ScriptedInput(), event_callback=ScriptedEvents())
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['output'] = list(getattr(runner, 'output_lines', []))
+    result['graphics'] = [repr(command) for command in getattr(runner, 'graphics_commands', [])]
+    try:
+        variables = runner.visible_variables()
+    except Exception:
+        variables = {}
+    result['variables'] = {name: repr(value) for name, value in sorted(variables.items())}
+    result['lists'] = {name: repr(items) for name, items in sorted(getattr(runner, 'lists', {}).items())}
+    return result
+
+def compare_results(reference, result):
+    # Список (часть результата, описание первого расхождения)
+    differences = []
+    for field in FIELDS:
+        expected, actual = reference[field], result[field]
+        if expected != actual:
+            differences.append((field, describe_difference(expected, actual)))
+    return differences
+
+def describe_difference(expected, actual):
+    if isinstance(expected, list):
+        for i, (a, b) in enumerate(zip(expected, actual)):
+            if a != b:
+                return f"[{i}]: ожидалось {a}, получено {b}"
+        return f"длина: ожидалось {len(expected)}, получено {len(actual)}"
+    if isinstance(expected, dict):
+        for name in sorted(set(expected) | set(actual)):
+            a, b = expected.get(name), actual.get(name)
+            if a != b:
+                return f"{name}: ожидалось {a}, получено {b}"
+    return f"ожидалось {expected}, получено {actual}"
+
+def run_reference(code, seed=0):
+    return run_engine(ENGINES[REFERENCE_ENGINE], code, seed, optimize=False)
+
+def compare_engines(code, engines=('tree', 'vm', 'python'), seed=0):
+    # Исполнитель -> список расхождений с эталоном; совпавшие не попадают
+    reference = run_reference(code, seed)
+    found = {}
+    for name in engines:
+        differences = compare_results(reference, run_engine(ENGINES[name], code, seed))
+        if differences:
+            found[name] = differences
+    return found
+
+# Генератор случайных программ по грамматике Ri
+
+VARIABLES = ('а', 'б', 'в', 'г', 'д')
+PARAMETERS = ('х', 'у')
+LISTS = ('сп', 'оч')
+COLORS = ('красный', 'синий', 'зеленый', 'желтый', 'белый', 'черный')
+STRINGS = ('', 'ри', 'да нет', '12', '3.5')
+OPERATORS = ('+', '-', '*', '/', '//', '%', '^', '==', '!=', '<', '>', '<=', '>=', 'и', 'или')
+# Основания степени в скобках: "(-2) ^ б" и "-2 ^ б" разбираются по-разному
+NEGATIVE_BASES = ('(-2)', '(-3)', '(-0.5)', '(-1)')
+# Аргументы рисования разделяются пробелами, поэтому в них только операторы без пробелов
+COMPACT_OPERATORS = ('+', '-', '*', '/', '//', '%', '^', '<', '>')
+# Имя -> число аргументов; "время" не используется, его результат зависит от запуска
+BUILTINS = (
+    ('случайно', 2), ('длина', 1), ('корень', 1), ('синус', 1), ('косинус', 1),
+    ('округлить', 1), ('строка', 1), ('число', 1), ('тип', 1),
+    ('мышь_х', 0), ('мышь_у', 0), ('мышь_нажата', 0),
+)
+KEYS = ('пробел', 'влево', 'а')
+
+class ProgramGenerator:
+    # Программа из объявлений, списков, вывода, рисования, ветвлений, циклов
+    # со счетчиком и нерекурсивных функций. Выражения смешивают числа, строки,
+    # логические значения и необъявленные имена, чтобы проверять и пути ошибок
+    def __init__(self, seed=0, max_depth=3, max_statements=10):
+        self.random = random.Random(seed)
+        self.max_depth = max_depth
+        self.max_statements = max_statements
+
+    def generate(self):
+        r = self.random
+        self.lines = []
+        self.counters = 0
+        self.functions = []
+        for index in range(r.randint(0, 2)):
+            self.function(index)
+        for name in VARIABLES[:r.randint(1, len(VARIABLES))]:
+            self.emit(0, f"перем {name} = {self.expression(1, VARIABLES)}")
+        for name in LISTS[:r.randint(0, len(LISTS))]:
+            items = ', '.join(self.expression(1, VARIABLES, commas=False) for _ in range(r.randint(0, 3)))
+            self.emit(0, f"список {name} = [{items}]")
+        self.block(0, 0, VARIABLES, False)
+        return '\n'.join(self.lines) + '\n'
+
+    def emit(self, indent, text):
+        self.lines.append('    ' * indent + text)
+
+    def function(self, index):
+        r = self.random
+        name = f"ф{index}"
+        params = PARAMETERS[:r.randint(0, len(PARAMETERS))]
+        self.emit(0, f"функция {name}({', '.join(params)})")
+        names = params + VARIABLES
+        self.block(1, 1, names, True)
+        self.emit(1, f"возврат {self.expression(2, names)}")
+        self.emit(0, "конец")
+        # Вызывать функцию могут только следующие за ней, поэтому рекурсии нет
+        self.functions.append((name, len(params)))
+
+    def block(self, indent, depth, names, in_function):
+        for _ in range(self.random.randint(1, self.max_statements)):
+            self.statement(indent, depth, names, in_function)
+
+    def statement(self, indent, depth, names, in_function):
+        r = self.random
+        choice = r.random()
+        nested = depth < self.max_depth
+        if choice < 0.25:
+            self.emit(indent, f"перем {r.choice(names)} = {self.expression(self.max_depth, names)}")
+        elif choice < 0.37:
+            self.emit(indent, f"вывести {self.expression(self.max_depth, names)}")
+        elif choice < 0.45:
+            self.emit(indent, f"добавить {r.choice(LISTS)}, {self.expression(2, names, commas=False)}")
+        elif choice < 0.49:
+            self.emit(indent, f"удалить {r.choice(LISTS)}, {self.expression(1, names, commas=False)}")
+        elif choice < 0.59:
+            command = r.choice(('круг', 'прямоугольник', 'линия'))
+            count = 3 if command == 'круг' else 4
+            args = ' '.join(self.expression(1, names, spaces=False) for _ in range(count))
+            self.emit(indent, f"{command} {args} {r.choice(COLORS)}")
+        elif choice < 0.62:
+            x, y = (self.expression(1, names, spaces=False) for _ in range(2))
+            self.emit(indent, f'текст {x} {y} "{r.choice(STRINGS)}" {r.choice(COLORS)}')
+        elif choice < 0.64:
+            self.emit(indent, f"очистить {r.choice(COLORS)}")
+        elif choice < 0.66:
+            self.emit(indent, "обновить_экран()")
+        elif choice < 0.67:
+            self.emit(indent, f"задержка {r.randint(0, 20)}")
+        elif choice < 0.70:
+            self.emit(indent, f"ввести {r.choice(names)}")
+        elif choice < 0.82 and nested:
+            self.emit(indent, f"если {self.expression(2, names)} то")
+            self.block(indent + 1, depth + 1, names, in_function)
+            if r.random() < 0.5:
+                self.emit(indent, "иначе")
+                self.block(indent + 1, depth + 1, names, in_function)
+            self.emit(indent, "конец")
+        elif choice < 0.92 and nested:
+            counter = f"сч{self.counters}"
+            self.counters += 1
+            # Изредка цикл упирается в лимит итераций
+            limit = r.randint(0, 6) if r.random() < 0.95 else 10 ** 6
+            condition = f"{counter} < {limit}"
+            if r.random() < 0.3:
+                condition += f" и {self.expression(1, names)}"
+            self.emit(indent, f"перем {counter} = 0")
+            self.emit(indent, f"цикл {condition}")
+            self.block(indent + 1, depth + 1, names, in_function)
+            self.emit(indent + 1, f"перем {counter} = {counter} + 1")
+            self.emit(indent, "конец")
+        elif choice < 0.97 and in_function:
+            self.emit(indent, f"возврат {self.expression(2, names)}")
+        elif 0.97 <= choice < 0.975:
+            self.emit(indent, "остановить()")
+        else:
+            self.emit(indent, f"вывести {self.call(1, names, True, True)}")
+
+    def expression(self, depth, names, spaces=True, commas=True):
+        r = self.random
+        if depth <= 0 or r.random() < 0.3:
+            return self.atom(names, spaces, commas)
+        choice = r.random()
+        if choice < 0.55:
+            op = r.choice(OPERATORS if spaces else COMPACT_OPERATORS)
+            if op == '^':
+                left, right = self.power(depth, names, spaces, commas)
+            else:
+                left = self.expression(depth - 1, names, spaces, commas)
+                right = self.expression(depth - 1, names, spaces, commas)
+            text = f"{left} {op} {right}" if spaces else f"{left}{op}{right}"
+            return f"({text})" if r.random() < 0.5 else text
+        if choice < 0.65:
+            operand = self.expression(depth - 1, names, spaces, commas)
+            if spaces and r.random() < 0.4:
+                return f"не ({operand})"
+            if r.random() < 0.3:
+                # Унарный минус без скобок связывает слабее степени: "-а ^ 2"
+                return f"-{self.atom(names, spaces, commas)}"
+            return f"-({operand})"
+        return self.call(depth - 1, names, spaces, commas)
+
+    def power(self, depth, names, spaces, commas):
+        # Основание и показатель степени. Показатель - небольшое число или
+        # выражение, сведенное к небольшому числу, иначе числа растут без меры
+        r = self.random
+        if r.random() < 0.3:
+            left = r.choice(NEGATIVE_BASES)
+        else:
+            left = self.expression(depth - 1, names, spaces, commas)
+        choice = r.random()
+        if choice < 0.5:
+            right = str(r.randint(0, 3))
+        elif choice < 0.65:
+            right = f"(-{r.randint(1, 2)})"
+        elif choice < 0.8:
+            right = r.choice(('0.5', '(-0.5)'))
+        else:
+            operand = self.expression(depth - 1, names, spaces, commas)
+            right = f"({operand} % 3)" if spaces else f"({operand}%3)"
+        return left, right
+
+    def call(self, depth, names, spaces, commas):
+        r = self.random
+        candidates = [(name, count) for name, count in BUILTINS + tuple(self.functions)
+                      if commas or count < 2]
+        name, count = r.choice(candidates)
+        if name in ('длина', 'число', 'строка', 'тип') and r.random() < 0.3 and commas:
+            return f"{r.choice(('длина', 'список_длина'))}({r.choice(LISTS)})"
+        if spaces and r.random() < 0.1:
+            return f'клавиша_нажата("{r.choice(KEYS)}")'
+        separator = ', ' if spaces else ','
+        args = separator.join(self.expression(depth, names, spaces, commas) for _ in range(count))
+        return f"{name}({args})"
+
+    def atom(self, names, spaces, commas):
+        r = self.random
+        choice = r.random()
+        if choice < 0.3:
+            number = r.randint(-3, 20)
+            return f"({number})" if number < 0 and r.random() < 0.5 else str(number)
+        if choice < 0.4:
+            return str(r.choice((0.5, 2.5, -1.25, 10.0)))
+        if choice < 0.47 and spaces:
+            return f'"{r.choice(STRINGS)}"'
+        if choice < 0.52:
+            return r.choice(('истина', 'ложь'))
+        if choice < 0.85:
+            # Иногда - имя, которое нигде не объявлено
+            return r.choice(names) if r.random() < 0.95 else 'неизв'
+        if choice < 0.93 or not commas:
+            return f"{r.choice(LISTS)}[{r.randint(-1, 3)}]"
+        separator = ', ' if spaces else ','
+        return f"элемент({r.choice(LISTS)}{separator}{r.randint(-1, 3)})"
+
+# Уменьшение программы с расхождением
+
+BLOCK_OPENERS = ('если ', 'цикл ', 'функция ')
+
+def block_spans(lines):
+    # (первая, последняя) строки каждого блока, от внешних к вложенным
+    spans = []
+    stack = []
+    for i, line in enumerate(lines):
+        text = line.strip()
+        if text.startswith(BLOCK_OPENERS):
+            stack.append(i)
+        elif text == 'конец' and stack:
+            spans.append((stack.pop(), i))
+    return sorted(spans, key=lambda span: span[0] - span[1])
+
+def minimize(code, engine, seed=0):
+    # Жадно удаляет блоки и отдельные строки, пока расхождение в тех же
+    # частях результата сохраняется, а эталон выполняется без исключения
+    def failing_fields(candidate):
+        reference = run_reference(candidate, seed)
+        if reference['error'] is not None and reference['error'] != original_error:
+            return set()
+        return {field for field, _ in compare_results(reference, run_engine(ENGINES[engine], candidate, seed))}
+
+    original_error = run_reference(code, seed)['error']
+    fields = failing_fields(code)
+    if not fields:
+        return code
+    lines = code.splitlines()
+    changed = True
+    while changed:
+        changed = False
+        removals = [range(first, last + 1) for first, last in block_spans(lines)]
+        removals += [range(i, i + 1) for i, line in enumerate(lines)
+                     if not line.strip().startswith(BLOCK_OPENERS) and line.strip() not in ('конец', 'иначе')]
+        for removal in removals:
+            candidate = [line for i, line in enumerate(lines) if i not in removal]
+            if failing_fields('\n'.join(candidate) + '\n') & fields:
+                lines = candidate
+                changed = True
+                break
+    return '\n'.join(lines) + '\n'
+
+# Командная строка
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m ri_difftest',
+        description='Сравнение исполнителей Ri с интерпретатором дерева без оптимизатора: '
+                    'вывод, графика, переменные.')
+    parser.add_argument('programs', nargs='*', metavar='FILE',
+                        help='программы .ri; без них - случайные программы')
+    parser.add_argument('--engine', action='append', choices=sorted(ENGINES),
+                        help='сравниваемый исполнитель (можно несколько; по умолчанию все)')
+    parser.add_argument('--count', type=int, default=200, metavar='N', help='число случайных программ')
+    parser.add_argument('--seed', type=int, default=0, help='начальное зерно генератора')
+    parser.add_argument('--save', metavar='DIR', help='сохранить уменьшенные программы с расхождениями')
+    parser.add_argument('--no-minimize', action='store_true', help='не уменьшать программы с расхождениями')
+    return parser
+
+def report(name, engine, differences):
+    print(f"{name}: {REFERENCE_ENGINE} без оптимизатора и {engine} расходятся")
+    for field, description in differences:
+        print(f"    {field}: {description}")
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    engines = args.engine or sorted(ENGINES)
+
+    if args.programs:
+        cases = []
+        for path in args.programs:
+            try:
+                with open(path, 'r', encoding='utf-8') as file:
+                    cases.append((path, file.read(), 0))
+            except OSError as e:
+                parser.error(f"не удалось прочитать программу: {e}")
+    else:
+        cases = ((f"программа {seed}", ProgramGenerator(seed).generate(), seed)
+                 for seed in range(args.seed, args.seed + args.count))
+
+    checked = failed = 0
+    for name, code, seed in cases:
+        checked += 1
+        found = compare_engines(code, engines, seed)
+        if not found:
+            continue
+        failed += 1
+        for engine, differences in found.items():
+            program = code
+            if not args.no_minimize:
+                program = minimize(code, engine, seed)
+                differences = compare_engines(program, (engine,), seed).get(engine, differences)
+            report(name, engine, differences)
+            if args.save:
+                os.makedirs(args.save, exist_ok=True)
+                path = os.path.join(args.save, f"{engine}_{seed}.ri")
+                with open(path, 'w', encoding='utf-8') as file:
+                    file.write(program)
+                print(f"    сохранено: {path}")
+    print(f"Проверено программ: {checked}, с расхождениями: {failed}", file=sys.stderr)
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,468 @@
+# Ri Language v2.13.1 - Примеры программ Ri из IDE
+# Создано программистом KITTEN в 2025 году
+#
+# Примеры используются IDE (меню примеров) и замерами скорости (ri_benchmark)
+
+from ri_compiler import RI_LANGUAGE_VERSION, RI_LANGUAGE_CREATOR, RI_LANGUAGE_YEAR
+
+def sample_code(ide_version):
+    # Программа, открытая в редакторе при запуске IDE
+    return f"""// Ri {RI_LANGUAGE_VERSION} - Интерактивный язык программирования
+// Создано программистом {RI_LANGUAGE_CREATOR} в {RI_LANGUAGE_YEAR} году
+// Ri IDE v{ide_version} - Полнофункциональная среда разработки
+
+// Встроенные функции
+перем случайное_число = случайно(1, 100)
+перем список_чисел = [10, 20, 30, 40, 50]
+перем длина_списка = длина(список_чисел)
+
+вывести "Язык Ri {RI_LANGUAGE_VERSION} от {RI_LANGUAGE_CREATOR}"
+вывести "Случайное число: " + случайное_число
+вывести "Длина списка: " + длина_списка
+
+// Работа со списками
+перем сумма = 0
+перем i = 0
+
+цикл i < длина_списка
+    перем элемент = элемент(список_чисел, i)
+    перем сумма = сумма + элемент
+    вывести "Элемент [" + i + "] = " + элемент
+    перем i = i + 1
+конец
+
+вывести "Сумма элементов списка: " + сумма
+
+// Отладка: установите точку останова на следующей строке
+перем результат = корень(сумма)
+вывести "Корень из суммы: " + результат
+
+// Графика с обработкой событий
+окно 800 600 "Графика Ri от {RI_LANGUAGE_CREATOR}"
+
+перем x = 400
+перем y = 300
+перем скорость = 5
+
+цикл истина
+    очистить светло-голубой
+    
+    // Управление стрелками
+    если клавиша_нажата("влево") то
+        перем x = x - скорость
+    конец
+    если клавиша_нажата("вправо") то
+        перем x = x + скорость
+    конец
+    если клавиша_нажата("вверх") то
+        перем y = y - скорость
+    конец
+    если клавиша_нажата("вниз") то
+        перем y = y + скорость
+    конец
+    
+    // Ограничение границ
+    если x < 30 то перем x = 30 конец
+    если x > 770 то перем x = 770 конец
+    если y < 30 то перем y = 30 конец
+    если y > 570 то перем y = 570 конец
+    
+    // Рисуем объект
+    круг x y 30 красный
+    круг x y 20 белый
+    текст x y-50 "Ri {RI_LANGUAGE_VERSION}" черный
+    
+    // Показываем информацию
+    прямоугольник 10 10 300 120 белый
+    текст 160 30 "Ri IDE v{ide_version}" черный
+    текст 160 50 "Автор: {RI_LANGUAGE_CREATOR}" черный
+    текст 160 70 "X: " + x + " Y: " + y черный
+    текст 160 90 "F5 - запуск, F6 - отладка" черный
+    текст 160 110 "F9 - точка останова, F10 - шаг" черный
+    
+    // Выход по Escape
+    если клавиша_нажата("эскейп") то
+        остановить()
+    конец
+    
+    обновить_экран()
+    задержка 16
+конец
+"""
+
+DRAW_EXAMPLE = f"""// Пример: Интерактивная рисовалка
+// Создано программистом {RI_LANGUAGE_CREATOR} в {RI_LANGUAGE_YEAR} году
+
+окно 800 600 "Рисовалка Ri"
+
+перем цвет = "черный"
+перем размер = 5
+перем рисовать = ложь
+перем последний_х = 0
+перем последний_у = 0
+
+очистить белый
+текст 300 30 "Рисуй мышью! Ri IDE от {RI_LANGUAGE_CREATOR}" черный
+
+цикл истина
+    перем х = мышь_х()
+    перем у = мышь_у()
+    
+    если мышь_нажата() то
+        если не рисовать то
+            перем рисовать = истина
+            перем последний_х = х
+            перем последний_у = у
+        конец
+        
+        линия последний_х последний_у х у цвет
+        перем последний_х = х
+        перем последний_у = у
+    иначе
+        перем рисовать = ложь
+    конец
+    
+    если клавиша_нажата("1") то
+        перем цвет = "черный"
+    конец
+    если клавиша_нажата("2") то
+        перем цвет = "красный"
+    конец
+    если клавиша_нажата("3") то
+        перем цвет = "синий"
+    конец
+    если клавиша_нажата("4") то
+        перем цвет = "зеленый"
+    конец
+    
+    если клавиша_нажата("пробел") то
+        очистить белый
+        текст 300 30 "Рисуй мышью! Ri IDE от {RI_LANGUAGE_CREATOR}" черный
+    конец
+    
+    если клавиша_нажата("эскейп") то
+        остановить()
+    конец
+    
+    обновить_экран()
+    задержка 16
+конец
+"""
+
+TARGET_EXAMPLE = f"""// Пример: Игра "Стрельба по мишеням"
+// Создано программистом {RI_LANGUAGE_CREATOR} в {RI_LANGUAGE_YEAR} году
+
+окно 800 600 "Стрельба по мишеням"
+
+перем счет = 0
+перем мишени = [300, 200, 100, 400, 250]
+перем радиусы = [30, 40, 35, 45, 25]
+перем цвета = ["красный", "синий", "зеленый", "фиолетовый", "оранжевый"]
+перем скорость = 3
+
+цикл истина
+    очистить светло-голубой
+    
+    перем i = 0
+    цикл i < длина(мишени)
+        перем x = мишени[i]
+        перем y = радиусы[i] * 2
+        
+        перем x = x + скорость
+        если x > 800 то
+            перем x = 0
+        конец
+        мишени[i] = x
+        
+        круг x 100 радиусы[i] цвета[i]
+        круг x 100 радиусы[i]-5 белый
+        
+        перем i = i + 1
+    конец
+    
+    перем х = мышь_х()
+    перем у = мышь_у()
+    
+    круг х у 10 черный
+    линия х-15 у х+15 у красный
+    линия х у-15 х у+15 красный
+    
+    если мышь_нажата() то
+        перем i = 0
+        цикл i < длина(мишени)
+            перем мишень_x = мишени[i]
+            перем расстояние = корень((х - мишень_x)^2 + (у - 100)^2)
+            
+            если расстояние < радиусы[i] то
+                перем счет = счет + 1
+                мишени[i] = 900
+            конец
+            
+            перем i = i + 1
+        конец
+        
+        задержка 200
+    конец
+    
+    прямоугольник 10 10 200 60 белый
+    текст 110 30 "Счет: " + счет черный
+    текст 110 50 "Ri IDE от {RI_LANGUAGE_CREATOR}" черный
+    
+    если клавиша_нажата("эскейп") то
+        остановить()
+    конец
+    
+    обновить_экран()
+    задержка 16
+конец
+"""
+
+KEYBOARD_EXAMPLE = f"""// Пример: Управление объектом клавиатурой
+// Создано программистом {RI_LANGUAGE_CREATOR} в {RI_LANGUAGE_YEAR} году
+
+окно 800 600 "Управление клавиатурой"
+
+перем x = 400
+перем y = 300
+перем скорость = 5
+перем цвет = "красный"
+
+очистить белый
+текст 300 30 "Ri IDE от {RI_LANGUAGE_CREATOR} - Управление клавиатурой" черный
+
+цикл истина
+    очистить белый
+    текст 300 30 "Ri IDE от {RI_LANGUAGE_CREATOR} - Управление клавиатурой" черный
+    
+    если клавиша_нажата("влево") то
+        перем x = x - скорость
+    конец
+    если клавиша_нажата("вправо") то
+        перем x = x + скорость
+    конец
+    если клавиша_нажата("вверх") то
+        перем y = y - скорость
+    конец
+    если клавиша_нажата("вниз") то
+        перем y = y + скорость
+    конец
+    
+    если клавиша_нажата("пробел") то
+        перем y = y - 50
+        задержка 100
+        перем y = y + 50
+    конец
+    
+    если клавиша_нажата("1") то
+        перем цвет = "красный"
+    конец
+    если клавиша_нажата("2") то
+        перем цвет = "синий"
+    конец
+    если клавиша_нажата("3") то
+        перем цвет = "зеленый"
+    конец
+    если клавиша_нажата("4") то
+        перем цвет = "желтый"
+    конец
+    
+    если x < 50 то
+        перем x = 50
+    конец
+    если x > 750 то
+        перем x = 750
+    конец
+    если y < 50 то
+        перем y = 50
+    конец
+    если y > 550 то
+        перем y = 550
+    конец
+    
+    круг x y 30 цвет
+    круг x-10 y-10 5 черный
+    круг x+10 y-10 5 черный
+    
+    прямоугольник 10 10 200 80 светло-голубой
+    текст 110 30 "X: " + x черный
+    текст 110 50 "Y: " + y черный
+    текст 110 70 "Автор: {RI_LANGUAGE_CREATOR}" черный
+    
+    если клавиша_нажата("эскейп") то
+        остановить()
+    конец
+    
+    обновить_экран()
+    задержка 16
+конец
+"""
+
+CAR_EXAMPLE = f"""// Пример: Вождение машинки
+// Создано программистом {RI_LANGUAGE_CREATOR} в {RI_LANGUAGE_YEAR} году
+
+окно 800 600 "Вождение машинки"
+
+перем x = 400
+перем y = 500
+перем скорость = 0
+перем поворот = 0
+
+очистить светло-зеленый
+
+цикл истина
+    прямоугольник 200 0 400 600 серый
+    
+    перем i = 0
+    цикл i < 12
+        прямоугольник 390 i*50 20 30 желтый
+        перем i = i + 1
+    конец
+    
+    если клавиша_нажата("влево") то
+        перем поворот = поворот - 2
+    конец
+    если клавиша_нажата("вправо") то
+        перем поворот = поворот + 2
+    конец
+    если клавиша_нажата("вверх") то
+        перем скорость = скорость + 0.2
+    конец
+    если клавиша_нажата("вниз") то
+        перем скорость = скорость - 0.2
+    конец
+    
+    если клавиша_нажата("пробел") то
+        перем скорость = скорость * 0.9
+    конец
+    
+    если скорость > 10 то
+        перем скорость = 10
+    конец
+    если скорость < -3 то
+        перем скорость = -3
+    конец
+    если поворот > 30 то
+        перем поворот = 30
+    конец
+    если поворот < -30 то
+        перем поворот = -30
+    конец
+    
+    перем x = x + скорость * синус(поворот)
+    перем y = y - скорость * косинус(поворот)
+    
+    если x < 250 то
+        перем x = 250
+        перем скорость = скорость * 0.5
+    конец
+    если x > 550 то
+        перем x = 550
+        перем скорость = скорость * 0.5
+    конец
+    если y < 0 то
+        перем y = 600
+    конец
+    если y > 600 то
+        перем y = 0
+    конец
+    
+    прямоугольник x-30 y-15 60 30 красный
+    прямоугольник x-40 y+15 80 10 темно-серый
+    круг x-25 y+25 10 черный
+    круг x+25 y+25 10 черный
+    
+    прямоугольник x-20 y-10 40 10 голубой
+    
+    если скорость > 0 то
+        круг x+35 y 5 желтый
+    конец
+    если скорость < 0 то
+        круг x-35 y 5 желтый
+    конец
+    
+    прямоугольник 10 10 200 100 белый
+    текст 110 30 "Скорость: " + округлить(скорость, 1) черный
+    текст 110 50 "Поворот: " + округлить(поворот, 1) черный
+    текст 110 70 "Автор: {RI_LANGUAGE_CREATOR}" черный
+    
+    если клавиша_нажата("эскейп") то
+        остановить()
+    конец
+    
+    перем поворот = поворот * 0.95
+    
+    обновить_экран()
+    задержка 16
+конец
+"""
+
+# Короткие примеры окна "Примеры интерактивных программ"
+GALLERY_EXAMPLES = {
+    "Рисовалка": f"""окно 800 600 "Рисовалка"
+// Создано {RI_LANGUAGE_CREATOR} в {RI_LANGUAGE_YEAR}
+
+цикл истина
+    перем х = мышь_х()
+    перем у = мышь_у()
+    
+    если мышь_нажата() то
+        круг х у 10 красный
+    конец
+    
+    обновить_экран()
+конец""",
+    "Управление": f"""окно 600 400 "Управление"
+// Создано {RI_LANGUAGE_CREATOR} в {RI_LANGUAGE_YEAR}
+
+перем x = 300
+перем y = 200
+
+цикл истина
+    очистить белый
+    
+    если клавиша_нажата("влево") то
+        перем x = x - 5
+    конец
+    если клавиша_нажата("вправо") то
+        перем x = x + 5
+    конец
+    
+    круг x y 30 синий
+    обновить_экран()
+конец""",
+    "Игра": f"""окно 800 600 "Ловля шариков"
+// Создано {RI_LANGUAGE_CREATOR} в {RI_LANGUAGE_YEAR}
+
+перем счет = 0
+перем шарик_x = 400
+перем шарик_y = 50
+
+цикл истина
+    очистить белый
+    
+    перем шарик_y = шарик_y + 3
+    если шарик_y > 600 то
+        перем шарик_y = 0
+        перем шарик_x = случайно(100, 700)
+    конец
+    
+    круг шарик_x шарик_y 30 красный
+    
+    перем х = мышь_х()
+    перем у = мышь_у()
+    
+    прямоугольник х-50 550 100 20 синий
+    
+    если шарик_y > 530 и шарик_y < 570 и 
+       шарик_x > х-50 и шарик_x < х+50 то
+        перем счет = счет + 1
+        перем шарик_y = 0
+        перем шарик_x = случайно(100, 700)
+    конец
+    
+    текст 100 50 "Счет: " + счет черный
+    
+    обновить_экран()
+    задержка 16
+конец""",
+}
@@ -11,6 +11,7 @@ import os
 import subprocess
 import json
 import traceback
+from collections import deque
 
 try:
     from ri_compiler import run_ri_code, RI_LANGUAGE_VERSION, RI_LANGUAGE_CREATOR, RI_LANGUAGE_YEAR
@@ -20,6 +21,8 @@ except ImportError:
     RI_LANGUAGE_VERSION = ri_compiler.RI_LANGUAGE_VERSION
     RI_LANGUAGE_CREATOR = ri_compiler.RI_LANGUAGE_CREATOR
     RI_LANGUAGE_YEAR = ri_compiler.RI_LANGUAGE_YEAR
+from ri_examples import (sample_code, DRAW_EXAMPLE, TARGET_EXAMPLE, KEYBOARD_EXAMPLE,
+                         CAR_EXAMPLE, GALLERY_EXAMPLES)
 
 class LineNumbers(tk.Canvas):
     def __init__(self, parent, text_widget, **kwargs):
@@ -39,9 +42,14 @@ class LineNumbers(tk.Canvas):
         self.text_widget.bind('<Button-4>', self._redraw)
         self.text_widget.bind('<Button-5>', self._redraw)
         
-        self.breakpoints = set()
+        # Номер строки -> настройки точки останова (condition, hit_count, log_message)
+        self.breakpoints = {}
         self.bind('<Button-1>', self._toggle_breakpoint)
+        self.bind('<Button-3>', self._edit_breakpoint)
+        self.on_breakpoints_changed = None
         self.current_execution_line = None
+        # Профиль последнего запуска: номер строки -> (подпись, доля от самой долгой строки)
+        self.profile = {}
         
     def _redraw(self, event=None):
         try:
@@ -73,6 +81,26 @@ class LineNumbers(tk.Canvas):
                             tags=f'current_line_{line_num}'
                         )
                     
+                    # Профиль: полоса по собственному времени строки и подпись
+                    annotation = self.profile.get(line_num)
+                    if annotation is not None:
+                        label, fraction = annotation
+                        self.create_rectangle(
+                            24, y + 1, 24 + max(1, int(fraction * (self.profile_width - 10))),
+                            y + line_height - 1,
+                            fill='#6b3030',
+                            outline='',
+                            tags=f'profile_{line_num}'
+                        )
+                        self.create_text(
+                            26, y,
+                            text=label,
+                            anchor='nw',
+                            fill='#d7ba7d',
+                            font=("Consolas", 9),
+                            tags=f'profile_{line_num}'
+                        )
+                    
                     # Номер строки
                     self.create_text(
                         self.winfo_width() - 10, y,
@@ -83,14 +111,26 @@ class LineNumbers(tk.Canvas):
                         tags=f'line_{line_num}'
                     )
                     
-                    # Точки останова
-                    if line_num in self.breakpoints:
-                        self.create_oval(
-                            10, y + 2, 20, y + line_height - 2,
-                            fill='#ff5555',
-                            outline='#ff5555',
-                            tags=f'breakpoint_{line_num}'
-                        )
+                    # Точки останова: красная - обычная, оранжевая - с условием
+                    # или счетчиком, синий ромб - точка журнала
+                    settings = self.breakpoints.get(line_num)
+                    if settings is not None:
+                        if settings.get('log_message'):
+                            middle = y + line_height / 2
+                            self.create_polygon(
+                                15, y + 2, 20, middle, 15, y + line_height - 2, 10, middle,
+                                fill='#4fa3ff',
+                                outline='#4fa3ff',
+                                tags=f'breakpoint_{line_num}'
+                            )
+                        else:
+                            color = '#ffa040' if settings.get('condition') or settings.get('hit_count') else '#ff5555'
+                            self.create_oval(
+                                10, y + 2, 20, y + line_height - 2,
+                                fill=color,
+                                outline=color,
+                                tags=f'breakpoint_{line_num}'
+                            )
         except Exception as e:
             # Игнорируем ошибки отрисовки
             pass
@@ -103,17 +143,35 @@ class LineNumbers(tk.Canvas):
             line_num = int(self.text_widget.index(f'@0,{event.y}').split('.')[0])
             
             if line_num in self.breakpoints:
-                self.breakpoints.remove(line_num)
+                del self.breakpoints[line_num]
             else:
-                self.breakpoints.add(line_num)
+                self.breakpoints[line_num] = {}
             
-            self._redraw()
+            self._breakpoints_changed()
+        except:
+            pass
+    
+    def _edit_breakpoint(self, event):
+        try:
+            line_num = int(self.text_widget.index(f'@0,{event.y}').split('.')[0])
+            dialog = BreakpointDialog(self, line_num, self.breakpoints.get(line_num, {}))
+            if dialog.result is not None:
+                self.breakpoints[line_num] = dialog.result
+                self._breakpoints_changed()
         except:
             pass
     
+    def _breakpoints_changed(self):
+        self._redraw()
+        if self.on_breakpoints_changed:
+            self.on_breakpoints_changed()
+    
     def get_breakpoints(self):
         return sorted(self.breakpoints)
     
+    def get_breakpoint_settings(self, line_num):
+        return self.breakpoints.get(line_num, {})
+    
     def set_execution_line(self, line_num):
         self.current_execution_line = line_num
         self._redraw()
@@ -125,6 +183,62 @@ class LineNumbers(tk.Canvas):
     def clear_all_breakpoints(self):
         self.breakpoints.clear()
         self._redraw()
+    
+    profile_width = 120
+    
+    def set_profile(self, annotations):
+        self.profile = annotations
+        self.config(width=60 + self.profile_width)
+        self._redraw()
+    
+    def clear_profile(self):
+        if self.profile:
+            self.profile = {}
+            self.config(width=60)
+            self._redraw()
+
+class BreakpointDialog(simpledialog.Dialog):
+    # Настройка точки останова: условие, счетчик проходов, сообщение журнала
+    def __init__(self, parent, line_num, settings):
+        self.line_num = line_num
+        self.settings = settings
+        super().__init__(parent, f"Точка останова в строке {line_num}")
+    
+    def body(self, master):
+        labels = ("Условие (выражение Ri):", "Остановить с прохода №:",
+                  "Сообщение журнала ({выражение}):")
+        values = (self.settings.get('condition') or "",
+                  str(self.settings.get('hit_count') or ""),
+                  self.settings.get('log_message') or "")
+        self.entries = []
+        for row, (label, value) in enumerate(zip(labels, values)):
+            tk.Label(master, text=label).grid(row=row, column=0, sticky='w', padx=5, pady=2)
+            entry = tk.Entry(master, width=40, font=("Consolas", 10))
+            entry.insert(0, value)
+            entry.grid(row=row, column=1, padx=5, pady=2)
+            self.entries.append(entry)
+        tk.Label(master, text="С сообщением программа не останавливается",
+                 foreground='gray').grid(row=3, column=0, columnspan=2, sticky='w', padx=5)
+        return self.entries[0]
+    
+    def validate(self):
+        condition, hit_count, log_message = (entry.get().strip() for entry in self.entries)
+        try:
+            hit_count = int(hit_count) if hit_count else None
+            if hit_count is not None and hit_count < 1:
+                raise ValueError("номер прохода должен быть больше нуля")
+            # Проверяем разбор так же, как его выполнит интерпретатор
+            from ri_compiler import Breakpoint
+            Breakpoint(self.line_num, condition, hit_count, log_message)
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Неверная точка останова: {e}", parent=self)
+            return False
+        self.settings = {'condition': condition or None, 'hit_count': hit_count,
+                         'log_message': log_message or None}
+        return True
+    
+    def apply(self):
+        self.result = self.settings
 
 class Autocomplete:
     def __init__(self, text_widget, ide):
@@ -718,6 +832,70 @@ class GraphicsWindow:
         }
         return colors.get(color_name.lower(), color_name)
 
+class DebugEventBuffer:
+    # Очередь сообщений отладчика с объединением: от частых сообщений хранится
+    # только последняя строка, объединенные изменения переменных и последний
+    # стек вызовов; остальные сообщения - в ограниченной очереди
+    max_events = 500
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+    
+    def clear(self):
+        with self.lock:
+            self.line = None
+            self.changed_variables = {}
+            self.removed_variables = set()
+            self.call_stack = None
+            self.events = deque(maxlen=self.max_events)
+            self.dropped = 0
+    
+    def put(self, message):
+        msg_type, data = message
+        with self.lock:
+            if msg_type == "line_executed":
+                self.line = data
+            elif msg_type == "variables_changed":
+                changed, removed = data
+                for var_name in removed:
+                    self.changed_variables.pop(var_name, None)
+                    self.removed_variables.add(var_name)
+                for var_name, var_value in changed.items():
+                    self.removed_variables.discard(var_name)
+                    self.changed_variables[var_name] = var_value
+            elif msg_type == "call_stack_updated":
+                # Интерпретатор передает свой список - сохраняем копию
+                self.call_stack = list(data)
+            else:
+                if msg_type in ("breakpoint_hit", "step_hit"):
+                    # Строка остановки новее, чем последняя выполненная
+                    self.line = data
+                if len(self.events) == self.max_events:
+                    # Самое старое сообщение вытесняется
+                    self.dropped += 1
+                self.events.append(message)
+    
+    def drain(self):
+        # Все накопленное за такт интерфейса; сообщения об остановке и завершении -
+        # после строки и переменных, чтобы их состояние было последним
+        with self.lock:
+            messages = []
+            if self.line is not None:
+                messages.append(("line_executed", self.line))
+            if self.changed_variables or self.removed_variables:
+                messages.append(("variables_changed",
+                                 (self.changed_variables, list(self.removed_variables))))
+            if self.call_stack is not None:
+                messages.append(("call_stack_updated", self.call_stack))
+            messages.extend(self.events)
+            self.line = None
+            self.changed_variables = {}
+            self.removed_variables = set()
+            self.call_stack = None
+            self.events.clear()
+        return messages
+
 class RiIDE:
     def __init__(self, root):
         self.root = root
@@ -729,7 +907,7 @@ class RiIDE:
         self.input_queue = queue.Queue()
         self.graphics_queue = queue.Queue()
         self.event_queue = queue.Queue()
-        self.debug_queue = queue.Queue()
+        self.debug_queue = DebugEventBuffer()
         
         self.event_handlers = {
             "mouse_move": None,
@@ -750,6 +928,16 @@ class RiIDE:
         self.breakpoints = set()
         self.call_stack = []
         self.compiler_instance = None
+        # Счетчики текущего (или только что завершенного) запуска
+        self.run_metrics = None
+        # Строки дерева переменных: имя -> элемент Treeview
+        self.variable_rows = {}
+        # Наблюдения: имя переменной или списка -> условие (или None)
+        self.watches = {}
+        # Просматриваемый шаг истории при отладке (None - текущее состояние)
+        self.history_step = None
+        self.last_profile = None
+        self.last_coverage = None
         
         self.git_integration = None
         self.current_project_path = None
@@ -764,6 +952,7 @@ class RiIDE:
         self.root.after(100, self.process_graphics_queue)
         self.root.after(50, self.process_events)
         self.root.after(100, self.process_debug_queue)
+        self.root.after(250, self.process_metrics)
         
         self.setup_shortcuts()
         
@@ -791,6 +980,16 @@ class RiIDE:
         run_menu = tk.Menu(menubar, tearoff=0)
         run_menu.add_command(label="▶ Запуск (F5)", command=self.run_code, accelerator="F5")
         run_menu.add_command(label="▶ Отладка (F6)", command=self.start_debug, accelerator="F6")
+        run_menu.add_command(label="📈 Профилировать (Ctrl+F5)", command=self.run_profile, accelerator="Ctrl+F5")
+        run_menu.add_command(label="📉 Профилировать выборкой (Ctrl+Shift+F5)", command=self.run_sampling_profile, accelerator="Ctrl+Shift+F5")
+        run_menu.add_command(label="💾 Экспорт профиля...", command=self.export_profile)
+        run_menu.add_separator()
+        run_menu.add_command(label="🧪 Покрытие (Ctrl+F6)", command=self.run_coverage, accelerator="Ctrl+F6")
+        run_menu.add_command(label="💾 Экспорт покрытия (LCOV)...", command=self.export_coverage)
+        # Счетчики замедляют выполнение, поэтому включаются только по желанию
+        self.metrics_enabled = tk.BooleanVar(value=False)
+        run_menu.add_checkbutton(label="📊 Счетчики выполнения", variable=self.metrics_enabled,
+                                 command=self.toggle_metrics)
         run_menu.add_command(label="■ Остановить", command=self.stop_execution)
         run_menu.add_separator()
         run_menu.add_command(label="🎨 Открыть графику", command=self.open_graphics_window)
@@ -803,6 +1002,8 @@ class RiIDE:
         debug_menu.add_command(label="▶ Продолжить (F8)", command=self.debug_continue, accelerator="F8")
         debug_menu.add_command(label="➡ Шаг вперед (F10)", command=self.debug_step_over, accelerator="F10")
         debug_menu.add_command(label="⬇ Шаг внутрь (F11)", command=self.debug_step_into, accelerator="F11")
+        debug_menu.add_command(label="⏪ Назад по истории (Shift+F10)", command=self.history_back, accelerator="Shift+F10")
+        debug_menu.add_command(label="⏩ Вперед по истории (Ctrl+F10)", command=self.history_forward, accelerator="Ctrl+F10")
         debug_menu.add_separator()
         debug_menu.add_command(label="🔴 Установить точку останова (F9)", command=self.toggle_breakpoint, accelerator="F9")
         debug_menu.add_command(label="🧹 Очистить все точки останова", command=self.clear_all_breakpoints)
@@ -897,6 +1098,7 @@ class RiIDE:
             bg='#2d2d2d'
         )
         self.line_numbers.pack(side=tk.LEFT, fill=tk.Y)
+        self.line_numbers.on_breakpoints_changed = self.refresh_breakpoints_list
         
         self.code_editor.bind('<KeyRelease>', 
                              lambda e: (self.highlight_syntax(), self.line_numbers._redraw()))
@@ -987,6 +1189,14 @@ class RiIDE:
         
         scrollbar = ttk.Scrollbar(variables_frame, orient="vertical", command=self.variables_tree.yview)
         self.variables_tree.configure(yscrollcommand=scrollbar.set)
+        self.variables_tree.tag_configure('watched', foreground='#c05000')
+        
+        watch_buttons = tk.Frame(variables_frame)
+        watch_buttons.pack(side=tk.BOTTOM, fill=tk.X)
+        tk.Button(watch_buttons, text="👁 Следить", command=self.add_watch,
+                  font=("Arial", 9)).pack(side=tk.LEFT, padx=2, pady=2)
+        tk.Button(watch_buttons, text="✖ Не следить", command=self.remove_watch,
+                  font=("Arial", 9)).pack(side=tk.LEFT, padx=2, pady=2)
         
         self.variables_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
@@ -1109,6 +1319,16 @@ class RiIDE:
         )
         self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)
         
+        # Счетчики выполнения обычного запуска, обновляются во время работы программы
+        self.metrics_bar = ttk.Label(
+            self.root,
+            text="",
+            relief=tk.SUNKEN,
+            padding=(5, 2),
+            font=("Arial", 9)
+        )
+        self.metrics_bar.pack(side=tk.BOTTOM, fill=tk.X)
+        
         self.current_file = None
         
     def setup_tags(self):
@@ -1121,6 +1341,9 @@ class RiIDE:
         self.code_editor.tag_configure("events", foreground="#C586C0")
         self.code_editor.tag_configure("function", foreground="#4EC9B0")
         self.code_editor.tag_configure("list", foreground="#9CDCFE")
+        # Покрытие: невыполненные строки и строки "если" с невыполненной веткой
+        self.code_editor.tag_configure("uncovered", background="#4b1e1e")
+        self.code_editor.tag_configure("partial", background="#4b421e")
         
     def highlight_syntax(self, event=None):
         try:
@@ -1222,90 +1445,8 @@ class RiIDE:
             print(f"Ошибка подсветки синтаксиса: {e}")
     
     def insert_sample_code(self):
-        sample = f"""// Ri {RI_LANGUAGE_VERSION} - Интерактивный язык программирования
-// Создано программистом {RI_LANGUAGE_CREATOR} в {RI_LANGUAGE_YEAR} году
-// Ri IDE v{self.ide_version} - Полнофункциональная среда разработки
-
-// Встроенные функции
-перем случайное_число = случайно(1, 100)
-перем список_чисел = [10, 20, 30, 40, 50]
-перем длина_списка = длина(список_чисел)
-
-вывести "Язык Ri {RI_LANGUAGE_VERSION} от {RI_LANGUAGE_CREATOR}"
-вывести "Случайное число: " + случайное_число
-вывести "Длина списка: " + длина_списка
-
-// Работа со списками
-перем сумма = 0
-перем i = 0
-
-цикл i < длина_списка
-    перем элемент = элемент(список_чисел, i)
-    перем сумма = сумма + элемент
-    вывести "Элемент [" + i + "] = " + элемент
-    перем i = i + 1
-конец
-
-вывести "Сумма элементов списка: " + сумма
-
-// Отладка: установите точку останова на следующей строке
-перем результат = корень(сумма)
-вывести "Корень из суммы: " + результат
-
-// Графика с обработкой событий
-окно 800 600 "Графика Ri от {RI_LANGUAGE_CREATOR}"
-
-перем x = 400
-перем y = 300
-перем скорость = 5
-
-цикл истина
-    очистить светло-голубой
-    
-    // Управление стрелками
-    если клавиша_нажата("влево") то
-        перем x = x - скорость
-    конец
-    если клавиша_нажата("вправо") то
-        перем x = x + скорость
-    конец
-    если клавиша_нажата("вверх") то
-        перем y = y - скорость
-    конец
-    если клавиша_нажата("вниз") то
-        перем y = y + скорость
-    конец
-    
-    // Ограничение границ
-    если x < 30 то перем x = 30 конец
-    если x > 770 то перем x = 770 конец
-    если y < 30 то перем y = 30 конец
-    если y > 570 то перем y = 570 конец
-    
-    // Рисуем объект
-    круг x y 30 красный
-    круг x y 20 белый
-    текст x y-50 "Ri {RI_LANGUAGE_VERSION}" черный
-    
-    // Показываем информацию
-    прямоугольник 10 10 300 120 белый
-    текст 160 30 "Ri IDE v{self.ide_version}" черный
-    текст 160 50 "Автор: {RI_LANGUAGE_CREATOR}" черный
-    текст 160 70 "X: " + x + " Y: " + y черный
-    текст 160 90 "F5 - запуск, F6 - отладка" черный
-    текст 160 110 "F9 - точка останова, F10 - шаг" черный
-    
-    // Выход по Escape
-    если клавиша_нажата("эскейп") то
-        остановить()
-    конец
-    
-    обновить_экран()
-    задержка 16
-конец
-"""
         self.code_editor.delete(1.0, tk.END)
-        self.code_editor.insert(1.0, sample)
+        self.code_editor.insert(1.0, sample_code(self.ide_version))
         self.highlight_syntax()
     
     def setup_shortcuts(self):
@@ -1313,6 +1454,9 @@ class RiIDE:
         self.root.bind('<Control-o>', lambda e: self.open_file())
         self.root.bind('<Control-s>', lambda e: self.save_file())
         self.root.bind('<F5>', lambda e: self.run_code())
+        self.root.bind('<Control-F5>', lambda e: self.run_profile())
+        self.root.bind('<Control-Shift-F5>', lambda e: self.run_sampling_profile())
+        self.root.bind('<Control-F6>', lambda e: self.run_coverage())
         self.root.bind('<F6>', lambda e: self.start_debug())
         self.root.bind('<F7>', lambda e: self.debug_pause())
         self.root.bind('<F8>', lambda e: self.debug_continue())
@@ -1320,6 +1464,8 @@ class RiIDE:
         self.root.bind('<F10>', lambda e: self.debug_step_over())
         self.root.bind('<F11>', lambda e: self.debug_step_into())
         self.root.bind('<Shift-F11>', lambda e: self.debug_step_out())
+        self.root.bind('<Shift-F10>', lambda e: self.history_back())
+        self.root.bind('<Control-F10>', lambda e: self.history_forward())
         self.root.bind('<Return>', lambda e: self.send_input_if_active())
         self.root.bind('<Control-g>', lambda e: self.git_status())
         self.root.bind('<Control-Shift-g>', lambda e: self.git_commit())
@@ -1328,7 +1474,17 @@ class RiIDE:
         if self.waiting_for_input and self.input_entry.get():
             self.send_input()
     
-    def run_code(self):
+    def run_profile(self):
+        self.run_code(mode="lines")
+    
+    def run_sampling_profile(self):
+        # Для долгих программ и игр: почти без замедления, но приблизительно
+        self.run_code(mode="sampling")
+    
+    def run_coverage(self):
+        self.run_code(mode="coverage")
+    
+    def run_code(self, mode=None):
         if self.is_running:
             messagebox.showwarning("Внимание", "Программа уже выполняется!")
             return
@@ -1336,7 +1492,10 @@ class RiIDE:
         self.is_running = True
         self.debug_mode = False
         self.is_paused = False
-        self.status_bar.config(text="▶ Выполнение программы...")
+        if mode == "coverage":
+            self.status_bar.config(text="🧪 Выполнение с покрытием...")
+        else:
+            self.status_bar.config(text="📈 Профилирование программы..." if mode else "▶ Выполнение программы...")
         self.debug_label.config(text="Отладка: выключена", foreground="gray")
         
         self.console_output.config(state=tk.NORMAL)
@@ -1348,9 +1507,13 @@ class RiIDE:
         self.waiting_for_input = False
         
         self.line_numbers.clear_execution_line()
+        self.line_numbers.clear_profile()
+        self.clear_coverage()
         self.variables_tree.delete(*self.variables_tree.get_children())
+        self.variable_rows = {}
+        self.debug_queue.clear()
         self.stack_listbox.delete(0, tk.END)
-        self.breakpoints_listbox.delete(0, tk.END)
+        self.refresh_breakpoints_list()
         
         if self.graphics_window:
             try:
@@ -1361,7 +1524,7 @@ class RiIDE:
         
         code = self.code_editor.get(1.0, tk.END)
         
-        thread = threading.Thread(target=self.execute_code, args=(code,))
+        thread = threading.Thread(target=self.execute_code, args=(code, mode))
         thread.daemon = True
         thread.start()
     
@@ -1385,9 +1548,13 @@ class RiIDE:
         self.waiting_for_input = False
         
         self.line_numbers.clear_execution_line()
+        self.line_numbers.clear_profile()
+        self.clear_coverage()
         self.variables_tree.delete(*self.variables_tree.get_children())
+        self.variable_rows = {}
+        self.debug_queue.clear()
         self.stack_listbox.delete(0, tk.END)
-        self.breakpoints_listbox.delete(0, tk.END)
+        self.refresh_breakpoints_list()
         
         if self.graphics_window:
             try:
@@ -1402,7 +1569,7 @@ class RiIDE:
         thread.daemon = True
         thread.start()
     
-    def execute_code(self, code):
+    def execute_code(self, code, mode=None):
         try:
             def graphics_callback(commands):
                 try:
@@ -1456,7 +1623,20 @@ class RiIDE:
             if self.debug_mode:
                 self.compiler_instance.debug_mode = True
                 for bp in self.line_numbers.get_breakpoints():
-                    self.compiler_instance.add_breakpoint(bp)
+                    self.compiler_instance.add_breakpoint(bp, **self.line_numbers.get_breakpoint_settings(bp))
+                for name, condition in self.watches.items():
+                    self.compiler_instance.add_watchpoint(name, condition)
+                self.compiler_instance.enable_time_travel()
+                self.history_step = None
+            elif mode == "lines":
+                self.compiler_instance.enable_profiling()
+            elif mode == "sampling":
+                self.compiler_instance.enable_sampling()
+            elif mode == "coverage":
+                self.compiler_instance.enable_coverage()
+            # Счетчики ведутся только на обычном пути (без отладки и профилирования)
+            if self.metrics_enabled.get():
+                self.compiler_instance.enable_metrics()
             
             result = self.compiler_instance.execute(
                 code, 
@@ -1468,6 +1648,14 @@ class RiIDE:
             
             if result:
                 self.output_queue.put(("output", "\n" + result))
+            if self.compiler_instance.get_profile() is not None:
+                self.output_queue.put(("profile", self.compiler_instance.get_profile()))
+            if self.compiler_instance.get_sampling_profile() is not None:
+                self.output_queue.put(("sampling_profile", self.compiler_instance.get_sampling_profile()))
+            if self.compiler_instance.get_coverage() is not None:
+                self.output_queue.put(("coverage", self.compiler_instance.get_coverage()))
+            if self.compiler_instance.get_metrics() is not None:
+                self.output_queue.put(("metrics", self.compiler_instance.get_metrics()))
             
             self.output_queue.put(("status", "✓ Выполнение завершено"))
             self.debug_queue.put(("program_finished", ""))
@@ -1516,6 +1704,15 @@ class RiIDE:
                     
                 elif msg_type == "status":
                     self.status_bar.config(text=data)
+                    
+                elif msg_type == "profile":
+                    self.show_profile(data)
+                elif msg_type == "sampling_profile":
+                    self.show_sampling_profile(data)
+                elif msg_type == "coverage":
+                    self.show_coverage(data)
+                elif msg_type == "metrics":
+                    self.run_metrics = data
         
         except Exception as e:
             pass
@@ -1606,10 +1803,37 @@ class RiIDE:
         
         self.root.after(50, self.process_events)
     
+    def toggle_metrics(self):
+        if not self.metrics_enabled.get():
+            self.run_metrics = None
+            self.metrics_bar.config(text="")
+    
+    def process_metrics(self):
+        compiler = self.compiler_instance
+        if not self.metrics_enabled.get():
+            self.run_metrics = None
+        elif compiler is not None and compiler.get_metrics() is not None:
+            self.run_metrics = compiler.get_metrics()
+        if self.run_metrics is not None:
+            snapshot = self.run_metrics.snapshot()
+            self.metrics_bar.config(text=(
+                f"📊 операторов: {snapshot['statements_total']}  "
+                f"вычислений: {snapshot['evaluations']}  "
+                f"вызовов: {snapshot['builtin_calls']} встр. / {snapshot['user_calls']} польз.  "
+                f"итераций: {snapshot['loop_iterations']}  "
+                f"графика: {snapshot['graphics_commands']}  "
+                f"задержка: {snapshot['delay_time']:.2f} с из {snapshot['elapsed']:.2f} с"
+            ))
+            # Итог завершенного запуска показан, дальше не обновляется
+            if snapshot['finished']:
+                self.run_metrics = None
+        self.root.after(250, self.process_metrics)
+    
     def process_debug_queue(self):
+        changed_variables = {}
+        removed_variables = set()
         try:
-            while not self.debug_queue.empty():
-                msg_type, data = self.debug_queue.get_nowait()
+            for msg_type, data in self.debug_queue.drain():
                 
                 if msg_type == "line_executed":
                     self.current_debug_line = data
@@ -1627,33 +1851,33 @@ class RiIDE:
                     self.line_numbers.set_execution_line(data)
                     self.status_bar.config(text=f"⏸ Остановлено в строке {data} для пошагового выполнения")
                     
-                elif msg_type == "variables_updated":
-                    self.variables_tree.delete(*self.variables_tree.get_children())
-                    
-                    for var_name, var_value in data.items():
-                        var_type = type(var_value).__name__
-                        if var_type == 'int':
-                            var_type = "целое"
-                        elif var_type == 'float':
-                            var_type = "дробное"
-                        elif var_type == 'str':
-                            var_type = "строка"
-                        elif var_type == 'bool':
-                            var_type = "булево"
-                        elif var_type == 'list':
-                            var_type = "список"
-                        else:
-                            var_type = str(var_type)
-                        
-                        self.variables_tree.insert('', 'end', text=var_name, 
-                                                 values=(str(var_value), var_type))
+                elif msg_type == "variables_changed":
+                    # Изменения за один такт интерфейса объединяются и применяются разом
+                    changed, removed = data
+                    for var_name in removed:
+                        changed_variables.pop(var_name, None)
+                        removed_variables.add(var_name)
+                    for var_name, var_value in changed.items():
+                        removed_variables.discard(var_name)
+                        changed_variables[var_name] = var_value
                     
                 elif msg_type == "call_stack_updated":
-                    self.stack_listbox.delete(0, tk.END)
-                    self.call_stack = data
+                    self.show_call_stack(data)
                     
-                    for item in reversed(data):  # Исправлено: правильный порядок
-                        self.stack_listbox.insert(tk.END, item)
+                elif msg_type == "watch_hit":
+                    line_num, name, old_value, new_value = data
+                    self.is_paused = True
+                    self.current_debug_line = line_num
+                    self.line_numbers.set_execution_line(line_num)
+                    self.status_bar.config(
+                        text=f"👁 Строка {line_num}: {name} = {new_value} (было {old_value})")
+                    
+                elif msg_type == "logpoint":
+                    line_num, message = data
+                    self.console_output.config(state=tk.NORMAL)
+                    self.console_output.insert(tk.END, f"📝 [строка {line_num}] {message}\n")
+                    self.console_output.see(tk.END)
+                    self.console_output.config(state=tk.DISABLED)
                     
                 elif msg_type == "program_stopped":
                     self.status_bar.config(text="■ Программа остановлена пользователем")
@@ -1669,8 +1893,56 @@ class RiIDE:
         except Exception as e:
             pass
         
+        try:
+            self.apply_variable_changes(changed_variables, removed_variables)
+        except Exception:
+            pass
+        
         self.root.after(100, self.process_debug_queue)
     
+    def show_call_stack(self, call_stack):
+        self.stack_listbox.delete(0, tk.END)
+        self.call_stack = call_stack
+        
+        for item in reversed(call_stack):  # Исправлено: правильный порядок
+            self.stack_listbox.insert(tk.END, item)
+    
+    def show_variables(self, variables):
+        # Полная замена содержимого панели переменных
+        removed = [var_name for var_name in self.variable_rows if var_name not in variables]
+        self.apply_variable_changes(variables, removed)
+    
+    def apply_variable_changes(self, changed, removed):
+        # Обновляются только строки изменившихся переменных
+        for var_name in removed:
+            item = self.variable_rows.pop(var_name, None)
+            if item is not None:
+                self.variables_tree.delete(item)
+        
+        for var_name, var_value in changed.items():
+            values = (str(var_value), self.variable_type_name(var_value))
+            item = self.variable_rows.get(var_name)
+            if item is not None:
+                self.variables_tree.item(item, values=values)
+            else:
+                self.variable_rows[var_name] = self.variables_tree.insert(
+                    '', 'end', text=var_name, values=values,
+                    tags=('watched',) if var_name in self.watches else ())
+    
+    def variable_type_name(self, var_value):
+        var_type = type(var_value).__name__
+        if var_type == 'int':
+            return "целое"
+        elif var_type == 'float':
+            return "дробное"
+        elif var_type == 'str':
+            return "строка"
+        elif var_type == 'bool':
+            return "булево"
+        elif var_type == 'list':
+            return "список"
+        return str(var_type)
+    
     def send_input(self):
         if not self.waiting_for_input:
             return
@@ -1692,8 +1964,120 @@ class RiIDE:
             
             self.input_entry.delete(0, tk.END)
     
+    def show_profile(self, profiler):
+        self.last_profile = profiler
+        slowest = max((stats.self_time for stats in profiler.lines.values()), default=0) or 1
+        annotations = {}
+        for line_num, stats in profiler.lines.items():
+            label = f"{stats.hits}× {stats.self_time * 1000:.1f}мс"
+            annotations[line_num] = (label, stats.self_time / slowest)
+        self.line_numbers.set_profile(annotations)
+        
+        summary = [f"📈 Профиль: всего {profiler.total * 1000:.1f} мс, самые долгие строки:"]
+        for stats in profiler.hottest_lines(5):
+            summary.append(f"   строка {stats.line} ({stats.function}): {stats.hits}×, "
+                           f"собственное {stats.self_time * 1000:.1f} мс, всего {stats.total * 1000:.1f} мс")
+        self.console_output.config(state=tk.NORMAL)
+        self.console_output.insert(tk.END, '\n'.join(summary) + "\n")
+        self.console_output.see(tk.END)
+        self.console_output.config(state=tk.DISABLED)
+        self.status_bar.config(text="📈 Профиль готов: время строк показано слева от номеров")
+    
+    def show_sampling_profile(self, sampler):
+        self.last_profile = sampler
+        samples = sampler.line_samples()
+        busiest = max(samples.values(), default=0) or 1
+        total = sampler.samples or 1
+        annotations = {}
+        for line_num, count in samples.items():
+            annotations[line_num] = (f"{count * 100 / total:.1f}%", count / busiest)
+        self.line_numbers.set_profile(annotations)
+        
+        summary = [f"📉 Выборочный профиль: {sampler.samples} выборок за {sampler.total * 1000:.1f} мс, "
+                   f"самые частые строки:"]
+        for line_num, count in sorted(samples.items(), key=lambda item: item[1], reverse=True)[:5]:
+            summary.append(f"   строка {line_num}: {count} выборок ({count * 100 / total:.1f}%)")
+        self.console_output.config(state=tk.NORMAL)
+        self.console_output.insert(tk.END, '\n'.join(summary) + "\n")
+        self.console_output.see(tk.END)
+        self.console_output.config(state=tk.DISABLED)
+        self.status_bar.config(text="📉 Профиль готов: доля выборок показана слева от номеров")
+    
+    def export_profile(self):
+        if self.last_profile is None:
+            messagebox.showwarning("Внимание", "Сначала запустите профилирование (Ctrl+F5)!")
+            return
+        
+        from ri_profiler import SamplingProfiler
+        sampling = isinstance(self.last_profile, SamplingProfiler)
+        if sampling:
+            filetypes = [("Свернутые стеки (flame graph)", "*.folded"), ("JSON", "*.json"), ("Все файлы", "*.*")]
+        else:
+            filetypes = [("JSON", "*.json"), ("Callgrind", "callgrind.out.*"), ("Все файлы", "*.*")]
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".folded" if sampling else ".json",
+            filetypes=filetypes
+        )
+        if not filename:
+            return
+        
+        try:
+            if filename.endswith('.json'):
+                self.last_profile.write_json(filename)
+            elif sampling:
+                self.last_profile.write_collapsed(filename)
+            else:
+                source_name = os.path.basename(self.current_file) if self.current_file else "program.ri"
+                self.last_profile.write_callgrind(filename, source_name)
+            self.status_bar.config(text=f"✓ Профиль сохранен: {filename}")
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось сохранить профиль: {str(e)}")
+    
+    def show_coverage(self, coverage):
+        self.last_coverage = coverage
+        self.clear_coverage()
+        for line_num in coverage.uncovered_lines():
+            self.code_editor.tag_add("uncovered", f"{line_num}.0", f"{line_num + 1}.0")
+        for line_num, _, executed, then_taken, else_taken in coverage.branch_results():
+            if executed and not (then_taken and else_taken):
+                self.code_editor.tag_add("partial", f"{line_num}.0", f"{line_num + 1}.0")
+        
+        summary = coverage.summary()
+        lines = f"{summary['lines_covered']}/{summary['lines']}"
+        branches = f"{summary['branches_covered']}/{summary['branches']}"
+        self.console_output.config(state=tk.NORMAL)
+        self.console_output.insert(tk.END, f"🧪 Покрытие: строк {lines}, ветвей {branches}\n")
+        self.console_output.see(tk.END)
+        self.console_output.config(state=tk.DISABLED)
+        self.status_bar.config(text=f"🧪 Покрытие: строк {lines}, ветвей {branches} "
+                                    f"(красный - не выполнялась, желтый - не все ветви)")
+    
+    def clear_coverage(self):
+        self.code_editor.tag_remove("uncovered", "1.0", tk.END)
+        self.code_editor.tag_remove("partial", "1.0", tk.END)
+    
+    def export_coverage(self):
+        if self.last_coverage is None:
+            messagebox.showwarning("Внимание", "Сначала запустите программу с покрытием (Ctrl+F6)!")
+            return
+        
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".info",
+            filetypes=[("LCOV", "*.info"), ("Все файлы", "*.*")]
+        )
+        if not filename:
+            return
+        
+        try:
+            source_name = self.current_file if self.current_file else "program.ri"
+            self.last_coverage.write_lcov(filename, source_name)
+            self.status_bar.config(text=f"✓ Покрытие сохранено: {filename}")
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось сохранить покрытие: {str(e)}")
+    
     def debug_continue(self):
         if self.debug_mode and self.is_paused and self.compiler_instance:
+            self.leave_history()
             self.compiler_instance.continue_execution()
             self.is_paused = False
             self.status_bar.config(text="▶ Продолжение выполнения...")
@@ -1706,18 +2090,21 @@ class RiIDE:
     
     def debug_step_over(self):
         if self.debug_mode and self.is_paused and self.compiler_instance:
+            self.leave_history()
             self.compiler_instance.step_over()
             self.is_paused = False
             self.status_bar.config(text="➡ Шаг вперед...")
     
     def debug_step_into(self):
         if self.debug_mode and self.is_paused and self.compiler_instance:
+            self.leave_history()
             self.compiler_instance.step_into()
             self.is_paused = False
             self.status_bar.config(text="⬇ Шаг внутрь...")
     
     def debug_step_out(self):
         if self.debug_mode and self.is_paused and self.compiler_instance:
+            self.leave_history()
             self.compiler_instance.step_out()
             self.is_paused = False
             self.status_bar.config(text="⬆ Шаг наружу...")
@@ -1725,6 +2112,53 @@ class RiIDE:
     def debug_stop(self):
         self.stop_execution()
     
+    def history_back(self):
+        # Просмотр состояния на предыдущем шаге: ближайший снимок и изменения после него
+        if not (self.debug_mode and self.is_paused and self.compiler_instance):
+            return
+        history = self.compiler_instance.get_history_range()
+        if history is None:
+            self.status_bar.config(text="История выполнения недоступна")
+            return
+        first, last = history
+        step = (self.history_step if self.history_step is not None else last) - 1
+        if step < first:
+            self.status_bar.config(text="⏪ Начало сохраненной истории")
+            return
+        self.show_history_step(step, last)
+    
+    def history_forward(self):
+        if not (self.debug_mode and self.is_paused and self.compiler_instance):
+            return
+        if self.history_step is None:
+            return
+        history = self.compiler_instance.get_history_range()
+        if history is None or self.history_step + 1 >= history[1]:
+            self.leave_history()
+            self.status_bar.config(text=f"⏩ Текущее состояние, строка {self.current_debug_line}")
+            return
+        self.show_history_step(self.history_step + 1, history[1])
+    
+    def show_history_step(self, step, last):
+        state = self.compiler_instance.get_state_at(step)
+        if state is None:
+            return
+        self.history_step = step
+        self.line_numbers.set_execution_line(state['line'])
+        self.show_variables(state['variables'])
+        self.show_call_stack(state['call_stack'])
+        self.status_bar.config(
+            text=f"⏪ История: шаг {step} из {last}, строка {state['line']} (выполнение на паузе)")
+    
+    def leave_history(self):
+        # Возврат панелей к текущему состоянию программы
+        if self.history_step is None or not self.compiler_instance:
+            return
+        self.history_step = None
+        self.line_numbers.set_execution_line(self.current_debug_line)
+        self.show_variables(self.compiler_instance.get_variables())
+        self.show_call_stack(self.compiler_instance.get_call_stack())
+    
     def toggle_breakpoint(self):
         if self.is_running:
             messagebox.showwarning("Внимание", "Нельзя изменять точки останова во время выполнения программы!")
@@ -1735,19 +2169,87 @@ class RiIDE:
             line_num = int(cursor_pos.split('.')[0])
             
             if line_num in self.line_numbers.breakpoints:
-                self.line_numbers.breakpoints.remove(line_num)
+                del self.line_numbers.breakpoints[line_num]
                 self.status_bar.config(text=f"✓ Точка останова удалена в строке {line_num}")
             else:
-                self.line_numbers.breakpoints.add(line_num)
+                self.line_numbers.breakpoints[line_num] = {}
                 self.status_bar.config(text=f"✓ Точка останова установлена в строке {line_num}")
             
-            self.line_numbers._redraw()
-            self.breakpoints_listbox.delete(0, tk.END)
-            for bp in sorted(self.line_numbers.breakpoints):
-                self.breakpoints_listbox.insert(tk.END, f"Строка {bp}")
+            self.line_numbers._breakpoints_changed()
         except:
             pass
     
+    def refresh_breakpoints_list(self):
+        self.breakpoints_listbox.delete(0, tk.END)
+        for bp in self.line_numbers.get_breakpoints():
+            settings = self.line_numbers.get_breakpoint_settings(bp)
+            text = f"Строка {bp}"
+            if settings.get('condition'):
+                text += f" если {settings['condition']}"
+            if settings.get('hit_count'):
+                text += f" с прохода {settings['hit_count']}"
+            if settings.get('log_message'):
+                text += f" → журнал: {settings['log_message']}"
+            self.breakpoints_listbox.insert(tk.END, text)
+        for name, condition in sorted(self.watches.items()):
+            text = f"👁 {name}"
+            if condition:
+                text += f" если {condition}"
+            self.breakpoints_listbox.insert(tk.END, text)
+    
+    def add_watch(self):
+        if self.is_running:
+            messagebox.showwarning("Внимание", "Нельзя изменять наблюдения во время выполнения программы!")
+            return
+        
+        selection = self.variables_tree.selection()
+        selected = self.variables_tree.item(selection[0], 'text') if selection else ""
+        name = simpledialog.askstring("Наблюдение", "Имя переменной или списка:",
+                                      initialvalue=selected, parent=self.root)
+        if not name or not name.strip():
+            return
+        name = name.strip()
+        condition = simpledialog.askstring(
+            "Наблюдение", "Условие остановки (пусто - при любом изменении):",
+            initialvalue=self.watches.get(name) or "", parent=self.root)
+        if condition is None:
+            return
+        
+        try:
+            # Условие проверяется так же, как его разберет интерпретатор
+            from ri_compiler import Watchpoint
+            Watchpoint(name, condition)
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Неверное условие наблюдения: {e}")
+            return
+        
+        self.watches[name] = condition.strip() or None
+        if name in self.variable_rows:
+            self.variables_tree.item(self.variable_rows[name], tags=('watched',))
+        self.refresh_breakpoints_list()
+        self.status_bar.config(text=f"✓ Наблюдение за '{name}' добавлено (действует при отладке)")
+    
+    def remove_watch(self):
+        if self.is_running:
+            messagebox.showwarning("Внимание", "Нельзя изменять наблюдения во время выполнения программы!")
+            return
+        
+        selection = self.variables_tree.selection()
+        name = self.variables_tree.item(selection[0], 'text') if selection else None
+        if name not in self.watches:
+            if not self.watches:
+                return
+            name = simpledialog.askstring("Наблюдение", "Перестать следить за:",
+                                          initialvalue=next(iter(self.watches)), parent=self.root)
+            if name not in self.watches:
+                return
+        
+        del self.watches[name]
+        if name in self.variable_rows:
+            self.variables_tree.item(self.variable_rows[name], tags=())
+        self.refresh_breakpoints_list()
+        self.status_bar.config(text=f"✓ Наблюдение за '{name}' удалено")
+    
     def clear_all_breakpoints(self):
         if self.is_running:
             messagebox.showwarning("Внимание", "Нельзя изменять точки останова во время выполнения программы!")
@@ -2053,328 +2555,26 @@ class RiIDE:
             self.graphics_window.clear()
     
     def insert_draw_example(self):
-        example = f"""// Пример: Интерактивная рисовалка
-// Создано программистом {RI_LANGUAGE_CREATOR} в {RI_LANGUAGE_YEAR} году
-
-окно 800 600 "Рисовалка Ri"
-
-перем цвет = "черный"
-перем размер = 5
-перем рисовать = ложь
-перем последний_х = 0
-перем последний_у = 0
-
-очистить белый
-текст 300 30 "Рисуй мышью! Ri IDE от {RI_LANGUAGE_CREATOR}" черный
-
-цикл истина
-    перем х = мышь_х()
-    перем у = мышь_у()
-    
-    если мышь_нажата() то
-        если не рисовать то
-            перем рисовать = истина
-            перем последний_х = х
-            перем последний_у = у
-        конец
-        
-        линия последний_х последний_у х у цвет
-        перем последний_х = х
-        перем последний_у = у
-    иначе
-        перем рисовать = ложь
-    конец
-    
-    если клавиша_нажата("1") то
-        перем цвет = "черный"
-    конец
-    если клавиша_нажата("2") то
-        перем цвет = "красный"
-    конец
-    если клавиша_нажата("3") то
-        перем цвет = "синий"
-    конец
-    если клавиша_нажата("4") то
-        перем цвет = "зеленый"
-    конец
-    
-    если клавиша_нажата("пробел") то
-        очистить белый
-        текст 300 30 "Рисуй мышью! Ri IDE от {RI_LANGUAGE_CREATOR}" черный
-    конец
-    
-    если клавиша_нажата("эскейп") то
-        остановить()
-    конец
-    
-    обновить_экран()
-    задержка 16
-конец
-"""
         self.code_editor.delete(1.0, tk.END)
-        self.code_editor.insert(1.0, example)
+        self.code_editor.insert(1.0, DRAW_EXAMPLE)
         self.highlight_syntax()
         self.status_bar.config(text="✓ Пример 'Рисовалка' загружен")
     
     def insert_target_example(self):
-        example = f"""// Пример: Игра "Стрельба по мишеням"
-// Создано программистом {RI_LANGUAGE_CREATOR} в {RI_LANGUAGE_YEAR} году
-
-окно 800 600 "Стрельба по мишеням"
-
-перем счет = 0
-перем мишени = [300, 200, 100, 400, 250]
-перем радиусы = [30, 40, 35, 45, 25]
-перем цвета = ["красный", "синий", "зеленый", "фиолетовый", "оранжевый"]
-перем скорость = 3
-
-цикл истина
-    очистить светло-голубой
-    
-    перем i = 0
-    цикл i < длина(мишени)
-        перем x = мишени[i]
-        перем y = радиусы[i] * 2
-        
-        перем x = x + скорость
-        если x > 800 то
-            перем x = 0
-        конец
-        мишени[i] = x
-        
-        круг x 100 радиусы[i] цвета[i]
-        круг x 100 радиусы[i]-5 белый
-        
-        перем i = i + 1
-    конец
-    
-    перем х = мышь_х()
-    перем у = мышь_у()
-    
-    круг х у 10 черный
-    линия х-15 у х+15 у красный
-    линия х у-15 х у+15 красный
-    
-    если мышь_нажата() то
-        перем i = 0
-        цикл i < длина(мишени)
-            перем мишень_x = мишени[i]
-            перем расстояние = корень((х - мишень_x)^2 + (у - 100)^2)
-            
-            если расстояние < радиусы[i] то
-                перем счет = счет + 1
-                мишени[i] = 900
-            конец
-            
-            перем i = i + 1
-        конец
-        
-        задержка 200
-    конец
-    
-    прямоугольник 10 10 200 60 белый
-    текст 110 30 "Счет: " + счет черный
-    текст 110 50 "Ri IDE от {RI_LANGUAGE_CREATOR}" черный
-    
-    если клавиша_нажата("эскейп") то
-        остановить()
-    конец
-    
-    обновить_экран()
-    задержка 16
-конец
-"""
         self.code_editor.delete(1.0, tk.END)
-        self.code_editor.insert(1.0, example)
+        self.code_editor.insert(1.0, TARGET_EXAMPLE)
         self.highlight_syntax()
         self.status_bar.config(text="✓ Пример 'Стрельба по мишеням' загружен")
     
     def insert_keyboard_example(self):
-        example = f"""// Пример: Управление объектом клавиатурой
-// Создано программистом {RI_LANGUAGE_CREATOR} в {RI_LANGUAGE_YEAR} году
-
-окно 800 600 "Управление клавиатурой"
-
-перем x = 400
-перем y = 300
-перем скорость = 5
-перем цвет = "красный"
-
-очистить белый
-текст 300 30 "Ri IDE от {RI_LANGUAGE_CREATOR} - Управление клавиатурой" черный
-
-цикл истина
-    очистить белый
-    текст 300 30 "Ri IDE от {RI_LANGUAGE_CREATOR} - Управление клавиатурой" черный
-    
-    если клавиша_нажата("влево") то
-        перем x = x - скорость
-    конец
-    если клавиша_нажата("вправо") то
-        перем x = x + скорость
-    конец
-    если клавиша_нажата("вверх") то
-        перем y = y - скорость
-    конец
-    если клавиша_нажата("вниз") то
-        перем y = y + скорость
-    конец
-    
-    если клавиша_нажата("пробел") то
-        перем y = y - 50
-        задержка 100
-        перем y = y + 50
-    конец
-    
-    если клавиша_нажата("1") то
-        перем цвет = "красный"
-    конец
-    если клавиша_нажата("2") то
-        перем цвет = "синий"
-    конец
-    если клавиша_нажата("3") то
-        перем цвет = "зеленый"
-    конец
-    если клавиша_нажата("4") то
-        перем цвет = "желтый"
-    конец
-    
-    если x < 50 то
-        перем x = 50
-    конец
-    если x > 750 то
-        перем x = 750
-    конец
-    если y < 50 то
-        перем y = 50
-    конец
-    если y > 550 то
-        перем y = 550
-    конец
-    
-    круг x y 30 цвет
-    круг x-10 y-10 5 черный
-    круг x+10 y-10 5 черный
-    
-    прямоугольник 10 10 200 80 светло-голубой
-    текст 110 30 "X: " + x черный
-    текст 110 50 "Y: " + y черный
-    текст 110 70 "Автор: {RI_LANGUAGE_CREATOR}" черный
-    
-    если клавиша_нажата("эскейп") то
-        остановить()
-    конец
-    
-    обновить_экран()
-    задержка 16
-конец
-"""
         self.code_editor.delete(1.0, tk.END)
-        self.code_editor.insert(1.0, example)
+        self.code_editor.insert(1.0, KEYBOARD_EXAMPLE)
         self.highlight_syntax()
         self.status_bar.config(text="✓ Пример 'Управление клавиатурой' загружен")
     
     def insert_car_example(self):
-        example = f"""// Пример: Вождение машинки
-// Создано программистом {RI_LANGUAGE_CREATOR} в {RI_LANGUAGE_YEAR} году
-
-окно 800 600 "Вождение машинки"
-
-перем x = 400
-перем y = 500
-перем скорость = 0
-перем поворот = 0
-
-очистить светло-зеленый
-
-цикл истина
-    прямоугольник 200 0 400 600 серый
-    
-    перем i = 0
-    цикл i < 12
-        прямоугольник 390 i*50 20 30 желтый
-        перем i = i + 1
-    конец
-    
-    если клавиша_нажата("влево") то
-        перем поворот = поворот - 2
-    конец
-    если клавиша_нажата("вправо") то
-        перем поворот = поворот + 2
-    конец
-    если клавиша_нажата("вверх") то
-        перем скорость = скорость + 0.2
-    конец
-    если клавиша_нажата("вниз") то
-        перем скорость = скорость - 0.2
-    конец
-    
-    если клавиша_нажата("пробел") то
-        перем скорость = скорость * 0.9
-    конец
-    
-    если скорость > 10 то
-        перем скорость = 10
-    конец
-    если скорость < -3 то
-        перем скорость = -3
-    конец
-    если поворот > 30 то
-        перем поворот = 30
-    конец
-    если поворот < -30 то
-        перем поворот = -30
-    конец
-    
-    перем x = x + скорость * синус(поворот)
-    перем y = y - скорость * косинус(поворот)
-    
-    если x < 250 то
-        перем x = 250
-        перем скорость = скорость * 0.5
-    конец
-    если x > 550 то
-        перем x = 550
-        перем скорость = скорость * 0.5
-    конец
-    если y < 0 то
-        перем y = 600
-    конец
-    если y > 600 то
-        перем y = 0
-    конец
-    
-    прямоугольник x-30 y-15 60 30 красный
-    прямоугольник x-40 y+15 80 10 темно-серый
-    круг x-25 y+25 10 черный
-    круг x+25 y+25 10 черный
-    
-    прямоугольник x-20 y-10 40 10 голубой
-    
-    если скорость > 0 то
-        круг x+35 y 5 желтый
-    конец
-    если скорость < 0 то
-        круг x-35 y 5 желтый
-    конец
-    
-    прямоугольник 10 10 200 100 белый
-    текст 110 30 "Скорость: " + округлить(скорость, 1) черный
-    текст 110 50 "Поворот: " + округлить(поворот, 1) черный
-    текст 110 70 "Автор: {RI_LANGUAGE_CREATOR}" черный
-    
-    если клавиша_нажата("эскейп") то
-        остановить()
-    конец
-    
-    перем поворот = поворот * 0.95
-    
-    обновить_экран()
-    задержка 16
-конец
-"""
         self.code_editor.delete(1.0, tk.END)
-        self.code_editor.insert(1.0, example)
+        self.code_editor.insert(1.0, CAR_EXAMPLE)
         self.highlight_syntax()
         self.status_bar.config(text="✓ Пример 'Вождение машинки' загружен")
     
@@ -2434,8 +2634,7 @@ class RiIDE:
         if self.compiler_instance:
             # Останавливаем компилятор
             try:
-                self.compiler_instance.is_paused = False
-                self.compiler_instance.debug_mode = False
+                self.compiler_instance.stop_debugging()
             except:
                 pass
     
@@ -2614,79 +2813,7 @@ Ri IDE v{self.ide_version} - Полнофункциональная среда 
         notebook = ttk.Notebook(examples_window)
         notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
         
-        examples = {
-            "Рисовалка": f"""окно 800 600 "Рисовалка"
-// Создано {RI_LANGUAGE_CREATOR} в {RI_LANGUAGE_YEAR}
-
-цикл истина
-    перем х = мышь_х()
-    перем у = мышь_у()
-    
-    если мышь_нажата() то
-        круг х у 10 красный
-    конец
-    
-    обновить_экран()
-конец""",
-            
-            "Управление": f"""окно 600 400 "Управление"
-// Создано {RI_LANGUAGE_CREATOR} в {RI_LANGUAGE_YEAR}
-
-перем x = 300
-перем y = 200
-
-цикл истина
-    очистить белый
-    
-    если клавиша_нажата("влево") то
-        перем x = x - 5
-    конец
-    если клавиша_нажата("вправо") то
-        перем x = x + 5
-    конец
-    
-    круг x y 30 синий
-    обновить_экран()
-конец""",
-            
-            "Игра": f"""окно 800 600 "Ловля шариков"
-// Создано {RI_LANGUAGE_CREATOR} в {RI_LANGUAGE_YEAR}
-
-перем счет = 0
-перем шарик_x = 400
-перем шарик_y = 50
-
-цикл истина
-    очистить белый
-    
-    перем шарик_y = шарик_y + 3
-    если шарик_y > 600 то
-        перем шарик_y = 0
-        перем шарик_x = случайно(100, 700)
-    конец
-    
-    круг шарик_x шарик_y 30 красный
-    
-    перем х = мышь_х()
-    перем у = мышь_у()
-    
-    прямоугольник х-50 550 100 20 синий
-    
-    если шарик_y > 530 и шарик_y < 570 и 
-       шарик_x > х-50 и шарик_x < х+50 то
-        перем счет = счет + 1
-        перем шарик_y = 0
-        перем шарик_x = случайно(100, 700)
-    конец
-    
-    текст 100 50 "Счет: " + счет черный
-    
-    обновить_экран()
-    задержка 16
-конец"""
-        }
-        
-        for name, code in examples.items():
+        for name, code in GALLERY_EXAMPLES.items():
             frame = ttk.Frame(notebook)
             text = scrolledtext.ScrolledText(frame, wrap=tk.WORD, font=("Consolas", 11))
             text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
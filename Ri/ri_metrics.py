@@ -0,0 +1,50 @@
+# Ri Language v2.13.1 - Счетчики выполнения программ Ri
+# Создано программистом KITTEN в 2025 году
+
+import json
+import time
+
+from ri_parser import walk_statements, WhileStatement
+
+class Metrics:
+    # Счетчики пишет только поток исполнителя; snapshot() можно вызывать
+    # из любого потока во время выполнения (например, из IDE)
+    def __init__(self, runner, program):
+        self.runner = runner
+        # Итерация цикла - выполнение его тела; id тел циклов уже оптимизированной программы
+        self.loop_bodies = {id(statement.body) for statement in walk_statements(program.body)
+                            if type(statement) is WhileStatement}
+        # Класс оператора -> число выполнений
+        self.statements = {}
+        self.evaluations = 0
+        self.builtin_calls = 0
+        self.user_calls = 0
+        self.loop_iterations = 0
+        self.delay_time = 0.0
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def finish(self):
+        self.finished = time.perf_counter()
+
+    def snapshot(self):
+        statements = {statement_type.__name__: count
+                      for statement_type, count in self.statements.copy().items()}
+        end = self.finished if self.finished is not None else time.perf_counter()
+        return {
+            'elapsed': end - self.started,
+            'finished': self.finished is not None,
+            'statements': statements,
+            'statements_total': sum(statements.values()),
+            'evaluations': self.evaluations,
+            'builtin_calls': self.builtin_calls,
+            'user_calls': self.user_calls,
+            'loop_iterations': self.loop_iterations,
+            'graphics_commands': len(self.runner.graphics_commands),
+            'delay_time': self.delay_time,
+            'parse_cache': self.runner.get_parse_cache_stats(),
+        }
+
+    def write_json(self, path):
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(self.snapshot(), file, ensure_ascii=False, indent=2)
@@ -0,0 +1,461 @@
+# Ri Language v2.13.1 - Свертка констант и удаление недостижимого кода
+# Создано программистом KITTEN в 2025 году
+
+import math
+
+from ri_parser import (walk_statements, walk_nodes, statement_expressions, Const, Name,
+                       ListLiteral, Index, Call, UnaryOp, BinOp, BoolOp, Hoisted, InlineCall, IfStatement, WhileStatement, FunctionDeclaration,
+                       StopStatement, ReturnStatement, ExpressionStatement, ListDeclaration,
+                       ListAppend, ListRemove)
+from ri_compiler import BINARY_OPERATIONS, to_bool
+from ri_resolver import STORE_TARGETS
+from ri_types import specialize_program
+
+# Встроенные функции без побочных эффектов: вызов с константами можно
+# выполнить до запуска программы
+PURE_BUILTINS = {'длина', 'корень', 'синус', 'косинус', 'округлить', 'строка', 'число', 'тип'}
+
+# Имена, значение которых меняют события, а не присваивания
+EVENT_NAMES = {'мышь_х', 'мышь_у', 'мышь_нажата'}
+
+LIST_STATEMENTS = (ListDeclaration, ListAppend, ListRemove)
+
+# Ограничения, чтобы свертка не строила огромные значения при разборе
+MAX_FOLDED_STRING = 4096
+MAX_FOLDED_INT_BITS = 4096
+MAX_FOLDED_EXPONENT = 1024
+
+class CannotFold(Exception):
+    pass
+
+def _called_names(statements):
+    names = set()
+    for statement in walk_statements(statements, into_functions=False):
+        for expression in statement_expressions(statement):
+            if expression.node is not None:
+                for node in walk_nodes(expression.node):
+                    if type(node) is Call or type(node) is InlineCall:
+                        names.add(node.name)
+    return names
+
+def _stored_names(statements):
+    names = set()
+    for statement in walk_statements(statements, into_functions=False):
+        target = STORE_TARGETS.get(type(statement))
+        if target is not None:
+            names.add(getattr(statement, target))
+    return names
+
+def _mutates_lists(statements):
+    return any(isinstance(statement, LIST_STATEMENTS)
+               for statement in walk_statements(statements, into_functions=False))
+
+class CallGraph:
+    # Какие функции вызывают какие: нужен для поиска рекурсии и побочных эффектов
+    def __init__(self, program, builtins):
+        self.declarations = {}
+        for statement in walk_statements(program.body):
+            if type(statement) is FunctionDeclaration and statement.name is not None:
+                self.declarations.setdefault(statement.name, []).append(statement)
+
+        self.calls = {}
+        mutators = set()
+        for name, declarations in self.declarations.items():
+            called = set()
+            for declaration in declarations:
+                called |= _called_names(declaration.body)
+                if _mutates_lists(declaration.body):
+                    mutators.add(name)
+            # Встроенные функции важнее пользовательских с тем же именем
+            self.calls[name] = {callee for callee in called
+                                if callee in self.declarations and callee not in builtins}
+
+        self.recursive = {name for name in self.declarations if name in self.reachable(name)}
+        self.list_mutators = {name for name in self.declarations
+                              if name in mutators or self.reachable(name) & mutators}
+
+    def reachable(self, name):
+        seen = set()
+        pending = list(self.calls.get(name, ()))
+        while pending:
+            callee = pending.pop()
+            if callee not in seen:
+                seen.add(callee)
+                pending.extend(self.calls.get(callee, ()))
+        return seen
+
+def _terminates(statement):
+    # Оператор, после которого код того же блока не выполняется никогда
+    statement_type = type(statement)
+    if statement_type is StopStatement or statement_type is ReturnStatement:
+        return True
+    if statement_type is IfStatement:
+        return (bool(statement.body) and _terminates(statement.body[-1]) and
+                bool(statement.else_body) and _terminates(statement.else_body[-1]))
+    return False
+
+class ProgramOptimizer:
+    def __init__(self, builtins, report=None, inline=True, hoist=True, specialize=True, prune=True):
+        self.builtins = builtins
+        self.report = report
+        self.inline = inline
+        # prune=False оставляет ветки с постоянным условием и недостижимый код (для покрытия)
+        self.prune = prune
+        self.hoist = hoist
+        self.specialize = specialize
+
+    def note(self, line, message):
+        if self.report is not None:
+            self.report.append(f"строка {line}: {message}")
+
+    def optimize(self, program):
+        program.body = self.optimize_block(program.body)
+        if self.inline or self.hoist:
+            self.graph = CallGraph(program, self.builtins)
+        if self.inline:
+            self.inline_calls(program)
+        if self.hoist:
+            self.hoisted_count = 0
+            self.hoist_block(program.body, recursive=False)
+            program.hoisted_count = self.hoisted_count
+        if self.specialize:
+            # Последним шагом: типы выводятся по уже упрощенной программе
+            specialized = specialize_program(program)
+            if specialized and self.report is not None:
+                self.report.append(f"операций над числами с быстрым путем: {specialized}")
+        return program
+
+    # Операторы
+
+    def optimize_block(self, statements):
+        result = []
+        for index, statement in enumerate(statements):
+            statement_type = type(statement)
+            self.fold_statement(statement)
+
+            if not self.prune:
+                if statement_type is IfStatement:
+                    statement.body = self.optimize_block(statement.body)
+                    statement.else_body = self.optimize_block(statement.else_body)
+                elif statement_type is WhileStatement or statement_type is FunctionDeclaration:
+                    statement.body = self.optimize_block(statement.body)
+                result.append(statement)
+                continue
+            if statement_type is IfStatement and type(statement.condition.node) is Const:
+                condition = statement.condition.node.value
+                if condition:
+                    self.note(statement.line, "условие всегда истинно" +
+                              (", ветка иначе удалена" if statement.else_body else ""))
+                    branch = statement.body
+                else:
+                    self.note(statement.line, "условие всегда ложно, ветка то удалена")
+                    branch = statement.else_body
+                # Ветка, которая выполняется всегда, встраивается в текущий блок
+                emitted = self.optimize_block(branch)
+                result.extend(emitted)
+            elif statement_type is WhileStatement and type(statement.condition.node) is Const \
+                    and not statement.condition.node.value:
+                self.note(statement.line, "условие цикла всегда ложно, цикл удален")
+                continue
+            elif statement_type is ExpressionStatement and statement.value.error is None \
+                    and type(statement.value.node) is Const:
+                self.note(statement.line, "удалено выражение без действия")
+                continue
+            else:
+                if statement_type is IfStatement:
+                    statement.body = self.optimize_block(statement.body)
+                    statement.else_body = self.optimize_block(statement.else_body)
+                elif statement_type is WhileStatement:
+                    statement.body = self.optimize_block(statement.body)
+                elif statement_type is FunctionDeclaration:
+                    statement.body = self.optimize_block(statement.body)
+                emitted = [statement]
+                result.append(statement)
+
+            if emitted and _terminates(emitted[-1]):
+                rest = statements[index + 1:]
+                if rest:
+                    self.note(rest[0].line, f"удален недостижимый код ({len(rest)} опер.) "
+                                            f"после строки {emitted[-1].line}")
+                break
+        return result
+
+    def fold_statement(self, statement):
+        for expression in statement_expressions(statement):
+            self.fold_expression(expression, statement.line)
+
+    # Выражения
+
+    def fold_expression(self, expression, line):
+        if expression.error is not None:
+            return
+        node = self.fold_node(expression.node)
+        if node is not expression.node:
+            expression.node = node
+            if type(node) is Const:
+                self.note(line, f"'{expression.source}' вычислено заранее: {node.value!r}")
+            else:
+                self.note(line, f"'{expression.source}' упрощено")
+
+    def fold_node(self, node):
+        node_type = type(node)
+
+        if node_type is BinOp:
+            left = self.fold_node(node.left)
+            right = self.fold_node(node.right)
+            if type(left) is Const and type(right) is Const:
+                try:
+                    return self.constant(self.binary(node.op, left.value, right.value))
+                except CannotFold:
+                    pass
+            if left is not node.left or right is not node.right:
+                return BinOp(node.op, left, right)
+            return node
+
+        if node_type is BoolOp:
+            left = self.fold_node(node.left)
+            right = self.fold_node(node.right)
+            if type(left) is Const:
+                # Правая часть не вычисляется, если результат известен по левой
+                value = to_bool(left.value)
+                if node.op == 'и' and not value:
+                    return Const(False)
+                if node.op == 'или' and value:
+                    return Const(True)
+                if type(right) is Const:
+                    return Const(to_bool(right.value))
+            if left is not node.left or right is not node.right:
+                return BoolOp(node.op, left, right)
+            return node
+
+        if node_type is UnaryOp:
+            operand = self.fold_node(node.operand)
+            if type(operand) is Const:
+                if node.op == 'не':
+                    return Const(not to_bool(operand.value))
+                try:
+                    return self.constant(-operand.value)
+                except Exception:
+                    pass
+            if operand is not node.operand:
+                return UnaryOp(node.op, operand)
+            return node
+
+        if node_type is Call:
+            args = [self.fold_node(arg) for arg in node.args]
+            if node.name in PURE_BUILTINS and node.name in self.builtins \
+                    and all(type(arg) is Const for arg in args):
+                try:
+                    return self.constant(self.builtins[node.name](*[arg.value for arg in args]))
+                except Exception:
+                    # Ошибка вызова сообщается во время выполнения, как и раньше
+                    pass
+            if any(new is not old for new, old in zip(args, node.args)):
+                return Call(node.name, args)
+            return node
+
+        if node_type is Index:
+            target = self.fold_node(node.target)
+            index = self.fold_node(node.index)
+            if target is not node.target or index is not node.index:
+                return Index(target, index)
+            return node
+
+        if node_type is ListLiteral:
+            # Список не сворачивается: каждое вычисление создает новый объект
+            items = [self.fold_node(item) for item in node.items]
+            if any(new is not old for new, old in zip(items, node.items)):
+                return ListLiteral(items)
+            return node
+
+        return node
+
+    # Встраивание небольших функций
+
+    def inline_candidates(self, program):
+        # Функция из одного "возврат выражение", объявленная один раз на верхнем
+        # уровне и не участвующая в рекурсии
+        candidates = {}
+        for statement in program.body:
+            if type(statement) is not FunctionDeclaration or statement.name is None:
+                continue
+            name = statement.name
+            body = statement.body
+            if (len(self.graph.declarations[name]) == 1 and name not in self.builtins
+                    and name not in self.graph.recursive
+                    and len(set(statement.params)) == len(statement.params)
+                    and len(body) == 1 and type(body[0]) is ReturnStatement
+                    and body[0].value.error is None):
+                candidates[name] = statement
+        return candidates
+
+    def inline_calls(self, program):
+        self.candidates = self.inline_candidates(program)
+        if not self.candidates:
+            return
+        self.inline_scope(program.body, None)
+        for statement in walk_statements(program.body):
+            if type(statement) is FunctionDeclaration and statement.name is not None:
+                self.inline_scope(statement.body, statement)
+
+    def inline_scope(self, statements, function):
+        # Имена, записываемые в функции, - ее локальные переменные: встроенное
+        # выражение не должно видеть их вместо глобальных
+        local_names = set(function.params) | _stored_names(statements) if function else set()
+        for statement in walk_statements(statements, into_functions=False):
+            for expression in statement_expressions(statement):
+                if expression.error is None:
+                    node = self.inline_node(expression.node, function, local_names, statement.line)
+                    expression.node = node
+
+    def inline_node(self, node, function, local_names, line):
+        node_type = type(node)
+        if node_type is Call:
+            args = [self.inline_node(arg, function, local_names, line) for arg in node.args]
+            declaration = self.candidates.get(node.name)
+            if declaration is not None and declaration is not function \
+                    and not (self.free_names(declaration) & local_names):
+                self.note(line, f"вызов функции {node.name} встроен")
+                return InlineCall(node.name, args, declaration)
+            if any(new is not old for new, old in zip(args, node.args)):
+                return Call(node.name, args)
+            return node
+        if node_type is BinOp or node_type is BoolOp:
+            left = self.inline_node(node.left, function, local_names, line)
+            right = self.inline_node(node.right, function, local_names, line)
+            if left is not node.left or right is not node.right:
+                return node_type(node.op, left, right)
+            return node
+        if node_type is UnaryOp:
+            operand = self.inline_node(node.operand, function, local_names, line)
+            return node if operand is node.operand else UnaryOp(node.op, operand)
+        if node_type is Index:
+            target = self.inline_node(node.target, function, local_names, line)
+            index = self.inline_node(node.index, function, local_names, line)
+            if target is not node.target or index is not node.index:
+                return Index(target, index)
+            return node
+        if node_type is ListLiteral:
+            items = [self.inline_node(item, function, local_names, line) for item in node.items]
+            if any(new is not old for new, old in zip(items, node.items)):
+                return ListLiteral(items)
+            return node
+        return node
+
+    def free_names(self, declaration):
+        params = set(declaration.params)
+        return {node.name for node in walk_nodes(declaration.body[0].value.node)
+                if type(node) is Name and node.name not in params}
+
+    # Вынос неизменяемых выражений из циклов
+
+    def hoist_block(self, statements, recursive):
+        for statement in statements:
+            statement_type = type(statement)
+            if statement_type is WhileStatement:
+                if not recursive:
+                    self.hoist_loop(statement)
+                self.hoist_block(statement.body, recursive)
+            elif statement_type is IfStatement:
+                self.hoist_block(statement.body, recursive)
+                self.hoist_block(statement.else_body, recursive)
+            elif statement_type is FunctionDeclaration and statement.name is not None:
+                # В рекурсивной функции цикл может начаться заново, пока идет
+                # предыдущий вход, поэтому общая ячейка для него не подходит
+                self.hoist_block(statement.body, statement.name in self.graph.recursive)
+
+    def hoist_loop(self, loop):
+        # Списки, измененные в цикле, могут менять значения любых выражений
+        if _mutates_lists(loop.body) or _called_names([loop]) & self.graph.list_mutators:
+            return
+
+        self.stores = _stored_names(loop.body)
+        slots = []
+        for statement in walk_statements([loop], into_functions=False):
+            for expression in statement_expressions(statement):
+                if expression.error is None:
+                    node, invariant = self.hoist_node(expression.node, slots)
+                    if invariant:
+                        node = self.hoisted(node, slots)
+                    expression.node = node
+        if slots:
+            loop.hoisted = loop.hoisted + tuple(slots)
+            self.note(loop.line, f"вынесено из цикла выражений: {len(slots)}")
+
+    def hoisted(self, node, slots):
+        # Вынос имеет смысл только для вычислений, а не для констант и имен
+        if type(node) in (Const, Name, Hoisted):
+            return node
+        slot = self.hoisted_count
+        self.hoisted_count += 1
+        slots.append(slot)
+        return Hoisted(node, slot)
+
+    def hoist_node(self, node, slots):
+        # Возвращает (новый узел, не меняется ли значение узла в цикле)
+        node_type = type(node)
+        if node_type is Const or node_type is Hoisted:
+            return node, True
+        if node_type is Name:
+            return node, node.name not in self.stores and node.name not in EVENT_NAMES
+
+        if node_type is BinOp or node_type is BoolOp:
+            children = [node.left, node.right]
+        elif node_type is UnaryOp:
+            children = [node.operand]
+        elif node_type is Index:
+            children = [node.target, node.index]
+        elif node_type is Call or node_type is InlineCall:
+            children = node.args
+        elif node_type is ListLiteral:
+            children = node.items
+        else:
+            return node, False
+
+        results = [self.hoist_node(child, slots) for child in children]
+        invariant = all(flag for _, flag in results)
+        if node_type is ListLiteral or node_type is InlineCall:
+            # Список - новый объект при каждом вычислении; функция может иметь побочные эффекты
+            invariant = False
+        elif node_type is Call:
+            invariant = invariant and node.name in PURE_BUILTINS and node.name in self.builtins
+        if invariant:
+            return node, True
+
+        new_children = [self.hoisted(child, slots) if flag else child for child, flag in results]
+        if all(new is old for new, old in zip(new_children, children)):
+            return node, False
+        if node_type is BinOp or node_type is BoolOp:
+            return node_type(node.op, *new_children), False
+        if node_type is UnaryOp:
+            return UnaryOp(node.op, new_children[0]), False
+        if node_type is Index:
+            return Index(*new_children), False
+        if node_type is Call:
+            return Call(node.name, new_children), False
+        if node_type is InlineCall:
+            return InlineCall(node.name, new_children, node.declaration), False
+        return ListLiteral(new_children), False
+
+    def binary(self, op, left, right):
+        if op == '^' and not (isinstance(right, (int, float)) and abs(right) <= MAX_FOLDED_EXPONENT):
+            raise CannotFold()
+        try:
+            return BINARY_OPERATIONS[op](left, right)
+        except Exception:
+            # Ошибка сообщается во время выполнения
+            raise CannotFold()
+
+    def constant(self, value):
+        if isinstance(value, float) and not math.isfinite(value):
+            raise CannotFold()
+        if isinstance(value, str) and len(value) > MAX_FOLDED_STRING:
+            raise CannotFold()
+        if isinstance(value, int) and value.bit_length() > MAX_FOLDED_INT_BITS:
+            raise CannotFold()
+        if not isinstance(value, (int, float, str, bool)):
+            raise CannotFold()
+        return Const(value)
+
+def optimize_program(program, builtins, report=None, inline=True, hoist=True, specialize=True, prune=True):
+    return ProgramOptimizer(builtins, report, inline, hoist, specialize, prune).optimize(program)
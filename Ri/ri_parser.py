@@ -0,0 +1,881 @@
+# Ri Language v2.13.1 - Лексер и синтаксический анализатор программ Ri
+# Создано программистом KITTEN в 2025 году
+
+import re
+from collections import namedtuple, OrderedDict
+
+class RiSyntaxError(Exception):
+    pass
+
+# Токен: вид, значение, позиция в исходной строке и наличие пробела перед ним
+Token = namedtuple('Token', ['kind', 'value', 'start', 'end', 'spaced'])
+
+TOKEN_PATTERN = re.compile(r'''
+    (?P<space>\s+)
+  | (?P<number>\d+(?:\.\d+)?)
+  | (?P<string>"[^"]*"|'[^']*')
+  | (?P<name>[^\W\d]\w*)
+  | (?P<op>\*\*|//|>=|<=|==|!=|[-+*/%^<>=(),\[\]])
+''', re.VERBOSE)
+
+WORD_OPERATORS = {'и', 'или', 'не'}
+# "и" и "или" - операторы только после операнда, "не" - только перед ним;
+# в остальных местах это имена (например, счетчик цикла "и")
+BINARY_WORD_OPERATORS = {'и', 'или'}
+
+def _after_operand(tokens):
+    if not tokens:
+        return False
+    last = tokens[-1]
+    return last.kind in ('number', 'string', 'bool', 'name') or (last.kind == 'op' and last.value in (')', ']'))
+
+def tokenize(source: str):
+    tokens = []
+    pos = 0
+    spaced = False
+    length = len(source)
+
+    while pos < length:
+        match = TOKEN_PATTERN.match(source, pos)
+        if not match:
+            # Неизвестный символ не прерывает разбор: ошибка возникнет,
+            # только если парсер до него дойдет
+            tokens.append(Token('error', source[pos], pos, pos + 1, spaced))
+            pos += 1
+            spaced = False
+            continue
+
+        kind = match.lastgroup
+        text = match.group()
+
+        if kind == 'space':
+            spaced = True
+        elif kind == 'number':
+            value = float(text) if '.' in text else int(text)
+            tokens.append(Token('number', value, pos, match.end(), spaced))
+            spaced = False
+        elif kind == 'string':
+            tokens.append(Token('string', text[1:-1], pos, match.end(), spaced))
+            spaced = False
+        elif kind == 'name':
+            lowered = text.lower()
+            if lowered in ('истина', 'ложь'):
+                tokens.append(Token('bool', lowered == 'истина', pos, match.end(), spaced))
+            elif text in WORD_OPERATORS and (text in BINARY_WORD_OPERATORS) == _after_operand(tokens):
+                tokens.append(Token('op', text, pos, match.end(), spaced))
+            else:
+                tokens.append(Token('name', text, pos, match.end(), spaced))
+            spaced = False
+        else:
+            tokens.append(Token('op', text, pos, match.end(), spaced))
+            spaced = False
+
+        pos = match.end()
+
+    tokens.append(Token('end', None, length, length, spaced))
+    return tokens
+
+# Узлы дерева выражений
+
+class Node:
+    __slots__ = ()
+
+    def __repr__(self):
+        fields = ', '.join(repr(getattr(self, name)) for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+class Const(Node):
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+class Name(Node):
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = name
+
+class ListLiteral(Node):
+    __slots__ = ('items',)
+
+    def __init__(self, items):
+        self.items = items
+
+class Index(Node):
+    __slots__ = ('target', 'index')
+
+    def __init__(self, target, index):
+        self.target = target
+        self.index = index
+
+class Call(Node):
+    __slots__ = ('name', 'args')
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+class UnaryOp(Node):
+    __slots__ = ('op', 'operand')
+
+    def __init__(self, op, operand):
+        self.op = op
+        self.operand = operand
+
+class BinOp(Node):
+    __slots__ = ('op', 'left', 'right')
+
+    def __init__(self, op, left, right):
+        self.op = op
+        self.left = left
+        self.right = right
+
+class BoolOp(Node):
+    __slots__ = ('op', 'left', 'right')
+
+    def __init__(self, op, left, right):
+        self.op = op
+        self.left = left
+        self.right = right
+
+# Узлы, которые создает оптимизатор
+
+class Hoisted(Node):
+    # Выражение, не меняющееся в цикле: вычисляется один раз за вход в цикл
+    __slots__ = ('node', 'slot')
+
+    def __init__(self, node, slot):
+        self.node = node
+        self.slot = slot
+
+class NumericOp(Node):
+    # Операция, операнды которой по выводу типов всегда числа. kind - 'int'
+    # или 'number', function - операция Python без проверок на строки
+    __slots__ = ('op', 'left', 'right', 'kind', 'function')
+
+    def __init__(self, op, left, right, kind, function=None):
+        self.op = op
+        self.left = left
+        self.right = right
+        self.kind = kind
+        self.function = function
+
+class InlineCall(Node):
+    # Вызов небольшой функции: ее выражение возврата вычисляется без кадра вызова
+    __slots__ = ('name', 'args', 'declaration')
+
+    def __init__(self, name, args, declaration):
+        self.name = name
+        self.args = args
+        self.declaration = declaration
+
+# Узлы, которые создает разрешение имен для интерпретатора дерева (ri_resolver)
+
+class LocalName(Node):
+    # Переменная функции: ячейка в массиве кадра
+    __slots__ = ('name', 'slot')
+
+    def __init__(self, name, slot):
+        self.name = name
+        self.slot = slot
+
+class GlobalName(Node):
+    # Переменная программы: ячейка в массиве глобальных переменных
+    __slots__ = ('name', 'slot')
+
+    def __init__(self, name, slot):
+        self.name = name
+        self.slot = slot
+
+# Приоритеты бинарных операторов (чем больше, тем сильнее связывает)
+BINARY_PRECEDENCE = {
+    'или': 10,
+    'и': 20,
+    '>': 40, '<': 40, '>=': 40, '<=': 40, '==': 40, '!=': 40,
+    '+': 50, '-': 50,
+    '*': 60, '/': 60, '%': 60, '//': 60,
+    '^': 80, '**': 80,
+}
+
+RIGHT_ASSOCIATIVE = {'^', '**'}
+COMPARISON_OPERATORS = {'>', '<', '>=', '<=', '==', '!='}
+
+NOT_PRECEDENCE = 30
+UNARY_PRECEDENCE = 70
+
+class ExpressionParser:
+    def __init__(self, source: str, tokens=None):
+        self.source = source
+        self.tokens = tokens if tokens is not None else tokenize(source)
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos]
+
+    def advance(self):
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def expect(self, kind, value=None):
+        token = self.advance()
+        if token.kind != kind or (value is not None and token.value != value):
+            expected = value if value is not None else kind
+            raise RiSyntaxError(f"Ожидалось '{expected}', найдено {self._describe(token)}")
+        return token
+
+    def at_end(self):
+        return self.tokens[self.pos].kind == 'end'
+
+    def _describe(self, token):
+        if token.kind == 'end':
+            return "конец выражения"
+        if token.kind == 'string':
+            return f'"{token.value}"'
+        return f"'{token.value}'"
+
+    def parse(self):
+        node = self.parse_expression()
+        if not self.at_end():
+            raise RiSyntaxError(f"Лишний символ {self._describe(self.peek())} в выражении '{self.source}'")
+        return node
+
+    def parse_expression(self, min_precedence=0):
+        left = self.parse_unary()
+
+        while True:
+            token = self.peek()
+            if token.kind != 'op':
+                break
+            op = token.value
+            precedence = BINARY_PRECEDENCE.get(op)
+            if precedence is None or precedence <= min_precedence:
+                break
+            self.advance()
+
+            next_min = precedence - 1 if op in RIGHT_ASSOCIATIVE else precedence
+            right = self.parse_expression(next_min)
+
+            if op == '**':
+                op = '^'
+            if op in ('и', 'или'):
+                left = BoolOp(op, left, right)
+            else:
+                left = BinOp(op, left, right)
+
+        return left
+
+    def parse_unary(self):
+        token = self.peek()
+        if token.kind == 'op':
+            if token.value == 'не':
+                self.advance()
+                following = self.peek()
+                if following.kind in ('end', 'error') or \
+                        (following.kind == 'op' and following.value not in ('(', '[', '-', '+', 'не')):
+                    # "не" без операнда - имя переменной
+                    return self.parse_postfix(Name('не'))
+                return UnaryOp('не', self.parse_expression(NOT_PRECEDENCE))
+            if token.value in ('-', '+'):
+                self.advance()
+                operand = self.parse_expression(UNARY_PRECEDENCE)
+                if token.value == '+':
+                    return operand
+                if isinstance(operand, Const) and isinstance(operand.value, (int, float)) \
+                        and not isinstance(operand.value, bool):
+                    return Const(-operand.value)
+                return UnaryOp('-', operand)
+        return self.parse_postfix(self.parse_primary())
+
+    def parse_postfix(self, node):
+        while True:
+            token = self.peek()
+            if token.kind == 'op' and token.value == '[':
+                self.advance()
+                index = self.parse_expression()
+                self.expect('op', ']')
+                node = Index(node, index)
+            else:
+                return node
+
+    def parse_primary(self):
+        token = self.advance()
+        kind = token.kind
+
+        if kind in ('number', 'string', 'bool'):
+            return Const(token.value)
+
+        if kind == 'name':
+            following = self.peek()
+            if following.kind == 'op' and following.value == '(':
+                self.advance()
+                return Call(token.value, self.parse_arguments(')'))
+            return Name(token.value)
+
+        if kind == 'op':
+            if token.value == '(':
+                node = self.parse_expression()
+                self.expect('op', ')')
+                return node
+            if token.value == '[':
+                return ListLiteral(self.parse_arguments(']'))
+
+        raise RiSyntaxError(f"Неожиданный символ {self._describe(token)} в выражении '{self.source}'")
+
+    def parse_arguments(self, closing):
+        args = []
+        token = self.peek()
+        if token.kind == 'op' and token.value == closing:
+            self.advance()
+            return args
+
+        while True:
+            args.append(self.parse_expression())
+            token = self.advance()
+            if token.kind == 'op' and token.value == ',':
+                continue
+            if token.kind == 'op' and token.value == closing:
+                return args
+            raise RiSyntaxError(f"Ожидалось ',' или '{closing}', найдено {self._describe(token)}")
+
+def parse_expression(source: str):
+    return ExpressionParser(source).parse()
+
+class ParseCache:
+    # Ограниченный кэш разбора: исходный текст -> результат build(текст).
+    # При переполнении вытесняется запись, которая дольше всех не использовалась
+    def __init__(self, build, size):
+        self.build = build
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, build=None):
+        # build - функция без аргументов вместо build(key), если ключ - не сам текст
+        entries = self.entries
+        value = entries.get(key)
+        if value is not None:
+            self.hits += 1
+            entries.move_to_end(key)
+            return value
+        self.misses += 1
+        value = entries[key] = build() if build is not None else self.build(key)
+        if len(entries) > self.size:
+            entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses,
+                'size': len(self.entries), 'capacity': self.size}
+
+# Разбор программы в дерево блоков
+
+class Expression:
+    # Исходный текст выражения вместе с его деревом (или ошибкой разбора)
+    __slots__ = ('source', 'node', 'error')
+
+    def __init__(self, source: str):
+        self.source = source
+        self.node = None
+        self.error = None
+        if not source.strip():
+            self.node = Const("")
+        else:
+            try:
+                self.node = parse_expression(source.strip())
+            except RiSyntaxError as e:
+                self.error = e
+
+    def __repr__(self):
+        return f"Expression({self.source!r})"
+
+def strip_comment(line: str):
+    # Комментарий начинается с // вне строковых литералов
+    quote = None
+    for i, char in enumerate(line):
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in ('"', "'"):
+            quote = char
+        elif char == '/' and line.startswith('//', i):
+            return line[:i]
+    return line
+
+class Statement:
+    __slots__ = ('line',)
+
+    def __repr__(self):
+        fields = ', '.join(repr(getattr(self, name)) for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+class IfStatement(Statement):
+    __slots__ = ('condition', 'body', 'else_body', 'else_line', 'end_line')
+
+    def __init__(self, line, condition, body, else_body, else_line=None, end_line=None):
+        self.line = line
+        self.condition = condition
+        self.body = body
+        self.else_body = else_body
+        self.else_line = else_line
+        self.end_line = end_line
+
+class WhileStatement(Statement):
+    __slots__ = ('condition', 'body', 'end_line', 'hoisted')
+
+    def __init__(self, line, condition, body, end_line=None):
+        self.line = line
+        self.condition = condition
+        self.body = body
+        self.end_line = end_line
+        # Ячейки вынесенных из цикла выражений, сбрасываемые при входе в цикл
+        self.hoisted = ()
+
+class FunctionDeclaration(Statement):
+    __slots__ = ('name', 'params', 'body', 'end_line')
+
+    def __init__(self, line, name, params, body, end_line=None):
+        self.line = line
+        self.name = name
+        self.params = params
+        self.body = body
+        self.end_line = end_line
+
+class Program:
+    __slots__ = ('body', 'line_count', 'hoisted_count')
+
+    def __init__(self, body, line_count):
+        self.body = body
+        self.line_count = line_count
+        self.hoisted_count = 0
+
+FUNCTION_HEADER = re.compile(r'функция\s+(\w+)\s*\((.*?)\)')
+
+def split_condition(text: str):
+    # Делит "условие то действие" по первому слову "то" вне строк
+    for token in tokenize(text):
+        if token.kind == 'name' and token.value == 'то':
+            return text[:token.start].strip(), text[token.end:].strip()
+    return text.strip(), ''
+
+class ProgramParser:
+    def __init__(self, code: str):
+        self.lines = code.split('\n')
+        self.pos = 0
+
+    def parse(self):
+        body = []
+        while self.pos < len(self.lines):
+            # Лишние "конец" и "иначе" на верхнем уровне пропускаются
+            statements, _ = self.parse_block()
+            body.extend(statements)
+        return Program(body, len(self.lines))
+
+    def next_line(self):
+        while self.pos < len(self.lines):
+            line_num = self.pos + 1
+            text = strip_comment(self.lines[self.pos].rstrip('\n\r')).strip()
+            self.pos += 1
+            if text:
+                return line_num, text
+        return None, None
+
+    def parse_block(self):
+        # Возвращает операторы блока и строку, которая его завершила
+        statements = []
+        while True:
+            line_num, text = self.next_line()
+            if text is None:
+                return statements, None
+            if text in ('конец', 'иначе'):
+                return statements, (line_num, text)
+            statements.append(self.parse_statement(line_num, text))
+
+    def parse_statement(self, line_num, text):
+        if text.startswith('если '):
+            return self.parse_if(line_num, text)
+        if text.startswith('цикл '):
+            body, terminator = self.parse_block()
+            while terminator is not None and terminator[1] == 'иначе':
+                more, terminator = self.parse_block()
+                body.extend(more)
+            end_line = terminator[0] if terminator else None
+            return WhileStatement(line_num, Expression(text[5:].strip()), body, end_line)
+        if text.startswith('функция '):
+            body, terminator = self.parse_block()
+            while terminator is not None and terminator[1] == 'иначе':
+                more, terminator = self.parse_block()
+                body.extend(more)
+            end_line = terminator[0] if terminator else None
+            match = FUNCTION_HEADER.match(text)
+            if not match:
+                return FunctionDeclaration(line_num, None, [], body, end_line)
+            params_str = match.group(2).strip()
+            params = [p.strip() for p in params_str.split(',')] if params_str else []
+            return FunctionDeclaration(line_num, match.group(1), params, body, end_line)
+        # Простой оператор классифицируется по ключевому слову один раз
+        return classify_statement(line_num, text)
+
+    def parse_if(self, line_num, text):
+        condition, action = split_condition(text[5:])
+        condition = Expression(condition)
+
+        if action:
+            # Однострочная форма: если условие то действие конец
+            if action == 'конец':
+                return IfStatement(line_num, condition, [], [], end_line=line_num)
+            if action.endswith(' конец'):
+                action = action[:-len(' конец')].strip()
+            return IfStatement(line_num, condition,
+                               [self.parse_statement(line_num, action)], [], end_line=line_num)
+
+        body, terminator = self.parse_block()
+        else_body = []
+        else_line = None
+        if terminator is not None and terminator[1] == 'иначе':
+            else_line = terminator[0]
+            else_body, terminator = self.parse_block()
+            while terminator is not None and terminator[1] == 'иначе':
+                more, terminator = self.parse_block()
+                else_body.extend(more)
+        end_line = terminator[0] if terminator else None
+        return IfStatement(line_num, condition, body, else_body, else_line, end_line)
+
+def parse_program(code: str):
+    return ProgramParser(code).parse()
+
+# Классификация простых операторов по ключевому слову
+
+class PassStatement(Statement):
+    __slots__ = ()
+
+    def __init__(self, line):
+        self.line = line
+
+class VarDeclaration(Statement):
+    # slot - ячейка переменной в кадре; ее задает разрешение имен
+    # (ri_resolver.bind_program), без него запись идет по имени
+    __slots__ = ('name', 'value', 'slot')
+
+    def __init__(self, line, name, value):
+        self.line = line
+        self.name = name
+        self.value = value
+        self.slot = None
+
+class Assignment(Statement):
+    __slots__ = ('name', 'value', 'slot')
+
+    def __init__(self, line, name, value):
+        self.line = line
+        self.name = name
+        self.value = value
+        self.slot = None
+
+class PrintStatement(Statement):
+    __slots__ = ('value',)
+
+    def __init__(self, line, value):
+        self.line = line
+        self.value = value
+
+class InputStatement(Statement):
+    __slots__ = ('name', 'slot')
+
+    def __init__(self, line, name):
+        self.line = line
+        self.name = name
+        self.slot = None
+
+class ListDeclaration(Statement):
+    __slots__ = ('name', 'items')
+
+    def __init__(self, line, name, items):
+        self.line = line
+        self.name = name
+        self.items = items
+
+class ListAppend(Statement):
+    __slots__ = ('name', 'value')
+
+    def __init__(self, line, name, value):
+        self.line = line
+        self.name = name
+        self.value = value
+
+class ListRemove(Statement):
+    __slots__ = ('name', 'index')
+
+    def __init__(self, line, name, index):
+        self.line = line
+        self.name = name
+        self.index = index
+
+class WindowCommand(Statement):
+    __slots__ = ('width', 'height', 'title')
+
+    def __init__(self, line, width, height, title):
+        self.line = line
+        self.width = width
+        self.height = height
+        self.title = title
+
+class DrawCommand(Statement):
+    # Прямоугольник, круг и линия: список выражений-аргументов и цвет
+    __slots__ = ('kind', 'args', 'color')
+
+    def __init__(self, line, kind, args, color):
+        self.line = line
+        self.kind = kind
+        self.args = args
+        self.color = color
+
+class TextCommand(Statement):
+    __slots__ = ('x', 'y', 'text', 'color')
+
+    def __init__(self, line, x, y, text, color):
+        self.line = line
+        self.x = x
+        self.y = y
+        self.text = text
+        self.color = color
+
+class ClearCommand(Statement):
+    __slots__ = ('color',)
+
+    def __init__(self, line, color):
+        self.line = line
+        self.color = color
+
+class UpdateCommand(Statement):
+    __slots__ = ()
+
+    def __init__(self, line):
+        self.line = line
+
+class DelayCommand(Statement):
+    __slots__ = ('value',)
+
+    def __init__(self, line, value):
+        self.line = line
+        self.value = value
+
+class SetHandlerCommand(Statement):
+    __slots__ = ('event_type', 'handler')
+
+    def __init__(self, line, event_type, handler):
+        self.line = line
+        self.event_type = event_type
+        self.handler = handler
+
+class EventQuery(Statement):
+    # мышь_х(), мышь_у(), мышь_нажата() и клавиша_нажата(...) как отдельные операторы
+    __slots__ = ('event', 'key', 'variable', 'slot')
+
+    def __init__(self, line, event, key, variable):
+        self.line = line
+        self.event = event
+        self.key = key
+        self.variable = variable
+        self.slot = None
+
+class StopStatement(Statement):
+    __slots__ = ()
+
+    def __init__(self, line):
+        self.line = line
+
+class ReturnStatement(Statement):
+    __slots__ = ('value',)
+
+    def __init__(self, line, value):
+        self.line = line
+        self.value = value
+
+class ExpressionStatement(Statement):
+    __slots__ = ('value',)
+
+    def __init__(self, line, value):
+        self.line = line
+        self.value = value
+
+DRAW_COMMANDS = {
+    'прямоугольник': ('rectangle', 4),
+    'круг': ('circle', 3),
+    'линия': ('line', 4),
+}
+
+EVENT_STATEMENTS = (
+    ('мышь_х()', 'get_mouse_x', 'мышь_х'),
+    ('мышь_у()', 'get_mouse_y', 'мышь_у'),
+    ('мышь_нажата()', 'get_mouse_pressed', 'мышь_нажата'),
+)
+
+def _classify_var(line, params):
+    if '=' in params:
+        name, expr = params.split('=', 1)
+        return VarDeclaration(line, name.strip(), Expression(expr.strip()))
+    # Объявление без присваивания
+    return VarDeclaration(line, params, None)
+
+def _classify_list(line, params):
+    if '=' in params:
+        name, expr = params.split('=', 1)
+        name = name.strip()
+        expr = expr.strip()
+        if expr.startswith('[') and expr.endswith(']'):
+            items_str = expr[1:-1].strip()
+            if items_str:
+                return ListDeclaration(line, name, [Expression(item.strip()) for item in items_str.split(',')])
+        return ListDeclaration(line, name, [])
+    # Объявление списка без присваивания
+    return ListDeclaration(line, params, [])
+
+def _classify_list_append(line, params):
+    parts = params.split(',')
+    if len(parts) >= 2:
+        return ListAppend(line, parts[0].strip(), Expression(parts[1].strip()))
+    return PassStatement(line)
+
+def _classify_list_remove(line, params):
+    parts = params.split(',')
+    if len(parts) >= 2:
+        return ListRemove(line, parts[0].strip(), Expression(parts[1].strip()))
+    return PassStatement(line)
+
+def _classify_window(line, params):
+    parts = params.split()
+    if len(parts) >= 2:
+        title = None if len(parts) < 3 else " ".join(parts[2:])
+        return WindowCommand(line, Expression(parts[0]), Expression(parts[1]), title)
+    return PassStatement(line)
+
+def _classify_text(line, params):
+    text_match = re.search(r'"([^"]*)"', params)
+    if text_match:
+        text = text_match.group(1)
+        params_without_text = params.replace(f'"{text}"', '').strip()
+        parts = params_without_text.split()
+        if len(parts) >= 2:
+            color = "черный" if len(parts) < 3 else parts[2]
+            return TextCommand(line, Expression(parts[0]), Expression(parts[1]), text, color)
+    return PassStatement(line)
+
+def _classify_set_handler(line, params):
+    parts = params.split()
+    if len(parts) >= 2:
+        return SetHandlerCommand(line, parts[0], parts[1])
+    return PassStatement(line)
+
+STATEMENT_CLASSIFIERS = {
+    'перем': _classify_var,
+    'вывести': lambda line, params: PrintStatement(line, Expression(params)),
+    'ввести': lambda line, params: InputStatement(line, params),
+    'список': _classify_list,
+    'добавить': _classify_list_append,
+    'удалить': _classify_list_remove,
+    'окно': _classify_window,
+    'текст': _classify_text,
+    'задержка': lambda line, params: DelayCommand(line, Expression(params)),
+    'очистить': lambda line, params: ClearCommand(line, params or "белый"),
+    'установить_обработчик': _classify_set_handler,
+    'возврат': lambda line, params: ReturnStatement(line, Expression(params)),
+}
+
+def classify_statement(line, text):
+    keyword, space, params = text.partition(' ')
+    if space:
+        classifier = STATEMENT_CLASSIFIERS.get(keyword)
+        if classifier is not None:
+            return classifier(line, params.strip())
+        draw = DRAW_COMMANDS.get(keyword)
+        if draw is not None:
+            kind, arg_count = draw
+            parts = params.split()
+            if len(parts) < arg_count:
+                return PassStatement(line)
+            color = "черный" if len(parts) <= arg_count else parts[arg_count]
+            return DrawCommand(line, kind, [Expression(part) for part in parts[:arg_count]], color)
+
+    for prefix, event, variable in EVENT_STATEMENTS:
+        if text.startswith(prefix):
+            return EventQuery(line, event, None, variable)
+
+    if text.startswith('клавиша_нажата('):
+        if ')' in text:
+            key_code = text[len('клавиша_нажата('):].split(')')[0].strip().strip('"\'')
+            return EventQuery(line, 'get_key_pressed', key_code, f'клавиша_{key_code}')
+        return PassStatement(line)
+
+    if text.startswith('обновить_экран()'):
+        return UpdateCommand(line)
+
+    if text.startswith('остановить()'):
+        return StopStatement(line)
+
+    if '=' in text:
+        # Обработка присваиваний
+        name, expr = text.split('=', 1)
+        return Assignment(line, name.strip(), Expression(expr.strip()))
+
+    # Просто выражение (может быть вызов функции)
+    return ExpressionStatement(line, Expression(text))
+
+# Обход дерева программы
+
+def statement_fields(statement_type, cache={}):
+    fields = cache.get(statement_type)
+    if fields is None:
+        fields = cache[statement_type] = [name for cls in statement_type.__mro__
+                                          for name in getattr(cls, '__slots__', ())]
+    return fields
+
+def statement_expressions(statement):
+    for field in statement_fields(type(statement)):
+        value = getattr(statement, field, None)
+        if isinstance(value, Expression):
+            yield value
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, Expression):
+                    yield item
+
+def walk_statements(statements, into_functions=True):
+    # Все операторы блока, включая вложенные
+    for statement in statements:
+        yield statement
+        statement_type = type(statement)
+        if statement_type is IfStatement:
+            yield from walk_statements(statement.body, into_functions)
+            yield from walk_statements(statement.else_body, into_functions)
+        elif statement_type is WhileStatement:
+            yield from walk_statements(statement.body, into_functions)
+        elif statement_type is FunctionDeclaration and into_functions:
+            yield from walk_statements(statement.body, into_functions)
+
+def walk_nodes(node):
+    yield node
+    node_type = type(node)
+    if node_type is BinOp or node_type is BoolOp or node_type is NumericOp:
+        yield from walk_nodes(node.left)
+        yield from walk_nodes(node.right)
+    elif node_type is UnaryOp:
+        yield from walk_nodes(node.operand)
+    elif node_type is Call or node_type is InlineCall:
+        for arg in node.args:
+            yield from walk_nodes(arg)
+    elif node_type is Index:
+        yield from walk_nodes(node.target)
+        yield from walk_nodes(node.index)
+    elif node_type is ListLiteral:
+        for item in node.items:
+            yield from walk_nodes(item)
+    elif node_type is Hoisted:
+        yield from walk_nodes(node.node)
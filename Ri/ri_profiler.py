@@ -0,0 +1,227 @@
+# Ri Language v2.13.1 - Профилировщики программ Ri: построчный и выборочный
+# Создано программистом KITTEN в 2025 году
+
+import json
+import time
+import threading
+
+MAIN_FUNCTION = '<программа>'
+
+class LineStats:
+    # total - время с вложенными строками и вызовами, self_time - только своё
+    __slots__ = ('line', 'function', 'hits', 'total', 'self_time')
+
+    def __init__(self, line, function):
+        self.line = line
+        self.function = function
+        self.hits = 0
+        self.total = 0.0
+        self.self_time = 0.0
+
+class FunctionStats:
+    __slots__ = ('name', 'line', 'calls', 'total', 'self_time')
+
+    def __init__(self, name, line):
+        self.name = name
+        self.line = line
+        self.calls = 0
+        self.total = 0.0
+        self.self_time = 0.0
+
+class LineProfiler:
+    # Время строки измеряется вокруг выполнения ее оператора; время вложенных
+    # строк вычитается из собственного. При рекурсии в total учитывается
+    # только внешний вызов, чтобы время не считалось дважды
+    def __init__(self):
+        self.lines = {}
+        self.functions = {}
+        # (вызывающая функция, строка вызова, вызываемая функция) -> [вызовы, время]
+        self.calls = {}
+        self.child_time = [0.0]
+        self.active_lines = {}
+        self.active_functions = {}
+        self.total = 0.0
+
+    def start_line(self, line):
+        self.child_time.append(0.0)
+        self.active_lines[line] = self.active_lines.get(line, 0) + 1
+
+    def end_line(self, line, function, elapsed):
+        child = self.child_time.pop()
+        self.child_time[-1] += elapsed
+        stats = self.lines.get(line)
+        if stats is None:
+            stats = self.lines[line] = LineStats(line, function or MAIN_FUNCTION)
+        stats.hits += 1
+        stats.self_time += elapsed - child
+        depth = self.active_lines[line] - 1
+        self.active_lines[line] = depth
+        if depth == 0:
+            stats.total += elapsed
+
+    def start_function(self, name, line):
+        if name not in self.functions:
+            self.functions[name] = FunctionStats(name, line)
+        self.active_functions[name] = self.active_functions.get(name, 0) + 1
+
+    def end_function(self, caller, call_line, name, elapsed):
+        stats = self.functions[name]
+        stats.calls += 1
+        depth = self.active_functions[name] - 1
+        self.active_functions[name] = depth
+        edge = self.calls.setdefault((caller or MAIN_FUNCTION, call_line, name), [0, 0.0])
+        edge[0] += 1
+        # Как и total функции: время вложенных рекурсивных вызовов уже входит во внешний
+        if depth == 0:
+            stats.total += elapsed
+            edge[1] += elapsed
+
+    def finish(self, total):
+        # Собственное время функции - сумма собственного времени ее строк
+        self.total = total
+        main = self.functions.get(MAIN_FUNCTION)
+        if main is None:
+            main = self.functions[MAIN_FUNCTION] = FunctionStats(MAIN_FUNCTION, 0)
+        main.calls = 1
+        main.total = total
+        for stats in self.functions.values():
+            stats.self_time = 0.0
+        for stats in self.lines.values():
+            function = self.functions.get(stats.function)
+            if function is not None:
+                function.self_time += stats.self_time
+
+    def hottest_lines(self, count=10):
+        return sorted(self.lines.values(), key=lambda stats: stats.self_time, reverse=True)[:count]
+
+    # Экспорт
+
+    def to_dict(self):
+        return {
+            'total': self.total,
+            'lines': {str(line): {'function': stats.function, 'hits': stats.hits,
+                                  'total': stats.total, 'self': stats.self_time}
+                      for line, stats in sorted(self.lines.items())},
+            'functions': {name: {'line': stats.line, 'calls': stats.calls,
+                                 'total': stats.total, 'self': stats.self_time}
+                          for name, stats in self.functions.items()},
+            'calls': [{'caller': caller, 'line': line, 'callee': callee,
+                       'count': count, 'total': elapsed}
+                      for (caller, line, callee), (count, elapsed) in self.calls.items()],
+        }
+
+    def write_json(self, path):
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(self.to_dict(), file, ensure_ascii=False, indent=2)
+
+    def to_callgrind(self, source_name='program.ri'):
+        # Формат callgrind (KCachegrind/QCachegrind): стоимость строк в
+        # микросекундах собственного времени и число выполнений
+        def us(seconds):
+            return int(round(seconds * 1_000_000))
+
+        out = ["# callgrind format", "version: 1", "creator: Ri profiler",
+               "positions: line", "events: Microseconds Hits",
+               f"summary: {us(self.total)} {sum(stats.hits for stats in self.lines.values())}", ""]
+        out.append(f"fl={source_name}")
+        for name in self.functions:
+            out.append(f"fn={name}")
+            for stats in sorted(self.lines.values(), key=lambda stats: stats.line):
+                if stats.function == name:
+                    out.append(f"{stats.line} {us(stats.self_time)} {stats.hits}")
+            for (caller, line, callee), (count, elapsed) in self.calls.items():
+                if caller == name:
+                    out.append(f"cfn={callee}")
+                    out.append(f"calls={count} {self.functions[callee].line}")
+                    out.append(f"{line} {us(elapsed)}")
+            out.append("")
+        return '\n'.join(out)
+
+    def write_callgrind(self, path, source_name='program.ri'):
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(self.to_callgrind(source_name))
+
+class SamplingProfiler:
+    # Выборочный профиль: фоновый поток с заданным интервалом читает текущую
+    # строку и кадры вызова исполнителя. Сам исполнитель ничего не замеряет,
+    # поэтому подходит для долгих программ (цикл истина)
+    def __init__(self, runner, interval=0.005):
+        self.runner = runner
+        self.interval = interval
+        # Стек (от программы к текущей строке) из пар (функция, строка) -> число выборок
+        self.stacks = {}
+        self.samples = 0
+        self.total = 0.0
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.thread = threading.Thread(target=self.run, name='ri-sampler', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+        self.total = time.perf_counter() - self.started
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        runner = self.runner
+        line = runner.current_line_num
+        frames = list(runner.frames)
+        stack = []
+        function = MAIN_FUNCTION
+        for frame in frames:
+            # Кадр хранит строку вызова в вызывающей функции
+            stack.append((function, frame.return_line))
+            function = frame.function
+        stack.append((function, line))
+        stack = tuple(stack)
+        self.stacks[stack] = self.stacks.get(stack, 0) + 1
+        self.samples += 1
+
+    def line_samples(self):
+        # Выборки, в которых строка была текущей (собственное время)
+        lines = {}
+        for stack, count in self.stacks.items():
+            line = stack[-1][1]
+            lines[line] = lines.get(line, 0) + count
+        return lines
+
+    def function_samples(self):
+        # Выборки, в которых функция была в стеке (время с вложенными вызовами)
+        functions = {}
+        for stack, count in self.stacks.items():
+            for function in {function for function, _ in stack}:
+                functions[function] = functions.get(function, 0) + count
+        return functions
+
+    def to_dict(self):
+        return {
+            'total': self.total,
+            'interval': self.interval,
+            'samples': self.samples,
+            'lines': {str(line): count for line, count in sorted(self.line_samples().items())},
+            'functions': self.function_samples(),
+        }
+
+    def write_json(self, path):
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(self.to_dict(), file, ensure_ascii=False, indent=2)
+
+    def to_collapsed(self):
+        # Формат свернутых стеков (flamegraph.pl, speedscope, inferno):
+        # кадры через ';', затем число выборок
+        lines = []
+        for stack, count in sorted(self.stacks.items()):
+            lines.append(';'.join(f"{function}:{line}" for function, line in stack) + f" {count}")
+        return '\n'.join(lines) + '\n'
+
+    def write_collapsed(self, path):
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(self.to_collapsed())
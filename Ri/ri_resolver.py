@@ -0,0 +1,160 @@
+# Ri Language v2.13.1 - Разрешение имен переменных в номера ячеек
+# Создано программистом KITTEN в 2025 году
+
+from ri_parser import (statement_expressions, Name, LocalName, GlobalName, ListLiteral, Index,
+                       Call, UnaryOp, BinOp, BoolOp, Hoisted, InlineCall, NumericOp,
+                       IfStatement, WhileStatement, FunctionDeclaration, VarDeclaration,
+                       Assignment, InputStatement, EventQuery)
+
+class _Unset:
+    # Значение ячейки, которой еще ничего не присвоено
+    __slots__ = ()
+
+    def __repr__(self):
+        return 'UNSET'
+
+UNSET = _Unset()
+
+# Операторы, записывающие переменную, и поле с ее именем
+STORE_TARGETS = {
+    VarDeclaration: 'name',
+    Assignment: 'name',
+    InputStatement: 'name',
+    EventQuery: 'variable',
+}
+
+class Scope:
+    # Область видимости: имя переменной -> номер ячейки в массиве кадра
+    def __init__(self, name, params=()):
+        self.name = name
+        self.names = []
+        self.slots = {}
+        self.param_slots = [self.add(param) for param in params]
+
+    def add(self, name):
+        slot = self.slots.get(name)
+        if slot is None:
+            slot = self.slots[name] = len(self.names)
+            self.names.append(name)
+        return slot
+
+    def __len__(self):
+        return len(self.names)
+
+    def new_frame(self, args=()):
+        # Массив ячеек выделяется сразу на все переменные кадра
+        slots = [UNSET] * len(self.names)
+        for i, slot in enumerate(self.param_slots):
+            slots[slot] = args[i] if i < len(args) else 0
+        return slots
+
+    def variables(self, slots):
+        return {name: value for name, value in zip(self.names, slots) if value is not UNSET}
+
+class Resolution:
+    def __init__(self):
+        self.globals = Scope('<программа>')
+        # Объявление функции -> ее локальная область
+        self.functions = {}
+
+    def resolve(self, scope, name):
+        # ('local', ячейка) / ('global', ячейка) / ('unbound', имя)
+        if scope is not self.globals and name in scope.slots:
+            return 'local', scope.slots[name]
+        if name in self.globals.slots:
+            return 'global', self.globals.slots[name]
+        return 'unbound', name
+
+def resolve_program(program):
+    # Глобальные - переменные, записываемые на верхнем уровне; локальные -
+    # параметры и переменные, записываемые в теле функции
+    resolution = Resolution()
+    _collect(program.body, resolution.globals, resolution)
+    return resolution
+
+def _collect(statements, scope, resolution):
+    for statement in statements:
+        statement_type = type(statement)
+        target = STORE_TARGETS.get(statement_type)
+        if target is not None:
+            scope.add(getattr(statement, target))
+        elif statement_type is IfStatement:
+            _collect(statement.body, scope, resolution)
+            _collect(statement.else_body, scope, resolution)
+        elif statement_type is WhileStatement:
+            _collect(statement.body, scope, resolution)
+        elif statement_type is FunctionDeclaration and statement.name is not None:
+            function_scope = Scope(statement.name, statement.params)
+            resolution.functions[statement] = function_scope
+            _collect(statement.body, function_scope, resolution)
+
+def bind_program(program, resolution):
+    # Для интерпретатора дерева: имена в выражениях заменяются узлами с номером
+    # ячейки, операторы записи получают ячейку цели. Необъявленные имена
+    # остаются Name и ищутся по имени во время выполнения
+    _bind_block(program.body, resolution.globals, resolution)
+
+def _bind_block(statements, scope, resolution):
+    for statement in statements:
+        for expression in statement_expressions(statement):
+            if expression.error is None:
+                expression.node = _bind_node(expression.node, scope, resolution)
+        statement_type = type(statement)
+        target = STORE_TARGETS.get(statement_type)
+        if target is not None:
+            statement.slot = scope.slots[getattr(statement, target)]
+        elif statement_type is IfStatement:
+            _bind_block(statement.body, scope, resolution)
+            _bind_block(statement.else_body, scope, resolution)
+        elif statement_type is WhileStatement:
+            _bind_block(statement.body, scope, resolution)
+        elif statement_type is FunctionDeclaration and statement.name is not None:
+            _bind_block(statement.body, resolution.functions[statement], resolution)
+
+def _bind_node(node, scope, resolution):
+    node_type = type(node)
+    if node_type is Name:
+        kind, target = resolution.resolve(scope, node.name)
+        if kind == 'local':
+            return LocalName(node.name, target)
+        if kind == 'global':
+            return GlobalName(node.name, target)
+        return node
+    if node_type is BinOp or node_type is BoolOp:
+        return node_type(node.op, _bind_node(node.left, scope, resolution),
+                         _bind_node(node.right, scope, resolution))
+    if node_type is NumericOp:
+        return NumericOp(node.op, _bind_node(node.left, scope, resolution),
+                         _bind_node(node.right, scope, resolution), node.kind, node.function)
+    if node_type is UnaryOp:
+        return UnaryOp(node.op, _bind_node(node.operand, scope, resolution))
+    if node_type is Index:
+        return Index(_bind_node(node.target, scope, resolution), _bind_node(node.index, scope, resolution))
+    if node_type is ListLiteral:
+        return ListLiteral([_bind_node(item, scope, resolution) for item in node.items])
+    if node_type is Call:
+        return Call(node.name, [_bind_node(arg, scope, resolution) for arg in node.args])
+    if node_type is InlineCall:
+        # Выражение возврата связывается вместе с телом функции, в ее области
+        return InlineCall(node.name, [_bind_node(arg, scope, resolution) for arg in node.args],
+                          node.declaration)
+    if node_type is Hoisted:
+        node.node = _bind_node(node.node, scope, resolution)
+    return node
+
+class SlotVariablesMixin:
+    # Общие методы исполнителей, хранящих переменные в ячейках:
+    # global_scope/global_slots - глобальная область и ее массив
+    def load_global(self, name):
+        # Локальная ячейка еще не присвоена - читаем глобальную переменную
+        slot = self.global_scope.slots.get(name)
+        if slot is not None and self.global_slots[slot] is not UNSET:
+            return self.global_slots[slot]
+        return self._lookup_unbound(name)
+
+    def visible_variables(self):
+        variables = self.global_scope.variables(self.global_slots)
+        if self.frames and self.frames[-1].variables is not None:
+            frame = self.frames[-1]
+            variables.update(frame.scope.variables(frame.variables))
+        return variables
@@ -0,0 +1,150 @@
+# Ri Language v2.13.1 - Запуск программ Ri из командной строки без графики
+# Создано программистом KITTEN в 2025 году
+#
+#   python -m ri_run программа.ri < ввод.txt
+#   python -m ri_run программа.ri --graphics кадры.jsonl
+#   python -m ri_run программа.ri --bench
+#   python -m ri_run программа.ri --profile профиль.json
+#   python -m ri_run программа.ri --metrics счетчики.json --sample стеки.folded
+
+import argparse
+import json
+import statistics
+import sys
+import time
+
+from ri_benchmark import ENGINES
+
+class StdinInput:
+    # Строки стандартного ввода для оператора "ввести"; при повторных
+    # запусках каждый запуск читает ввод с начала
+    def __init__(self, stream, prompts=True):
+        self.lines = stream.read().splitlines() if not stream.isatty() else None
+        self.stream = stream
+        self.prompts = prompts
+        self.position = 0
+
+    def rewind(self):
+        self.position = 0
+
+    def __call__(self, type, prompt):
+        if type != "input":
+            return ""
+        if self.prompts:
+            # Приглашение - в stderr, чтобы stdout содержал только вывод программы
+            print(prompt, end='', file=sys.stderr, flush=True)
+        if self.lines is None:
+            return self.stream.readline().rstrip('\r\n')
+        if self.position >= len(self.lines):
+            return ""
+        line = self.lines[self.position]
+        self.position += 1
+        return line
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m ri_run',
+        description='Выполнение программы Ri без IDE: ввод из stdin, вывод в stdout.')
+    parser.add_argument('program', help='файл программы .ri')
+    parser.add_argument('--engine', choices=sorted(ENGINES), default='tree',
+                        help='исполнитель (по умолчанию tree)')
+    parser.add_argument('--no-optimize', action='store_true', help='выполнять без оптимизатора')
+    parser.add_argument('--graphics', metavar='FILE',
+                        help='записать графические команды в файл (JSON, по команде в строке)')
+    parser.add_argument('--repeat', type=int, default=1, metavar='N',
+                        help='число замеряемых запусков')
+    parser.add_argument('--warmup', type=int, default=0, metavar='N',
+                        help='число запусков для разогрева перед замерами')
+    parser.add_argument('--bench', action='store_true',
+                        help='замер скорости: без вывода программы, по умолчанию --repeat 10 --warmup 2')
+    parser.add_argument('--sample', metavar='FILE',
+                        help='выборочный профиль в формате свернутых стеков (flame graph)')
+    # Построчный профиль, покрытие и счетчики - разные пути выполнения
+    modes = parser.add_mutually_exclusive_group()
+    modes.add_argument('--profile', metavar='FILE',
+                       help='построчный профиль: JSON для .json, иначе callgrind')
+    modes.add_argument('--coverage', metavar='FILE', help='покрытие строк и ветвей в формате LCOV')
+    modes.add_argument('--metrics', metavar='FILE', help='счетчики выполнения в JSON')
+    return parser
+
+def run_once(code, args, read_input):
+    compiler = ENGINES[args.engine]()
+    compiler.optimize = not args.no_optimize
+    if args.profile:
+        compiler.enable_profiling()
+    if args.sample:
+        compiler.enable_sampling()
+    if args.coverage:
+        compiler.enable_coverage()
+    if args.metrics:
+        compiler.enable_metrics()
+    read_input.rewind()
+    start = time.perf_counter()
+    output = compiler.execute(code, input_callback=read_input)
+    return compiler, output, time.perf_counter() - start
+
+def format_ms(seconds):
+    return f"{seconds * 1000:.2f} мс"
+
+def report_timings(timings, warmup):
+    line = f"ri: запусков {len(timings)} (разогрев {warmup}): мин {format_ms(min(timings))}, " \
+           f"медиана {format_ms(statistics.median(timings))}, среднее {format_ms(statistics.mean(timings))}"
+    if len(timings) > 1:
+        line += f" ± {format_ms(statistics.stdev(timings))}"
+    print(line, file=sys.stderr)
+
+def write_results(compiler, args):
+    source_name = args.program
+    if args.graphics:
+        with open(args.graphics, 'w', encoding='utf-8') as file:
+            for command in compiler.graphics_commands:
+                file.write(json.dumps(command, ensure_ascii=False) + '\n')
+    if args.profile:
+        if args.profile.endswith('.json'):
+            compiler.get_profile().write_json(args.profile)
+        else:
+            compiler.get_profile().write_callgrind(args.profile, source_name)
+    if args.sample:
+        compiler.get_sampling_profile().write_collapsed(args.sample)
+    if args.coverage:
+        compiler.get_coverage().write_lcov(args.coverage, source_name)
+    if args.metrics:
+        compiler.get_metrics().write_json(args.metrics)
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.bench:
+        if args.repeat == 1:
+            args.repeat = 10
+        if args.warmup == 0:
+            args.warmup = 2
+    if args.repeat < 1 or args.warmup < 0:
+        parser.error("--repeat должно быть не меньше 1, --warmup - не меньше 0")
+    if args.engine != 'tree' and (args.profile or args.sample or args.coverage or args.metrics):
+        parser.error("профиль, покрытие и счетчики доступны только для исполнителя tree")
+
+    try:
+        with open(args.program, 'r', encoding='utf-8') as file:
+            code = file.read()
+    except OSError as e:
+        parser.error(f"не удалось прочитать программу: {e}")
+
+    # Приглашения ввода не нужны, когда ввод не с клавиатуры или идет замер
+    read_input = StdinInput(sys.stdin, prompts=sys.stdin.isatty() and not args.bench)
+    for _ in range(args.warmup):
+        run_once(code, args, read_input)
+    timings = []
+    for _ in range(args.repeat):
+        compiler, output, elapsed = run_once(code, args, read_input)
+        timings.append(elapsed)
+
+    if output and not args.bench:
+        print(output)
+    write_results(compiler, args)
+    if args.bench or args.repeat > 1 or args.warmup:
+        report_timings(timings, args.warmup)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,161 @@
+# Ri Language v2.13.1 - Запись истории выполнения для отладки назад во времени
+# Создано программистом KITTEN в 2025 году
+
+from bisect import bisect_right
+from collections import deque
+
+from ri_resolver import UNSET
+
+# Оценка памяти записей, в байтах
+STEP_COST = 64
+CHANGE_COST = 48
+ITEM_COST = 16
+
+def _copy(value):
+    return value.copy() if isinstance(value, list) else value
+
+def _cost(value):
+    if isinstance(value, list):
+        return CHANGE_COST + ITEM_COST * len(value)
+    if isinstance(value, str):
+        return CHANGE_COST + len(value)
+    return CHANGE_COST
+
+class Segment:
+    # Полный снимок состояния и шаги после него до следующего снимка.
+    # Шаг - (строка, изменения), изменение - (вид, имя, значение)
+    __slots__ = ('first_step', 'snapshot', 'steps', 'cost')
+
+    def __init__(self, first_step, snapshot, cost):
+        self.first_step = first_step
+        self.snapshot = snapshot
+        self.steps = []
+        self.cost = cost
+
+class TimeTravelRecorder:
+    # Кольцевой буфер истории: при превышении бюджета памяти вытесняются
+    # самые старые снимки вместе с их шагами
+    def __init__(self, memory_budget=8 * 1024 * 1024, snapshot_interval=256):
+        self.memory_budget = memory_budget
+        self.snapshot_interval = snapshot_interval
+        self.segments = deque()
+        self.starts = deque()
+        self.cost = 0
+        self.step = -1
+        # Последнее записанное состояние
+        self.variables = {}
+        self.lists = {}
+        self.call_stack = ()
+        self.graphics_count = 0
+        self.output_count = 0
+        self.changed_lists = set()
+
+    def list_changed(self, name):
+        self.changed_lists.add(name)
+
+    def record(self, line, runner):
+        # Состояние перед выполнением строки line
+        self.step += 1
+        changes = self.collect_changes(runner)
+        segment = self.segments[-1] if self.segments else None
+        if segment is None or self.step - segment.first_step >= self.snapshot_interval:
+            self.take_snapshot(line)
+            return
+        cost = STEP_COST
+        for change in changes:
+            cost += _cost(change[2])
+        segment.steps.append((line, changes))
+        segment.cost += cost
+        self.cost += cost
+        self.evict()
+
+    def collect_changes(self, runner):
+        changes = []
+        variables = runner.visible_variables()
+        recorded = self.variables
+        for name, value in variables.items():
+            old = recorded.get(name, UNSET)
+            if old is UNSET or type(old) is not type(value) or old != value:
+                value = _copy(value)
+                recorded[name] = value
+                changes.append(('var', name, value))
+        if len(recorded) != len(variables):
+            for name in [name for name in recorded if name not in variables]:
+                del recorded[name]
+                changes.append(('var', name, UNSET))
+
+        for name in self.changed_lists:
+            items = runner.lists.get(name)
+            items = items.copy() if items is not None else UNSET
+            self.lists[name] = items
+            changes.append(('list', name, items))
+        self.changed_lists.clear()
+
+        if len(self.call_stack) != len(runner.call_stack) or list(self.call_stack) != runner.call_stack:
+            self.call_stack = tuple(runner.call_stack)
+            changes.append(('stack', None, self.call_stack))
+        if self.graphics_count != len(runner.graphics_commands):
+            self.graphics_count = len(runner.graphics_commands)
+            changes.append(('graphics', None, self.graphics_count))
+        if self.output_count != len(runner.output_lines):
+            self.output_count = len(runner.output_lines)
+            changes.append(('output', None, self.output_count))
+        return tuple(changes)
+
+    def take_snapshot(self, line):
+        snapshot = {
+            'line': line,
+            'variables': {name: _copy(value) for name, value in self.variables.items()},
+            'lists': {name: _copy(items) for name, items in self.lists.items()},
+            'call_stack': self.call_stack,
+            'graphics_count': self.graphics_count,
+            'output_count': self.output_count,
+        }
+        cost = STEP_COST + sum(_cost(value) for value in snapshot['variables'].values())
+        cost += sum(_cost(items) for items in snapshot['lists'].values())
+        self.segments.append(Segment(self.step, snapshot, cost))
+        self.starts.append(self.step)
+        self.cost += cost
+        self.evict()
+
+    def evict(self):
+        # Последний снимок не вытесняется: без него нельзя восстановить текущие шаги
+        while self.cost > self.memory_budget and len(self.segments) > 1:
+            self.cost -= self.segments.popleft().cost
+            self.starts.popleft()
+
+    def first_step(self):
+        return self.segments[0].first_step if self.segments else None
+
+    def last_step(self):
+        return self.step if self.segments else None
+
+    def state_at(self, step):
+        # Ближайший снимок не позже шага, затем изменения шагов после него
+        if not self.segments or not self.first_step() <= step <= self.step:
+            return None
+        segment = self.segments[bisect_right(self.starts, step) - 1]
+        snapshot = segment.snapshot
+        line = snapshot['line']
+        variables = {name: _copy(value) for name, value in snapshot['variables'].items()}
+        lists = {name: _copy(items) for name, items in snapshot['lists'].items()}
+        state = {
+            'call_stack': snapshot['call_stack'],
+            'graphics_count': snapshot['graphics_count'],
+            'output_count': snapshot['output_count'],
+        }
+        for line, changes in segment.steps[:step - segment.first_step]:
+            for kind, name, value in changes:
+                if kind == 'var' or kind == 'list':
+                    target = variables if kind == 'var' else lists
+                    if value is UNSET:
+                        target.pop(name, None)
+                    else:
+                        target[name] = _copy(value)
+                elif kind == 'stack':
+                    state['call_stack'] = value
+                else:
+                    state[kind + '_count'] = value
+        state.update(step=step, line=line, variables=variables, lists=lists,
+                     call_stack=list(state['call_stack']))
+        return state
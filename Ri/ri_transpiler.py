@@ -0,0 +1,480 @@
+# Ri Language v2.13.1 - Трансляция программ Ri в исходный код Python
+# Создано программистом KITTEN в 2025 году
+
+import time
+import hashlib
+from collections import OrderedDict
+
+from ri_parser import (parse_program, RiSyntaxError, Const, Name, ListLiteral, Index, Call,
+                       UnaryOp, BinOp, BoolOp, Hoisted, InlineCall, NumericOp, IfStatement, WhileStatement)
+from ri_resolver import resolve_program, UNSET
+from ri_optimizer import optimize_program
+from ri_compiler import (RiCompiler, RI_LANGUAGE_CREATOR, BINARY_OPERATIONS, NUMERIC_TYPES,
+                         StopProgram,
+                         ReturnValue, to_bool)
+
+TRANSPILER_VERSION = "6"
+
+# Операторы, которые в Python ведут себя так же, как в Ri
+INLINE_OPERATORS = {'-': '-', '*': '*', '^': '**'}
+
+# Остальные операторы вызываются через общие функции семантики Ri
+HELPER_OPERATORS = {
+    '+': '_add', '/': '_div', '//': '_floordiv', '%': '_mod',
+    '>': '_gt', '<': '_lt', '>=': '_ge', '<=': '_le', '==': '_eq', '!=': '_ne',
+}
+
+# Операторы над числами с выведенным типом: выполняются напрямую после проверки типов
+NUMERIC_OPERATORS = {
+    '+': '+',
+    '>': '>', '<': '<', '>=': '>=', '<=': '<=', '==': '==', '!=': '!=',
+}
+DIVISION_OPERATORS = {'/': '/', '//': '//', '%': '%'}
+
+def _ri_index(container, index):
+    if isinstance(container, (list, str)) and isinstance(index, (int, float)):
+        index = int(index)
+        if 0 <= index < len(container):
+            return container[index]
+    return 0
+
+def _runtime_namespace():
+    namespace = {
+        '_to_bool': to_bool,
+        '_index': _ri_index,
+        '_sleep': time.sleep,
+        'StopProgram': StopProgram,
+        'ReturnValue': ReturnValue,
+        '_UNSET': UNSET,
+        '_NUMERIC': NUMERIC_TYPES,
+    }
+    for op, helper in HELPER_OPERATORS.items():
+        namespace[helper] = BINARY_OPERATIONS[op]
+    return namespace
+
+class PythonTranslator:
+    def __init__(self, builtin_names):
+        self.builtin_names = builtin_names
+        self.functions = []
+        self.function_count = 0
+        self.function_names = {}
+
+    def translate(self, program):
+        self.resolution = resolve_program(program)
+        main = self.translate_function('_ri_main', program.body, self.resolution.globals)
+        return '\n\n'.join(self.functions + [main]) + '\n'
+
+    def translate_function(self, name, statements, scope):
+        saved = (getattr(self, 'lines', None), getattr(self, 'temp_count', 0),
+                 getattr(self, 'loop_count', 0), getattr(self, 'scope', None))
+        self.lines = []
+        self.temp_count = 0
+        self.loop_count = 0
+        self.scope = scope
+
+        # Глобальные переменные - ячейки массива G, локальные - переменные Python _lN
+        if scope is self.resolution.globals:
+            self.line(0, f"def {name}(rt, G):")
+        else:
+            self.line(0, f"def {name}(rt, G, A):")
+            bound = set()
+            for i, slot in enumerate(scope.param_slots):
+                self.line(1, f"_l{slot} = A[{i}] if len(A) > {i} else 0")
+                bound.add(slot)
+            for slot in range(len(scope)):
+                if slot not in bound:
+                    self.line(1, f"_l{slot} = _UNSET")
+        self.line(1, "_out = rt.output_lines.append")
+        self.translate_block(statements, 1)
+        self.line(1, "return None")
+        source = '\n'.join(self.lines)
+
+        self.lines, self.temp_count, self.loop_count, self.scope = saved
+        return source
+
+    def line(self, indent, text):
+        self.lines.append('    ' * indent + text)
+
+    def temp(self):
+        self.temp_count += 1
+        return f"_t{self.temp_count}"
+
+    # Выражения
+
+    def expression(self, expression, indent):
+        # Выражение верхнего уровня: ошибка внутри дает 0, как в evaluate_expression
+        target = self.temp()
+        self.line(indent, "try:")
+        if expression.error is not None:
+            self.line(indent + 1, f"raise rt.syntax_error({str(expression.error)!r})")
+        else:
+            self.line(indent + 1, f"{target} = {self.node(expression.node)}")
+        self.line(indent, "except StopProgram:")
+        self.line(indent + 1, "raise")
+        self.line(indent, "except Exception as _e:")
+        self.line(indent + 1, f"{target} = rt.expression_failed({expression.source!r}, _e)")
+        return target
+
+    def node(self, node):
+        node_type = type(node)
+
+        if node_type is Const:
+            return repr(node.value)
+
+        if node_type is Name:
+            kind, target = self.resolution.resolve(self.scope, node.name)
+            name = repr(node.name)
+            if kind == 'local':
+                if target in self.scope.param_slots:
+                    # Параметры связаны всегда
+                    return f"_l{target}"
+                return f"(_l{target} if _l{target} is not _UNSET else rt.load_global({name}))"
+            if kind == 'global':
+                return f"(G[{target}] if G[{target}] is not _UNSET else rt._lookup_unbound({name}))"
+            return f"rt._lookup_unbound({name})"
+
+        if node_type is BinOp:
+            left = self.node(node.left)
+            right = self.node(node.right)
+            if node.op in INLINE_OPERATORS:
+                # Операнды в скобках: иначе "(-2) ^ б" превратится в "-2 ** б"
+                return f"(({left}) {INLINE_OPERATORS[node.op]} ({right}))"
+            return f"{HELPER_OPERATORS[node.op]}({left}, {right})"
+
+        if node_type is NumericOp:
+            return self.numeric(node)
+
+        if node_type is BoolOp:
+            python_op = 'and' if node.op == 'и' else 'or'
+            return f"(_to_bool({self.node(node.left)}) {python_op} _to_bool({self.node(node.right)}))"
+
+        if node_type is UnaryOp:
+            if node.op == 'не':
+                return f"(not _to_bool({self.node(node.operand)}))"
+            return f"(-{self.node(node.operand)})"
+
+        if node_type is Call:
+            args = ', '.join(self.node(arg) for arg in node.args)
+            if node.name in self.builtin_names:
+                return f"rt.call_builtin_function({node.name!r}, [{args}])"
+            return f"rt.call_transpiled_function({node.name!r}, [{args}])"
+
+        if node_type is Index:
+            return f"_index({self.node(node.target)}, {self.node(node.index)})"
+
+        if node_type is ListLiteral:
+            return '[' + ', '.join(self.node(item) for item in node.items) + ']'
+
+        if node_type is Hoisted:
+            # Значение сохраняется в локальной переменной до следующего входа в цикл
+            cached = f"_h{node.slot}"
+            return f"({cached} if {cached} is not _UNSET else ({cached} := {self.node(node.node)}))"
+
+        if node_type is InlineCall:
+            # Прямой вызов транслированной функции, без кадра вызова
+            args = ', '.join(self.node(arg) for arg in node.args)
+            function = self.function_name(node.declaration)
+            return (f"({function}(rt, G, [{args}]) if {node.name!r} in rt.user_functions "
+                    f"else rt.unknown_function({node.name!r}))")
+
+        raise TypeError(f"Неизвестный узел выражения {node_type.__name__}")
+
+    def numeric(self, node):
+        if node.op in INLINE_OPERATORS:
+            # Операторы Python и так совпадают с Ri - проверять нечего
+            return f"(({self.node(node.left)}) {INLINE_OPERATORS[node.op]} ({self.node(node.right)}))"
+        # Операнды сохраняются во временных переменных; проверка типов через &,
+        # чтобы обе переменные были присвоены до ветки else
+        guards = []
+        operands = []
+        for operand in (node.left, node.right):
+            if type(operand) is Const:
+                operands.append(f"({operand.value!r})")
+                continue
+            temp = self.temp()
+            operands.append(temp)
+            if node.kind == 'int':
+                guards.append(f"(type({temp} := {self.node(operand)}) is int)")
+            else:
+                guards.append(f"(type({temp} := {self.node(operand)}) in _NUMERIC)")
+        left, right = operands
+        if node.op in DIVISION_OPERATORS:
+            fast = f"({left} {DIVISION_OPERATORS[node.op]} {right} if {right} else 0)"
+        else:
+            fast = f"{left} {NUMERIC_OPERATORS[node.op]} {right}"
+        generic = f"{HELPER_OPERATORS[node.op]}({left}, {right})"
+        if not guards:
+            return f"({fast})"
+        return f"({fast} if {' & '.join(guards)} else {generic})"
+
+    def function_name(self, statement):
+        # Функция транслируется один раз, при объявлении или при первом встраивании
+        function_name = self.function_names.get(statement)
+        if function_name is None:
+            self.function_count += 1
+            function_name = self.function_names[statement] = f"_ri_function_{self.function_count}"
+            self.functions.append(self.translate_function(function_name, statement.body,
+                                                          self.resolution.functions[statement]))
+        return function_name
+
+    def store(self, name):
+        kind, slot = self.resolution.resolve(self.scope, name)
+        return f"_l{slot}" if kind == 'local' else f"G[{slot}]"
+
+    # Операторы
+
+    def translate_block(self, statements, indent):
+        start = len(self.lines)
+        for statement in statements:
+            method = getattr(self, 'translate_' + type(statement).__name__)
+            if type(statement) in (IfStatement, WhileStatement):
+                # Условия защищены сами, а операторы тела - каждый отдельно
+                method(statement, indent)
+            else:
+                # Ошибка оператора сообщается, выполнение продолжается со следующего
+                self.line(indent, "try:")
+                method(statement, indent + 1)
+                self.line(indent, "except (StopProgram, ReturnValue):")
+                self.line(indent + 1, "raise")
+                self.line(indent, "except Exception as _e:")
+                self.line(indent + 1, f"rt.statement_failed({statement.line}, _e)")
+        if len(self.lines) == start:
+            self.line(indent, "pass")
+
+    def translate_PassStatement(self, statement, indent):
+        self.line(indent, "pass")
+
+    def translate_VarDeclaration(self, statement, indent):
+        if statement.value is None:
+            self.line(indent, f"{self.store(statement.name)} = 0")
+        else:
+            value = self.expression(statement.value, indent)
+            self.line(indent, f"{self.store(statement.name)} = {value}")
+
+    def translate_Assignment(self, statement, indent):
+        value = self.expression(statement.value, indent)
+        self.line(indent, f"{self.store(statement.name)} = {value}")
+
+    def translate_PrintStatement(self, statement, indent):
+        value = self.expression(statement.value, indent)
+        self.line(indent, f"_out(str({value}))")
+
+    def translate_InputStatement(self, statement, indent):
+        self.line(indent, f"{self.store(statement.name)} = rt.read_input({statement.name!r})")
+
+    def translate_ListDeclaration(self, statement, indent):
+        items = [self.expression(item, indent) for item in statement.items]
+        self.line(indent, f"rt.lists[{statement.name!r}] = [{', '.join(items)}]")
+
+    def translate_ListAppend(self, statement, indent):
+        value = self.expression(statement.value, indent)
+        name = repr(statement.name)
+        self.line(indent, f"if {name} in rt.lists:")
+        self.line(indent + 1, f"rt.lists[{name}].append({value})")
+        self.line(indent, "else:")
+        self.line(indent + 1, f"rt.lists[{name}] = [{value}]")
+
+    def translate_ListRemove(self, statement, indent):
+        index = self.expression(statement.index, indent)
+        name = repr(statement.name)
+        self.line(indent, "try:")
+        self.line(indent + 1, f"if {name} in rt.lists and 0 <= {index} < len(rt.lists[{name}]):")
+        self.line(indent + 2, f"del rt.lists[{name}][{index}]")
+        self.line(indent, "except:")
+        self.line(indent + 1, "pass")
+
+    def translate_WindowCommand(self, statement, indent):
+        width = self.expression(statement.width, indent)
+        height = self.expression(statement.height, indent)
+        title = statement.title
+        if title is None:
+            title = f"Графика Ri от {RI_LANGUAGE_CREATOR}"
+        self.line(indent, f"rt.emit_graphics(('window', {width}, {height}, {title!r}))")
+
+    def translate_DrawCommand(self, statement, indent):
+        values = [self.expression(arg, indent) for arg in statement.args]
+        self.line(indent, f"rt.emit_graphics(({statement.kind!r}, {', '.join(values)}, {statement.color!r}))")
+
+    def translate_TextCommand(self, statement, indent):
+        x = self.expression(statement.x, indent)
+        y = self.expression(statement.y, indent)
+        self.line(indent, f"rt.emit_graphics(('text', {x}, {y}, {statement.text!r}, {statement.color!r}))")
+
+    def translate_ClearCommand(self, statement, indent):
+        self.line(indent, f"rt.emit_graphics(('clear', {statement.color!r}))")
+
+    def translate_UpdateCommand(self, statement, indent):
+        self.line(indent, "rt.emit_graphics(('update',), False)")
+
+    def translate_DelayCommand(self, statement, indent):
+        value = self.expression(statement.value, indent)
+        self.line(indent, "try:")
+        self.line(indent + 1, f"_sleep({value} / 1000.0)")
+        self.line(indent, "except:")
+        self.line(indent + 1, "pass")
+
+    def translate_SetHandlerCommand(self, statement, indent):
+        data = f"{statement.event_type}:{statement.handler}"
+        self.line(indent, "if rt.event_callback:")
+        self.line(indent + 1, f"rt.event_callback('set_handler', {data!r})")
+
+    def translate_EventQuery(self, statement, indent):
+        self.line(indent, "if rt.event_callback:")
+        self.line(indent + 1, f"{self.store(statement.variable)} = "
+                              f"rt.query_event({statement.event!r}, {statement.key!r})")
+
+    def translate_StopStatement(self, statement, indent):
+        self.line(indent, "rt.stop_program()")
+
+    def translate_ReturnStatement(self, statement, indent):
+        value = self.expression(statement.value, indent)
+        self.line(indent, f"return {value}")
+
+    def translate_ExpressionStatement(self, statement, indent):
+        self.expression(statement.value, indent)
+
+    def translate_FunctionDeclaration(self, statement, indent):
+        if statement.name is None:
+            self.line(indent, "raise SyntaxError('неверное объявление функции')")
+            return
+        function_name = self.function_name(statement)
+        self.line(indent, f"rt.define_transpiled_function({statement.name!r}, {statement.params!r}, "
+                          f"{statement.line + 1}, {function_name})")
+
+    def translate_IfStatement(self, statement, indent):
+        condition = self.expression(statement.condition, indent)
+        self.line(indent, f"if {condition}:")
+        self.translate_block(statement.body, indent + 1)
+        if statement.else_body:
+            self.line(indent, "else:")
+            self.translate_block(statement.else_body, indent + 1)
+
+    def translate_WhileStatement(self, statement, indent):
+        self.loop_count += 1
+        counter = f"_n{self.loop_count}"
+        self.line(indent, f"{counter} = 0")
+        for slot in statement.hoisted:
+            self.line(indent, f"_h{slot} = _UNSET")
+        self.line(indent, f"while {counter} < rt.max_loop_iterations:")
+        condition = self.expression(statement.condition, indent + 1)
+        self.line(indent + 1, f"if not {condition}:")
+        self.line(indent + 2, "break")
+        self.translate_block(statement.body, indent + 1)
+        self.line(indent + 1, f"{counter} += 1")
+        self.line(indent, f"if {counter} >= rt.max_loop_iterations:")
+        self.line(indent + 1, "_out('Предупреждение: Превышено максимальное количество итераций цикла')")
+
+def transpile(code: str, builtin_names=None):
+    if builtin_names is None:
+        builtin_names = RiCompiler()._builtins
+    return PythonTranslator(builtin_names).translate(parse_program(code))
+
+# Кэш скомпилированных программ по хэшу исходного текста
+_code_cache = OrderedDict()
+CODE_CACHE_SIZE = 64
+
+def compile_ri_to_python(code: str, builtin_names=None, optimize=True):
+    key = hashlib.sha256((TRANSPILER_VERSION + str(int(optimize)) + '\0' + code).encode('utf-8')).hexdigest()
+    cached = _code_cache.get(key)
+    if cached is not None:
+        _code_cache.move_to_end(key)
+        return cached
+
+    if builtin_names is None:
+        builtin_names = RiCompiler()._builtins
+    program = parse_program(code)
+    report = []
+    if optimize:
+        optimize_program(program, builtin_names, report)
+    translator = PythonTranslator(builtin_names)
+    python_source = translator.translate(program)
+    code_object = compile(python_source, f"<ri {key[:12]}>", 'exec')
+    compiled = (code_object, python_source, translator.resolution.globals, report)
+    _code_cache[key] = compiled
+    if len(_code_cache) > CODE_CACHE_SIZE:
+        _code_cache.popitem(last=False)
+    return compiled
+
+class RiPythonRunner(RiCompiler):
+    def execute(self, code: str, graphics_callback=None, input_callback=None,
+                event_callback=None, debug_callback=None):
+        self.debug_callback = debug_callback
+        self.graphics_callback = graphics_callback
+        self.input_callback = input_callback
+        self.event_callback = event_callback
+        self.frames = []
+        self.output_lines = []
+        self.graphics_commands = []
+        self.has_graphics = False
+        self.event_handlers = {}
+        self.lists = {}
+        self.user_functions = {}
+        self.current_function = None
+
+        # Разбор, оптимизация и трансляция - один этап (результат кэшируется)
+        started = time.perf_counter()
+        code_object, self.python_source, self.global_scope, report = compile_ri_to_python(
+            code, self._builtins, self.optimize)
+        self.optimization_report = list(report)
+        self.global_slots = self.variables = self.global_scope.new_frame()
+        namespace = _runtime_namespace()
+        namespace['_sleep'] = self.sleep
+        exec(code_object, namespace)
+        self.phase_times = {'translate': time.perf_counter() - started}
+
+        started = time.perf_counter()
+        with self.call_depth_budget():
+            try:
+                namespace['_ri_main'](self, self.global_slots)
+            except StopProgram:
+                pass
+        self.phase_times['execute'] = time.perf_counter() - started
+
+        if self.has_graphics and self.graphics_callback and self.graphics_commands:
+            self.graphics_callback(self.graphics_commands)
+
+        return '\n'.join(self.output_lines)
+
+    def define_transpiled_function(self, name, params, start_line, function):
+        self.user_functions[name] = {
+            'params': params,
+            'start_line': start_line,
+            'python': function
+        }
+
+    def call_transpiled_function(self, func_name, args):
+        if func_name not in self.user_functions:
+            raise NameError(f"Неизвестная функция '{func_name}'")
+        func = self.user_functions[func_name]
+
+        # Локальные переменные транслированной функции - переменные кадра Python
+        self.push_frame(func_name, None)
+        try:
+            return func['python'](self, self.global_slots, args)
+        finally:
+            self.pop_frame()
+
+    def unknown_function(self, func_name):
+        raise NameError(f"Неизвестная функция '{func_name}'")
+
+    def expression_failed(self, source, error):
+        if self.debug_callback:
+            self.debug_callback("error", f"Ошибка вычисления '{source}': {str(error)}")
+        return 0
+
+    def statement_failed(self, line, error):
+        if self.current_function:
+            error_msg = f"Ошибка в функции {self.current_function}: {str(error)}"
+        else:
+            error_msg = f"Ошибка в строке {line}: {str(error)}"
+        self.output_lines.append(error_msg)
+        if self.debug_callback:
+            self.debug_callback("error", error_msg)
+
+    def syntax_error(self, message):
+        return RiSyntaxError(message)
+
+    def stop_program(self):
+        if self.debug_callback:
+            self.debug_callback("program_stopped", "")
+        raise StopProgram()
@@ -0,0 +1,261 @@
+# Ri Language v2.13.1 - Вывод типов и специализация арифметики
+# Создано программистом KITTEN в 2025 году
+
+from ri_parser import (walk_statements, statement_expressions, Const, Name, ListLiteral, Index,
+                       Call, UnaryOp, BinOp, BoolOp, Hoisted, InlineCall, NumericOp,
+                       IfStatement, WhileStatement, FunctionDeclaration, VarDeclaration, InputStatement,
+                       EventQuery)
+from ri_resolver import STORE_TARGETS
+from ri_compiler import NUMERIC_OPERATIONS
+
+# Тип выражения - множество возможных типов Python; None - любой тип
+INT = frozenset({int})
+FLOAT = frozenset({float})
+NUMBER = frozenset({int, float})
+BOOL = frozenset({bool})
+NOTHING = frozenset()
+
+# Операции, для которых есть быстрый путь над числами
+SPECIALIZED_OPERATORS = {'+', '-', '*', '/', '//', '%', '<', '>', '<=', '>=', '==', '!='}
+COMPARISONS = {'<', '>', '<=', '>=', '==', '!='}
+
+# Встроенные функции с одним аргументом, которые всегда возвращают число
+# (ошибка вызова, например с другим числом аргументов, дает None)
+BUILTIN_TYPES = {
+    'длина': INT,
+    'число': NUMBER,
+}
+
+def join(first, second):
+    if first is None or second is None:
+        return None
+    return first | second
+
+def is_numeric(types):
+    return bool(types) and types <= NUMBER
+
+def arithmetic_type(op, left, right):
+    if not (is_numeric(left) and is_numeric(right)):
+        return None
+    if op == '^':
+        # Отрицательная степень дает дробное, дробная степень отрицательного - комплексное
+        return NUMBER if left == INT and right == INT else None
+    if op == '/':
+        # Деление на ноль дает целый 0
+        return NUMBER
+    if left == INT and right == INT:
+        return INT
+    if op in ('//', '%'):
+        return NUMBER
+    if left == FLOAT or right == FLOAT:
+        return FLOAT
+    return NUMBER
+
+class TypeInference:
+    # Тип переменной - объединение типов всех присваиваемых ей выражений в ее
+    # области (программа или функция); тип параметра - объединение типов
+    # аргументов во всех местах вызова. Чтение переменной, которая присвоена
+    # не на всех путях до него, может вернуть глобальную переменную, список
+    # или имя, поэтому имеет любой тип. Так выведенный тип верен при любом
+    # выполнении, и операции над числами выполняются без проверок
+    def __init__(self, program):
+        self.program = program
+        self.specialized = 0
+        self.types = {None: {}}
+        self.local_names = {}
+        self.functions = {}
+        for statement in walk_statements(program.body):
+            if type(statement) is FunctionDeclaration and statement.name is not None:
+                self.types[statement] = {}
+                self.functions.setdefault(statement.name, []).append(statement)
+                local_names = set(statement.params)
+                for inner in walk_statements(statement.body, into_functions=False):
+                    target = STORE_TARGETS.get(type(inner))
+                    if target is not None:
+                        local_names.add(getattr(inner, target))
+                self.local_names[statement] = local_names
+
+    def scopes(self):
+        # (операторы, область, переменные, присвоенные в начале)
+        yield self.program.body, None, frozenset()
+        for declarations in self.functions.values():
+            for declaration in declarations:
+                yield declaration.body, declaration, frozenset(declaration.params)
+
+    def flow(self, statements, assigned):
+        # Пары (оператор, переменные, присвоенные на всех путях до него)
+        for statement in statements:
+            yield statement, assigned
+            statement_type = type(statement)
+            if statement_type is IfStatement:
+                then_assigned = yield from self.flow(statement.body, assigned)
+                else_assigned = yield from self.flow(statement.else_body, assigned)
+                assigned = then_assigned & else_assigned
+            elif statement_type is WhileStatement:
+                # Тело может не выполниться ни разу
+                yield from self.flow(statement.body, assigned)
+            elif statement_type in STORE_TARGETS:
+                assigned = assigned | {getattr(statement, STORE_TARGETS[statement_type])}
+        return assigned
+
+    def run(self):
+        # Итерация до неподвижной точки: множества типов только растут
+        self.changed = True
+        while self.changed:
+            self.changed = False
+            for statements, scope, assigned in self.scopes():
+                self.visit_block(statements, scope, assigned)
+        return self
+
+    def assign(self, scope, name, types):
+        variables = self.types[scope]
+        old = variables.get(name, NOTHING)
+        new = join(old, types)
+        if new != old:
+            variables[name] = new
+            self.changed = True
+
+    def visit_block(self, statements, scope, assigned):
+        for statement, self.assigned in self.flow(statements, assigned):
+            statement_type = type(statement)
+            if statement_type is InputStatement or statement_type is EventQuery:
+                self.assign(scope, getattr(statement, STORE_TARGETS[statement_type]), None)
+            elif statement_type is VarDeclaration and statement.value is None:
+                self.assign(scope, statement.name, INT)
+            elif statement_type in STORE_TARGETS:
+                self.assign(scope, statement.name, self.expression_type(statement.value, scope))
+            else:
+                for expression in statement_expressions(statement):
+                    self.expression_type(expression, scope)
+
+    def expression_type(self, expression, scope):
+        if expression.error is not None:
+            # Выражение с ошибкой дает 0
+            return INT
+        return self.node_type(expression.node, scope)
+
+    def variable_type(self, name, scope):
+        if scope is not None and name in self.local_names[scope]:
+            return self.types[scope].get(name, NOTHING)
+        return self.types[None].get(name)
+
+    def call_arguments(self, name, args, scope):
+        arg_types = [self.node_type(arg, scope) for arg in args]
+        for declaration in self.functions.get(name, ()):
+            for i, param in enumerate(declaration.params):
+                # Недостающий аргумент равен 0
+                self.assign(declaration, param, arg_types[i] if i < len(arg_types) else INT)
+
+    def node_type(self, node, scope):
+        node_type = type(node)
+
+        if node_type is Const:
+            return frozenset({type(node.value)})
+
+        if node_type is Name:
+            if node.name not in self.assigned:
+                return None
+            return self.variable_type(node.name, scope)
+
+        if node_type is BinOp or node_type is NumericOp:
+            left = self.node_type(node.left, scope)
+            right = self.node_type(node.right, scope)
+            if node.op in COMPARISONS:
+                return BOOL
+            return arithmetic_type(node.op, left, right)
+
+        if node_type is BoolOp:
+            self.node_type(node.left, scope)
+            self.node_type(node.right, scope)
+            return BOOL
+
+        if node_type is UnaryOp:
+            operand = self.node_type(node.operand, scope)
+            if node.op == 'не':
+                return BOOL
+            return operand if is_numeric(operand) else None
+
+        if node_type is Hoisted:
+            return self.node_type(node.node, scope)
+
+        if node_type is Call or node_type is InlineCall:
+            self.call_arguments(node.name, node.args, scope)
+            if node_type is Call and len(node.args) == 1:
+                return BUILTIN_TYPES.get(node.name)
+            return None
+
+        if node_type is Index:
+            self.node_type(node.target, scope)
+            self.node_type(node.index, scope)
+        elif node_type is ListLiteral:
+            for item in node.items:
+                self.node_type(item, scope)
+        return None
+
+    # Замена операций над числами на специализированные
+
+    def specialize(self):
+        for statements, scope, assigned in self.scopes():
+            for statement, self.assigned in self.flow(statements, assigned):
+                for expression in statement_expressions(statement):
+                    if expression.error is None:
+                        expression.node = self.specialize_node(expression.node, scope)
+        return self.specialized
+
+    def specialize_node(self, node, scope):
+        node_type = type(node)
+
+        if node_type is BinOp:
+            left = self.specialize_node(node.left, scope)
+            right = self.specialize_node(node.right, scope)
+            left_type = self.node_type(left, scope)
+            right_type = self.node_type(right, scope)
+            if node.op in SPECIALIZED_OPERATORS and is_numeric(left_type) and is_numeric(right_type):
+                self.specialized += 1
+                kind = 'int' if left_type == INT and right_type == INT else 'number'
+                return NumericOp(node.op, left, right, kind, NUMERIC_OPERATIONS[node.op])
+            if left is not node.left or right is not node.right:
+                return BinOp(node.op, left, right)
+            return node
+
+        if node_type is BoolOp:
+            left = self.specialize_node(node.left, scope)
+            right = self.specialize_node(node.right, scope)
+            if left is not node.left or right is not node.right:
+                return BoolOp(node.op, left, right)
+            return node
+
+        if node_type is UnaryOp:
+            operand = self.specialize_node(node.operand, scope)
+            return node if operand is node.operand else UnaryOp(node.op, operand)
+
+        if node_type is Hoisted:
+            node.node = self.specialize_node(node.node, scope)
+            return node
+
+        if node_type is Index:
+            target = self.specialize_node(node.target, scope)
+            index = self.specialize_node(node.index, scope)
+            if target is not node.target or index is not node.index:
+                return Index(target, index)
+            return node
+
+        if node_type is ListLiteral:
+            items = [self.specialize_node(item, scope) for item in node.items]
+            if any(new is not old for new, old in zip(items, node.items)):
+                return ListLiteral(items)
+            return node
+
+        if node_type is Call or node_type is InlineCall:
+            args = [self.specialize_node(arg, scope) for arg in node.args]
+            if all(new is old for new, old in zip(args, node.args)):
+                return node
+            if node_type is Call:
+                return Call(node.name, args)
+            return InlineCall(node.name, args, node.declaration)
+
+        return node
+
+def specialize_program(program):
+    # Возвращает число специализированных операций
+    return TypeInference(program).run().specialize()
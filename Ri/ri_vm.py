@@ -0,0 +1,684 @@
+# Ri Language v2.13.1 - Компилятор в байт-код и стековая виртуальная машина
+# Создано программистом KITTEN в 2025 году
+
+import time
+
+from ri_parser import (Const, Name, ListLiteral, Index, Call, UnaryOp, BinOp,
+                       BoolOp, Hoisted, InlineCall, NumericOp)
+from ri_resolver import resolve_program, UNSET
+from ri_compiler import (RiCompiler, RI_LANGUAGE_CREATOR, BINARY_OPERATIONS, NUMERIC_OPERATIONS,
+                         NUMERIC_TYPES, StopProgram,
+                         ReturnValue, to_bool)
+
+# Коды операций
+LOAD_CONST = 0
+LOAD_LOCAL = 1
+STORE_LOCAL = 2
+BINARY = 3
+JUMP_IF_FALSE = 4
+JUMP = 5
+LOOP_TEST = 6
+LOOP_NEXT = 7
+CALL_BUILTIN = 8
+CALL_FUNCTION = 9
+GRAPHICS = 10
+INDEX = 11
+BUILD_LIST = 12
+UNARY_NEGATIVE = 13
+UNARY_NOT = 14
+TO_BOOL = 15
+JUMP_IF_FALSE_KEEP = 16
+JUMP_IF_TRUE_KEEP = 17
+POP = 18
+PRINT = 19
+INPUT = 20
+DECLARE_LIST = 21
+APPEND_LIST = 22
+REMOVE_LIST = 23
+DELAY = 24
+SET_HANDLER = 25
+EVENT_QUERY = 26
+DEFINE_FUNCTION = 27
+LOOP_START = 28
+LOOP_WARN = 29
+FAIL = 30
+STOP = 31
+RETURN = 32
+LOAD_GLOBAL = 33
+STORE_GLOBAL = 34
+LOAD_UNBOUND = 35
+LOAD_HOISTED = 36
+STORE_HOISTED = 37
+RESET_HOISTED = 38
+CALL_INLINE = 39
+BINARY_NUMERIC = 40
+
+OPCODE_NAMES = {value: name for name, value in list(globals().items())
+                if name.isupper() and isinstance(value, int)}
+
+class CodeObject:
+    __slots__ = ('name', 'ops', 'args', 'expression_handlers', 'statement_handlers', 'loop_count',
+                 'scope')
+
+    def __init__(self, name, scope):
+        self.name = name
+        # Область видимости: номера ячеек локальных переменных кадра
+        self.scope = scope
+        self.ops = []
+        self.args = []
+        # Для каждой инструкции: обработчик ошибки выражения (продолжение, глубина стека, текст)
+        self.expression_handlers = []
+        # Для каждой инструкции: (номер строки, продолжение) для ошибок оператора
+        self.statement_handlers = []
+        self.loop_count = 0
+
+    def __len__(self):
+        return len(self.ops)
+
+    def disassemble(self):
+        lines = []
+        for pc, (op, arg) in enumerate(zip(self.ops, self.args)):
+            if isinstance(arg, CodeObject):
+                arg = f"<код {arg.name}>"
+            elif callable(arg):
+                arg = getattr(arg, '__name__', arg)
+            lines.append(f"{pc:4d} {OPCODE_NAMES[op]:<20} {'' if arg is None else arg}")
+        return '\n'.join(lines)
+
+class BytecodeCompiler:
+    def __init__(self, builtin_names):
+        self.builtin_names = builtin_names
+
+    def compile_program(self, program):
+        self.resolution = resolve_program(program)
+        self.function_codes = {}
+        return self.compile_body('<программа>', program.body, self.resolution.globals)
+
+    def compile_body(self, name, statements, scope):
+        code = CodeObject(name, scope)
+        self.code = code
+        self.expression_handler = None
+        self.statement_handler = None
+        self.depth = 0
+
+        self.compile_block(statements)
+        self.emit(LOAD_CONST, None)
+        self.emit(RETURN)
+        return code
+
+    # Вспомогательные методы
+
+    def emit(self, op, arg=None):
+        code = self.code
+        code.ops.append(op)
+        code.args.append(arg)
+        code.expression_handlers.append(self.expression_handler)
+        code.statement_handlers.append(self.statement_handler)
+        return len(code.ops) - 1
+
+    def label(self):
+        return len(self.code.ops)
+
+    def patch(self, index, target):
+        self.code.args[index] = target
+
+    def patch_handlers(self, start, end, handler, resume, kind):
+        # Продолжение после ошибки известно только после компиляции блока
+        handlers = self.code.expression_handlers if kind == 'expression' else self.code.statement_handlers
+        for pc in range(start, end):
+            if handlers[pc] is handler:
+                handlers[pc] = handler[:-1] + (resume,)
+
+    def compile_expression(self, expression):
+        # Выражение верхнего уровня: ошибка внутри дает 0, как в evaluate_expression
+        start = self.label()
+        handler = (self.depth, expression.source, None)
+        saved = self.expression_handler
+        self.expression_handler = handler
+        if expression.error is not None:
+            self.emit(FAIL, expression.error)
+        else:
+            self.compile_node(expression.node)
+        self.expression_handler = saved
+        end = self.label()
+        self.patch_handlers(start, end, handler, end, 'expression')
+        self.depth += 1
+
+    def compile_node(self, node):
+        node_type = type(node)
+
+        if node_type is Const:
+            self.emit(LOAD_CONST, node.value)
+
+        elif node_type is Name:
+            kind, target = self.resolution.resolve(self.code.scope, node.name)
+            if kind == 'local':
+                self.emit(LOAD_LOCAL, target)
+            elif kind == 'global':
+                self.emit(LOAD_GLOBAL, target)
+            else:
+                self.emit(LOAD_UNBOUND, target)
+
+        elif node_type is BinOp:
+            self.compile_node(node.left)
+            self.compile_node(node.right)
+            self.emit(BINARY, BINARY_OPERATIONS[node.op])
+
+        elif node_type is NumericOp:
+            self.compile_node(node.left)
+            self.compile_node(node.right)
+            self.emit(BINARY_NUMERIC, (NUMERIC_OPERATIONS[node.op], BINARY_OPERATIONS[node.op]))
+
+        elif node_type is BoolOp:
+            self.compile_node(node.left)
+            self.emit(TO_BOOL)
+            jump = self.emit(JUMP_IF_FALSE_KEEP if node.op == 'и' else JUMP_IF_TRUE_KEEP)
+            self.emit(POP)
+            self.compile_node(node.right)
+            self.emit(TO_BOOL)
+            self.patch(jump, self.label())
+
+        elif node_type is UnaryOp:
+            self.compile_node(node.operand)
+            self.emit(UNARY_NOT if node.op == 'не' else UNARY_NEGATIVE)
+
+        elif node_type is Call:
+            for arg in node.args:
+                self.compile_node(arg)
+            if node.name in self.builtin_names:
+                self.emit(CALL_BUILTIN, (node.name, len(node.args)))
+            else:
+                self.emit(CALL_FUNCTION, (node.name, len(node.args)))
+
+        elif node_type is Index:
+            self.compile_node(node.target)
+            self.compile_node(node.index)
+            self.emit(INDEX)
+
+        elif node_type is ListLiteral:
+            for item in node.items:
+                self.compile_node(item)
+            self.emit(BUILD_LIST, len(node.items))
+
+        elif node_type is Hoisted:
+            # Уже вычисленное значение - переход за код вычисления
+            load = self.emit(LOAD_HOISTED)
+            self.compile_node(node.node)
+            self.emit(STORE_HOISTED, node.slot)
+            self.patch(load, (node.slot, self.label()))
+
+        elif node_type is InlineCall:
+            for arg in node.args:
+                self.compile_node(arg)
+            self.emit(CALL_INLINE, (node.name, len(node.args), self.function_code(node.declaration)))
+
+        else:
+            raise TypeError(f"Неизвестный узел выражения {node_type.__name__}")
+
+    def function_code(self, statement):
+        # Код функции нужен и объявлению, и местам встраивания
+        code = self.function_codes.get(statement)
+        if code is None:
+            saved = (self.code, self.expression_handler, self.statement_handler, self.depth)
+            code = self.compile_body(statement.name, statement.body,
+                                     self.resolution.functions[statement])
+            self.code, self.expression_handler, self.statement_handler, self.depth = saved
+            self.function_codes[statement] = code
+        return code
+
+    def compile_store(self, name):
+        kind, slot = self.resolution.resolve(self.code.scope, name)
+        self.emit(STORE_LOCAL if kind == 'local' else STORE_GLOBAL, slot)
+
+    def compile_block(self, statements):
+        for statement in statements:
+            self.compile_statement(statement)
+
+    def compile_statement(self, statement):
+        start = self.label()
+        handler = (statement.line, None)
+        saved = self.statement_handler
+        self.statement_handler = handler
+        self.depth = 0
+
+        getattr(self, 'compile_' + type(statement).__name__)(statement)
+
+        self.statement_handler = saved
+        self.depth = 0
+        end = self.label()
+        self.patch_handlers(start, end, handler, end, 'statement')
+
+    # Операторы
+
+    def compile_PassStatement(self, statement):
+        pass
+
+    def compile_VarDeclaration(self, statement):
+        if statement.value is None:
+            self.emit(LOAD_CONST, 0)
+        else:
+            self.compile_expression(statement.value)
+        self.compile_store(statement.name)
+
+    def compile_Assignment(self, statement):
+        self.compile_expression(statement.value)
+        self.compile_store(statement.name)
+
+    def compile_PrintStatement(self, statement):
+        self.compile_expression(statement.value)
+        self.emit(PRINT)
+
+    def compile_InputStatement(self, statement):
+        self.emit(INPUT, statement.name)
+        self.compile_store(statement.name)
+
+    def compile_ListDeclaration(self, statement):
+        for item in statement.items:
+            self.compile_expression(item)
+        self.emit(DECLARE_LIST, (statement.name, len(statement.items)))
+
+    def compile_ListAppend(self, statement):
+        self.compile_expression(statement.value)
+        self.emit(APPEND_LIST, statement.name)
+
+    def compile_ListRemove(self, statement):
+        self.compile_expression(statement.index)
+        self.emit(REMOVE_LIST, statement.name)
+
+    def compile_WindowCommand(self, statement):
+        self.compile_expression(statement.width)
+        self.compile_expression(statement.height)
+        title = statement.title
+        if title is None:
+            title = f"Графика Ri от {RI_LANGUAGE_CREATOR}"
+        self.emit(GRAPHICS, ('window', 2, (title,), True))
+
+    def compile_DrawCommand(self, statement):
+        for arg in statement.args:
+            self.compile_expression(arg)
+        self.emit(GRAPHICS, (statement.kind, len(statement.args), (statement.color,), True))
+
+    def compile_TextCommand(self, statement):
+        self.compile_expression(statement.x)
+        self.compile_expression(statement.y)
+        self.emit(GRAPHICS, ('text', 2, (statement.text, statement.color), True))
+
+    def compile_ClearCommand(self, statement):
+        self.emit(GRAPHICS, ('clear', 0, (statement.color,), True))
+
+    def compile_UpdateCommand(self, statement):
+        self.emit(GRAPHICS, ('update', 0, (), False))
+
+    def compile_DelayCommand(self, statement):
+        self.compile_expression(statement.value)
+        self.emit(DELAY)
+
+    def compile_SetHandlerCommand(self, statement):
+        self.emit(SET_HANDLER, (statement.event_type, statement.handler))
+
+    def compile_EventQuery(self, statement):
+        # Без обработчика событий переменная не меняется
+        query = self.emit(EVENT_QUERY)
+        self.compile_store(statement.variable)
+        self.patch(query, (statement.event, statement.key, self.label()))
+
+    def compile_StopStatement(self, statement):
+        self.emit(STOP)
+
+    def compile_ReturnStatement(self, statement):
+        self.compile_expression(statement.value)
+        self.emit(RETURN)
+
+    def compile_ExpressionStatement(self, statement):
+        self.compile_expression(statement.value)
+        self.emit(POP)
+
+    def compile_IfStatement(self, statement):
+        self.compile_expression(statement.condition)
+        jump_else = self.emit(JUMP_IF_FALSE)
+        self.compile_block(statement.body)
+        if statement.else_body:
+            jump_end = self.emit(JUMP)
+            self.patch(jump_else, self.label())
+            self.compile_block(statement.else_body)
+            self.patch(jump_end, self.label())
+        else:
+            self.patch(jump_else, self.label())
+
+    def compile_WhileStatement(self, statement):
+        counter = self.code.loop_count
+        self.code.loop_count += 1
+
+        if statement.hoisted:
+            self.emit(RESET_HOISTED, statement.hoisted)
+        self.emit(LOOP_START, counter)
+        top = self.label()
+        loop_test = self.emit(LOOP_TEST, (counter, None))
+        self.compile_expression(statement.condition)
+        jump_exit = self.emit(JUMP_IF_FALSE)
+        self.depth = 0
+        self.compile_block(statement.body)
+        self.emit(LOOP_NEXT, counter)
+        self.emit(JUMP, top)
+        self.patch(loop_test, (counter, self.label()))
+        self.emit(LOOP_WARN)
+        self.patch(jump_exit, self.label())
+
+    def compile_FunctionDeclaration(self, statement):
+        code = None
+        if statement.name is not None:
+            code = self.function_code(statement)
+        self.emit(DEFINE_FUNCTION, (statement, code))
+
+class RiVirtualMachine(RiCompiler):
+    # Байт-код обращается к ячейкам сам, дерево связывать не нужно
+    bind_names = False
+
+    def execute(self, code: str, graphics_callback=None, input_callback=None,
+                event_callback=None, debug_callback=None):
+        self.debug_callback = debug_callback
+        self.graphics_callback = graphics_callback
+        self.input_callback = input_callback
+        self.event_callback = event_callback
+        self.frames = []
+        self.output_lines = []
+        self.graphics_commands = []
+        self.has_graphics = False
+        self.event_handlers = {}
+        self.lists = {}
+        self.user_functions = {}
+        self.current_function = None
+
+        program = self.prepare_program(code)
+        started = time.perf_counter()
+        self.code_object = BytecodeCompiler(self._builtins).compile_program(program)
+        self.phase_times['compile'] = time.perf_counter() - started
+        self.global_scope = self.code_object.scope
+        self.global_slots = self.variables = self.global_scope.new_frame()
+
+        started = time.perf_counter()
+        with self.call_depth_budget():
+            try:
+                self.run_code_object(self.code_object, self.global_slots)
+            except StopProgram:
+                pass
+        self.phase_times['execute'] = time.perf_counter() - started
+
+        if self.has_graphics and self.graphics_callback and self.graphics_commands:
+            self.graphics_callback(self.graphics_commands)
+
+        return '\n'.join(self.output_lines)
+
+    def call_compiled_function(self, func_name, args):
+        code = self.user_functions[func_name]['code']
+        slots = code.scope.new_frame(args)
+        self.push_frame(func_name, slots, code.scope)
+        try:
+            return self.run_code_object(code, slots)
+        finally:
+            self.pop_frame()
+
+    def run_code_object(self, code, slots):
+        ops = code.ops
+        args = code.args
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        counters = [0] * code.loop_count
+        max_iterations = self.max_loop_iterations
+        global_slots = self.global_slots
+        global_names = self.global_scope.names
+        local_names = code.scope.names
+        hoisted = self.hoisted_values
+        pc = 0
+
+        while True:
+            try:
+                while True:
+                    op = ops[pc]
+                    arg = args[pc]
+                    pc += 1
+
+                    if op == LOAD_LOCAL:
+                        value = slots[arg]
+                        if value is UNSET:
+                            value = self.load_global(local_names[arg])
+                        push(value)
+
+                    elif op == LOAD_GLOBAL:
+                        value = global_slots[arg]
+                        if value is UNSET:
+                            value = self._lookup_unbound(global_names[arg])
+                        push(value)
+
+                    elif op == LOAD_CONST:
+                        push(arg)
+
+                    elif op == LOAD_HOISTED:
+                        slot, skip = arg
+                        value = hoisted[slot]
+                        if value is not UNSET:
+                            push(value)
+                            pc = skip
+
+                    elif op == LOAD_UNBOUND:
+                        push(self._lookup_unbound(arg))
+
+                    elif op == BINARY:
+                        right = pop()
+                        stack[-1] = arg(stack[-1], right)
+
+                    elif op == BINARY_NUMERIC:
+                        right = pop()
+                        left = stack[-1]
+                        if type(left) in NUMERIC_TYPES and type(right) in NUMERIC_TYPES:
+                            stack[-1] = arg[0](left, right)
+                        else:
+                            stack[-1] = arg[1](left, right)
+
+                    elif op == STORE_LOCAL:
+                        slots[arg] = pop()
+
+                    elif op == STORE_GLOBAL:
+                        global_slots[arg] = pop()
+
+                    elif op == JUMP_IF_FALSE:
+                        if not pop():
+                            pc = arg
+
+                    elif op == JUMP:
+                        pc = arg
+
+                    elif op == LOOP_TEST:
+                        counter, target = arg
+                        if counters[counter] >= max_iterations:
+                            pc = target
+
+                    elif op == LOOP_NEXT:
+                        counters[arg] += 1
+
+                    elif op == CALL_BUILTIN:
+                        name, argc = arg
+                        if argc:
+                            call_args = stack[-argc:]
+                            del stack[-argc:]
+                        else:
+                            call_args = []
+                        push(self.call_builtin_function(name, call_args))
+
+                    elif op == GRAPHICS:
+                        kind, argc, extra, marks_graphics = arg
+                        if argc:
+                            values = tuple(stack[-argc:])
+                            del stack[-argc:]
+                        else:
+                            values = ()
+                        self.emit_graphics((kind,) + values + extra, marks_graphics)
+
+                    elif op == CALL_FUNCTION:
+                        name, argc = arg
+                        if argc:
+                            call_args = stack[-argc:]
+                            del stack[-argc:]
+                        else:
+                            call_args = []
+                        if name not in self.user_functions:
+                            raise NameError(f"Неизвестная функция '{name}'")
+                        push(self.call_compiled_function(name, call_args))
+
+                    elif op == CALL_INLINE:
+                        # Небольшая функция: ее код выполняется без кадра вызова
+                        name, argc, function_code = arg
+                        if argc:
+                            call_args = stack[-argc:]
+                            del stack[-argc:]
+                        else:
+                            call_args = []
+                        if name not in self.user_functions:
+                            raise NameError(f"Неизвестная функция '{name}'")
+                        push(self.run_code_object(function_code, function_code.scope.new_frame(call_args)))
+
+                    elif op == INDEX:
+                        index = pop()
+                        container = stack[-1]
+                        if isinstance(container, (list, str)) and isinstance(index, (int, float)):
+                            index = int(index)
+                            if 0 <= index < len(container):
+                                stack[-1] = container[index]
+                                continue
+                        stack[-1] = 0
+
+                    elif op == TO_BOOL:
+                        stack[-1] = to_bool(stack[-1])
+
+                    elif op == JUMP_IF_FALSE_KEEP:
+                        if not stack[-1]:
+                            pc = arg
+
+                    elif op == JUMP_IF_TRUE_KEEP:
+                        if stack[-1]:
+                            pc = arg
+
+                    elif op == POP:
+                        pop()
+
+                    elif op == UNARY_NEGATIVE:
+                        stack[-1] = -stack[-1]
+
+                    elif op == UNARY_NOT:
+                        stack[-1] = not to_bool(stack[-1])
+
+                    elif op == BUILD_LIST:
+                        if arg:
+                            items = stack[-arg:]
+                            del stack[-arg:]
+                        else:
+                            items = []
+                        push(items)
+
+                    elif op == PRINT:
+                        self.output_lines.append(str(pop()))
+
+                    elif op == LOOP_START:
+                        counters[arg] = 0
+
+                    elif op == RESET_HOISTED:
+                        for slot in arg:
+                            hoisted[slot] = UNSET
+
+                    elif op == STORE_HOISTED:
+                        hoisted[arg] = stack[-1]
+
+                    elif op == LOOP_WARN:
+                        self.output_lines.append("Предупреждение: Превышено максимальное количество итераций цикла")
+
+                    elif op == DELAY:
+                        ms = pop()
+                        try:
+                            self.sleep(ms / 1000.0)
+                        except:
+                            pass
+
+                    elif op == EVENT_QUERY:
+                        event, key, skip = arg
+                        if self.event_callback:
+                            push(self.query_event(event, key))
+                        else:
+                            pc = skip
+
+                    elif op == INPUT:
+                        push(self.read_input(arg))
+
+                    elif op == DECLARE_LIST:
+                        name, count = arg
+                        if count:
+                            items = stack[-count:]
+                            del stack[-count:]
+                        else:
+                            items = []
+                        self.lists[name] = items
+
+                    elif op == APPEND_LIST:
+                        value = pop()
+                        if arg in self.lists:
+                            self.lists[arg].append(value)
+                        else:
+                            # Если список не существует, создаем его
+                            self.lists[arg] = [value]
+
+                    elif op == REMOVE_LIST:
+                        index = pop()
+                        try:
+                            if arg in self.lists and 0 <= index < len(self.lists[arg]):
+                                del self.lists[arg][index]
+                        except:
+                            pass
+
+                    elif op == SET_HANDLER:
+                        if self.event_callback:
+                            self.event_callback("set_handler", f"{arg[0]}:{arg[1]}")
+
+                    elif op == DEFINE_FUNCTION:
+                        statement, function_code = arg
+                        if statement.name is None:
+                            raise SyntaxError("неверное объявление функции")
+                        self.user_functions[statement.name] = {
+                            'params': statement.params,
+                            'body': statement.body,
+                            'start_line': statement.line + 1,
+                            'code': function_code
+                        }
+
+                    elif op == RETURN:
+                        return pop()
+
+                    elif op == STOP:
+                        if self.debug_callback:
+                            self.debug_callback("program_stopped", "")
+                        raise StopProgram()
+
+                    elif op == FAIL:
+                        raise arg
+
+            except (StopProgram, ReturnValue):
+                raise
+            except Exception as e:
+                failed = pc - 1
+                handler = code.expression_handlers[failed]
+                if handler is not None:
+                    depth, source, resume = handler
+                    del stack[depth:]
+                    push(0)
+                    if self.debug_callback:
+                        self.debug_callback("error", f"Ошибка вычисления '{source}': {str(e)}")
+                else:
+                    line, resume = code.statement_handlers[failed]
+                    del stack[:]
+                    if self.current_function:
+                        error_msg = f"Ошибка в функции {self.current_function}: {str(e)}"
+                    else:
+                        error_msg = f"Ошибка в строке {line}: {str(e)}"
+                    self.output_lines.append(error_msg)
+                    if self.debug_callback:
+                        self.debug_callback("error", error_msg)
+                pc = resume
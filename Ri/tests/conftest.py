@@ -0,0 +1,5 @@
+# Модули Ri импортируются по имени, как при запуске из папки Ri
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
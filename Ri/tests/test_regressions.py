@@ -0,0 +1,108 @@
+# Ri Language v2.13.1 - Регрессионные программы для проходов оптимизатора и исполнителей
+# Создано программистом KITTEN в 2025 году
+#
+#   python -m pytest Ri/tests
+#
+# Каждая программа выполняется всеми исполнителями с оптимизатором и сравнивается
+# с интерпретатором дерева без оптимизатора (см. ri_difftest)
+
+import pytest
+
+from ri_compiler import RiCompiler
+from ri_difftest import compare_engines, run_reference
+
+PROGRAMS = {
+    # Свертка констант: деление на ноль дает 0, деление строки - ошибку во время выполнения
+    'свертка деления на ноль': (
+        "перем а = 1 / 0\n"
+        "вывести а\n"
+        "вывести 5 % 0\n"
+        'вывести "а" / 0\n'
+        "вывести (2 + 3) / (1 - 1)\n",
+        ['0', '0', '0', '0'],
+    ),
+    # Вынесенное из цикла выражение не должно читать список, который цикл меняет
+    'вынос из цикла при изменении списка': (
+        "список сп = [1, 2]\n"
+        "перем к = 3\n"
+        "перем с = 0\n"
+        "цикл с < 3\n"
+        "    добавить сп, с\n"
+        "    вывести к * 2 + длина(сп)\n"
+        "    вывести элемент(сп, 2)\n"
+        "    удалить сп, 0\n"
+        "    перем с = с + 1\n"
+        "конец\n",
+        ['9', '0', '9', '1', '9', '2'],
+    ),
+    # Встроенный вызов должен видеть новое объявление функции
+    'встраивание при повторном объявлении': (
+        "функция ф(х)\n"
+        "    возврат х + 1\n"
+        "конец\n"
+        "вывести ф(1)\n"
+        "перем с = 0\n"
+        "цикл с < 2\n"
+        "    вывести ф(с)\n"
+        "    если с == 0 то\n"
+        "        функция ф(х)\n"
+        "            возврат х * 10\n"
+        "        конец\n"
+        "    конец\n"
+        "    перем с = с + 1\n"
+        "конец\n",
+        ['2', '1', '10'],
+    ),
+    # Отрицательное основание в скобках - часть степени, без скобок минус применяется к степени
+    'степень с отрицательным основанием': (
+        "перем б = 2\n"
+        "вывести (-2) ^ б\n"
+        "вывести -2 ^ б\n"
+        "вывести (-2) ^ 3\n"
+        "вывести (-б) ^ б\n"
+        "вывести б ^ (-1)\n"
+        "вывести (-2) ^ (б - 1)\n",
+        ['4', '-4', '-8', '4', '0.5', '-2'],
+    ),
+    # "и" после операнда - оператор, в остальных местах - имя переменной
+    'переменная и': (
+        "перем и = 0\n"
+        "цикл и < 3\n"
+        "    вывести и\n"
+        "    перем и = и + 1\n"
+        "конец\n"
+        "если и > 1 и и < 5 то\n"
+        "    вывести и * 2\n"
+        "конец\n",
+        ['0', '1', '2', '6'],
+    ),
+}
+
+@pytest.mark.parametrize('name', list(PROGRAMS))
+def test_engines_match_reference(name):
+    code, expected = PROGRAMS[name]
+    reference = run_reference(code)
+    assert reference['error'] is None
+    assert reference['output'] == expected
+    assert compare_engines(code) == {}
+
+def test_coverage_keeps_pruned_code():
+    # Ветки с постоянным условием удаляются оптимизатором, но при покрытии
+    # они должны остаться в отчете непокрытыми строками
+    code = ("перем а = 1\n"
+            "если ложь то\n"
+            "    вывести 1\n"
+            "конец\n"
+            "цикл ложь\n"
+            "    вывести 2\n"
+            "конец\n"
+            "вывести а\n")
+    runner = RiCompiler()
+    runner.execute(code)
+    assert runner.optimization_report
+
+    runner = RiCompiler()
+    runner.coverage_enabled = True
+    assert runner.execute(code) == '1'
+    assert runner.coverage.executable_lines() == [1, 2, 3, 5, 6, 8]
+    assert runner.coverage.uncovered_lines() == [3, 6]